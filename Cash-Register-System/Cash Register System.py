@@ -1,29 +1,48 @@
 import datetime
 import os
+import sqlite3
 import tkinter as tk
 from tkinter import messagebox, scrolledtext
+from bill_view import BillView, format_bill_line
+from catalog_index import CatalogIndex
+from catalog_store import CatalogStore
+from journal import SalesJournal, make_sale, render_receipt
+from loyalty_store import LoyaltyStore, normalize_mobile
+from pricing import ZERO, bill_totals, make_bill_item, parse_percent
+from promotions import PROMOTIONS_FILE, PromotionBasket, PromotionEngine
+from store_client import StoreClient, StoreError
 
 class GroceryPOS:
+    CATALOG_POLL_MS = 2000
+    SAVE_POLL_MS = 50
+
     def __init__(self, root):
         self.root = root
         self.root.title("Grocery POS with Loyalty & Discounts")
-        self.total = 0
+        self.total = ZERO
         self.bill_items = []
 
-        # Load items prices
-        self.items = {}
-        with open("items.txt", "r") as f:
-            for line in f:
-                name, price = line.strip().split(",")
-                self.items[name.lower()] = float(price)
-
-        # Load loyalty customers: mobile -> name
-        self.customers = {}
-        if os.path.exists("customers.txt"):
-            with open("customers.txt", "r") as f:
-                for line in f:
-                    mob, name = line.strip().split(",")
-                    self.customers[mob] = name
+        # With POS_STORE_SERVER set (host:port or unix:/path) the lane uses the
+        # shared store server instead of opening the databases itself
+        server = os.environ.get("POS_STORE_SERVER")
+        if server:
+            self.store = StoreClient(server)
+            self.items = self.catalog = self.store.catalog
+            self.journal = self.store.journal
+            self.customers = self.store.members
+        else:
+            self.store = None
+            self.open_local_stores()
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+
+        # Active promotions from promotions.json, compiled once and reloaded when the file or the date changes
+        self.promotions = PromotionEngine({})
+        self.promotions_mtime = self.file_mtime(PROMOTIONS_FILE)
+        self.promotions_day = datetime.date.today().isoformat()
+        self.load_promotions()
+        self.is_member = False
+        # Running promotion saving of the open bill, updated line by line
+        self.basket = PromotionBasket(self.promotions)
 
         # --- UI Setup ---
         tk.Label(root, text="Grocery POS System", font=("Arial", 18)).pack(pady=10)
@@ -58,6 +77,13 @@ class GroceryPOS:
         self.item_entry = tk.Entry(root)
         self.item_entry.pack()
         self.item_entry.bind("<KeyRelease>", self.update_price)
+        self.item_entry.bind("<Return>", self.pick_suggestion)
+        self.item_entry.bind("<Down>", lambda e: self.suggestion_list.focus_set())
+
+        self.suggestion_list = tk.Listbox(root, height=5, width=40)
+        self.suggestion_list.pack()
+        self.suggestion_list.bind("<Double-Button-1>", self.pick_suggestion)
+        self.suggestion_list.bind("<Return>", self.pick_suggestion)
 
         tk.Label(root, text="Price (LKR):").pack()
         self.price_var = tk.StringVar()
@@ -75,8 +101,13 @@ class GroceryPOS:
 
         tk.Button(root, text="Add to Bill", command=self.add_to_bill).pack(pady=10)
 
-        self.bill_area = tk.Text(root, height=15, width=60, font=("Courier", 12))
-        self.bill_area.pack()
+        self.bill_view = BillView(root, height=15, width=60, font=("Courier", 12))
+        self.bill_view.pack()
+
+        line_frame = tk.Frame(root)
+        line_frame.pack(pady=5)
+        tk.Button(line_frame, text="Update Selected Line", command=self.update_selected_line).grid(row=0, column=0, padx=5)
+        tk.Button(line_frame, text="Remove Selected Line", command=self.remove_selected_line).grid(row=0, column=1, padx=5)
 
         self.total_label = tk.Label(root, text="Total: LKR 0.00")
         self.total_label.pack()
@@ -88,12 +119,97 @@ class GroceryPOS:
 
         tk.Button(root, text="Finish & Print Bill", command=self.finish_bill).pack(pady=10)
 
+        if self.store is None:
+            self.catalog_error = None
+            self.root.after(self.CATALOG_POLL_MS, self.reload_catalog)
+        self.root.after(self.CATALOG_POLL_MS, self.reload_promotions)
+
+    def open_local_stores(self):
+        # Item prices live in items.db; edits to items.txt are imported into it
+        self.items = CatalogStore("items.db")
+        synced = self.items.sync_text("items.txt")
+        if synced and synced[1]:
+            self.report_skipped_items(synced[1])
+        self.catalog = CatalogIndex(self.items, self.items.barcodes)
+
+        # Finished sales are saved by the journal's writer thread
+        self.journal = SalesJournal("sales.db")
+
+        # Loyalty customers are looked up in loyalty.db; customers.txt seeds a new one
+        self.customers = LoyaltyStore("loyalty.db")
+        if self.customers.is_empty() and os.path.exists("customers.txt"):
+            self.customers.import_text("customers.txt")
+
+    def report_skipped_items(self, skipped):
+        details = "\n".join(f"line {lineno}: {reason}" for lineno, reason in skipped[:10])
+        messagebox.showwarning("Items", f"Skipped {len(skipped)} bad line(s) in items.txt:\n{details}")
+
+    def report_store_error(self, error):
+        # Only raised on a lane using the store server
+        messagebox.showerror("Store Server Unavailable", f"The store server is unavailable, try again: {error}")
+
+    @staticmethod
+    def file_mtime(path):
+        return os.path.getmtime(path) if os.path.exists(path) else None
+
+    def load_promotions(self):
+        # A bad edit to promotions.json keeps the promotions already running
+        try:
+            self.promotions = PromotionEngine.load(PROMOTIONS_FILE)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            messagebox.showwarning("Promotions", f"Could not load {PROMOTIONS_FILE}, "
+                                                 f"keeping the current promotions: {e}")
+            return False
+        return True
+
+    def reload_promotions(self):
+        # promotions.json is read by every lane, local or on the store server
+        try:
+            mtime = self.file_mtime(PROMOTIONS_FILE)
+            today = datetime.date.today().isoformat()
+            # After midnight expired promotions end and ones starting today begin
+            if mtime != self.promotions_mtime or today != self.promotions_day:
+                self.promotions_mtime, self.promotions_day = mtime, today
+                if self.load_promotions():
+                    self.basket = PromotionBasket(self.promotions, self.bill_items, self.is_member)
+                    self.update_total()
+        finally:
+            self.root.after(self.CATALOG_POLL_MS, self.reload_promotions)
+
+    def reload_catalog(self):
+        # Pick up price changes from items.txt or from other tills without a restart
+        try:
+            synced = self.items.sync_text("items.txt")
+            if synced and synced[1]:
+                self.report_skipped_items(synced[1])
+            if synced or self.items.changed():
+                self.catalog.refresh()
+                self.update_price()
+        except (OSError, ValueError, sqlite3.Error) as e:
+            # The till keeps its current prices; a problem that persists is shown once, not every poll
+            if str(e) != self.catalog_error:
+                messagebox.showwarning("Items", f"Could not reload the item catalog, "
+                                                f"keeping the current prices: {e}")
+            self.catalog_error = str(e)
+        else:
+            self.catalog_error = None
+        finally:
+            self.root.after(self.CATALOG_POLL_MS, self.reload_catalog)
+
     def check_loyalty(self, event=None):
-        mob = self.mobile_entry.get().strip()
-        if mob in self.customers:
-            self.customer_name_label.config(text=self.customers[mob], fg="green")
+        try:
+            name = self.customers.lookup(self.mobile_entry.get())
+        except StoreError as e:
+            self.report_store_error(e)
+            name = None
+        if name:
+            self.customer_name_label.config(text=name, fg="green")
         else:
             self.customer_name_label.config(text="(Not Found)", fg="red")
+        # Loyalty-only promotions depend on it
+        self.is_member = bool(name)
+        self.basket.set_loyalty(self.is_member)
+        self.update_total()
 
     def add_loyalty_user(self):
         mob = self.new_mobile_entry.get().strip()
@@ -101,102 +217,162 @@ class GroceryPOS:
         if not mob or not name:
             messagebox.showwarning("Input Error", "Please enter both mobile and name.")
             return
-        if mob in self.customers:
+        try:
+            added = self.customers.add(mob, name)
+        except ValueError:
+            messagebox.showwarning("Input Error", "Enter a valid mobile number.")
+            return
+        except StoreError as e:
+            self.report_store_error(e)
+            return
+        if not added:
             messagebox.showinfo("Exists", "Customer already exists!")
             return
-        self.customers[mob] = name
-        with open("customers.txt", "a") as f:
-            f.write(f"{mob},{name}\n")
         messagebox.showinfo("Success", f"Loyalty user {name} added.")
         self.new_mobile_entry.delete(0, tk.END)
         self.new_name_entry.delete(0, tk.END)
 
     def update_price(self, event=None):
-        name = self.item_entry.get().strip().lower()
-        price = self.items.get(name, "")
-        self.price_var.set(price)
+        if event is not None and event.keysym in ("Return", "Down"):
+            return
+        text = self.item_entry.get()
+        self.suggestion_list.delete(0, tk.END)
+        for name in self.catalog.search(text):
+            self.suggestion_list.insert(tk.END, f"{name}  ({self.items[name]:.2f})")
+        # Exact name or scanned barcode shows the price straight away
+        name = self.catalog.resolve(text)
+        self.price_var.set(self.items[name] if name else "")
+
+    def pick_suggestion(self, event=None):
+        # Return on a scanned barcode / exact name, or choosing a suggestion, fills the item
+        name = self.catalog.resolve(self.item_entry.get())
+        if name is None:
+            selection = self.suggestion_list.curselection()
+            index = selection[0] if selection else 0
+            if self.suggestion_list.size() == 0:
+                return
+            name = self.suggestion_list.get(index).rsplit("  (", 1)[0]
+        self.item_entry.delete(0, tk.END)
+        self.item_entry.insert(0, name)
+        self.price_var.set(self.items[name])
+        self.suggestion_list.delete(0, tk.END)
+        self.qty_entry.focus_set()
 
     def add_to_bill(self):
-        name = self.item_entry.get().strip().lower()
+        name = self.catalog.resolve(self.item_entry.get()) or self.item_entry.get().strip().lower()
         if not name or not self.price_var.get():
             messagebox.showwarning("Input Error", "Enter valid item name.")
             return
+        entered = self.read_qty_discount()
+        if entered is None:
+            return
+
+        item = make_bill_item(name, self.price_var.get(), *entered)
+        self.bill_items.append(item)
+        self.total += item[5]
+        self.basket.add(item)
+
+        # Only the new line is drawn; the rest of the bill is left alone
+        self.bill_view.append(format_bill_line(item))
+        self.update_total()
+        self.clear_item_inputs()
+
+    def read_qty_discount(self):
         try:
             qty = int(self.qty_entry.get())
-            discount = float(self.discount_entry.get())
-            if discount < 0 or discount > 100:
-                raise ValueError
+            discount = parse_percent(self.discount_entry.get())
         except ValueError:
             messagebox.showwarning("Input Error", "Enter valid quantity and discount (0-100).")
-            return
-
-        price = float(self.price_var.get())
-        discounted_price = price * (1 - discount / 100)
-        line_total = discounted_price * qty
-
-        self.bill_items.append((name, price, qty, discount, discounted_price, line_total))
-        self.total += line_total
+            return None
+        return qty, discount
 
-        self.update_bill()
-        # Clear inputs
+    def clear_item_inputs(self):
+        self.suggestion_list.delete(0, tk.END)
         self.item_entry.delete(0, tk.END)
         self.price_var.set("")
         self.qty_entry.delete(0, tk.END)
         self.discount_entry.delete(0, tk.END)
         self.discount_entry.insert(0, "0")
 
-    def update_bill(self):
-        self.bill_area.delete(1.0, tk.END)
-        for item in self.bill_items:
-            self.bill_area.insert(tk.END,
-                f"{item[0]:<15} {item[1]:>6.2f} LKR  Qty:{item[2]:<3}  Disc:{item[3]:>5.1f}%  Price after disc: {item[4]:>6.2f}  Line Total: LKR {item[5]:.2f}\n")
-        self.total_label.config(text=f"Total: LKR {self.total:.2f}")
+    def update_total(self):
+        saving = self.basket.saving()
+        text = f"Total: LKR {self.total - saving:.2f}"
+        if saving:
+            text += f"  (promotions -{saving:.2f})"
+        self.total_label.config(text=text)
+
+    def update_selected_line(self):
+        # Applies the quantity and discount fields to the bill line under the cursor
+        index = self.bill_view.selected_index()
+        if index is None:
+            messagebox.showwarning("No Line Selected", "Click on a bill line first.")
+            return
+        entered = self.read_qty_discount()
+        if entered is None:
+            return
+        old = self.bill_items[index]
+        item = make_bill_item(old[0], old[1], *entered)
+        self.bill_items[index] = item
+        self.total += item[5] - old[5]
+        self.basket.remove(old)
+        self.basket.add(item)
+        self.bill_view.update(index, format_bill_line(item))
+        self.update_total()
+        self.clear_item_inputs()
+
+    def remove_selected_line(self):
+        index = self.bill_view.selected_index()
+        if index is None:
+            messagebox.showwarning("No Line Selected", "Click on a bill line first.")
+            return
+        item = self.bill_items.pop(index)
+        self.total -= item[5]
+        self.basket.remove(item)
+        self.bill_view.remove(index)
+        self.update_total()
 
     def finish_bill(self):
         if not self.bill_items:
             messagebox.showinfo("Empty Bill", "No items added!")
             return
         try:
-            total_discount = float(self.total_bill_discount_entry.get())
-            if total_discount < 0 or total_discount > 100:
-                raise ValueError
+            total_discount = parse_percent(self.total_bill_discount_entry.get())
         except ValueError:
             messagebox.showwarning("Input Error", "Enter valid total discount (0-100).")
             return
 
-        total_after_discount = self.total * (1 - total_discount / 100)
-
         mob = self.mobile_entry.get().strip()
-        cust_name = self.customers.get(mob, "Guest")
-
-        bill_text = "===== Grocery Bill =====\n"
-        bill_text += f"Date: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-        bill_text += f"Customer: {cust_name}\n\n"
-        bill_text += f"{'Item':<15}{'Price':>8}{'Qty':>5}{'Disc%':>7}{'Price After Disc':>18}{'Total':>10}\n"
-        bill_text += "-"*70 + "\n"
-        for item in self.bill_items:
-            bill_text += f"{item[0]:<15}{item[1]:>8.2f}{item[2]:>5}{item[3]:>7.1f}{item[4]:>18.2f}{item[5]:>10.2f}\n"
-        bill_text += "-"*70 + "\n"
-        bill_text += f"Total Before Discount: LKR {self.total:.2f}\n"
-        bill_text += f"Total Discount: {total_discount}%\n"
-        bill_text += f"Total After Discount: LKR {total_after_discount:.2f}\n"
-        bill_text += "=======================\n"
-
-        # Save bill to file in bills folder
-        if not os.path.exists("bills"):
-            os.makedirs("bills")
-        filename = f"bills/bill_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-        with open(filename, "w") as f:
-            f.write(bill_text)
-
-        # Show final bill in a popup window
-        self.show_bill_popup(bill_text)
+        try:
+            cust_name = self.customers.lookup(mob) or "Guest"
+        except StoreError as e:
+            # The bill stays open so it can be finished once the server is back
+            self.report_store_error(e)
+            return
+        if cust_name != "Guest":
+            mob = normalize_mobile(mob)
+
+        applied, saving = self.promotions.apply(self.bill_items, loyalty=cust_name != "Guest")
+        total, total_after_discount = bill_totals(self.bill_items, total_discount, saving)
+
+        sale = make_sale(self.bill_items, total, total_discount, total_after_discount,
+                         customer_mobile=mob, customer_name=cust_name, promotions=applied)
+        try:
+            saved = self.journal.record(sale)
+        except StoreError as e:
+            self.report_store_error(e)
+            return
+
+        # Show final bill in a popup window; it is marked saved once the journal commits
+        popup = self.show_bill_popup(render_receipt(sale))
+        self.root.after(self.SAVE_POLL_MS, self.check_saved, sale["bill_id"], saved, popup)
 
         # Reset for next customer
         self.bill_items.clear()
-        self.total = 0
+        self.total = ZERO
         self.mobile_entry.delete(0, tk.END)
         self.customer_name_label.config(text="(Not Found)", fg="red")
+        self.is_member = False
+        self.basket = PromotionBasket(self.promotions)
         self.item_entry.delete(0, tk.END)
         self.price_var.set("")
         self.qty_entry.delete(0, tk.END)
@@ -204,12 +380,28 @@ class GroceryPOS:
         self.discount_entry.insert(0, "0")
         self.total_bill_discount_entry.delete(0, tk.END)
         self.total_bill_discount_entry.insert(0, "0")
-        self.bill_area.delete(1.0, tk.END)
+        self.bill_view.clear()
         self.total_label.config(text="Total: LKR 0.00")
 
+    def check_saved(self, bill_id, saved, popup):
+        if not saved.done():
+            self.root.after(self.SAVE_POLL_MS, self.check_saved, bill_id, saved, popup)
+            return
+        error = saved.exception()
+        if error is not None:
+            messagebox.showerror("Bill Not Saved", f"Bill {bill_id} could not be saved: {error}")
+        elif popup.winfo_exists():
+            popup.title(f"Final Bill {bill_id} (saved)")
+
+    def close(self):
+        # Let the journal flush any sale still being written before exiting
+        self.journal.close()
+        self.customers.close()
+        self.root.destroy()
+
     def show_bill_popup(self, bill_text):
         popup = tk.Toplevel(self.root)
-        popup.title("Final Bill")
+        popup.title("Final Bill (saving...)")
 
         st = scrolledtext.ScrolledText(popup, width=80, height=25, font=("Courier", 12))
         st.pack(padx=10, pady=10)
@@ -217,6 +409,7 @@ class GroceryPOS:
         st.config(state=tk.DISABLED)
 
         tk.Button(popup, text="Close", command=popup.destroy).pack(pady=5)
+        return popup
 
 if __name__ == "__main__":
     root = tk.Tk()
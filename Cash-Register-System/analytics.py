@@ -0,0 +1,441 @@
+import argparse
+import datetime
+import json
+import os
+import re
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+STORE_DIR = "analytics"
+BILLS_DIR = "bills"
+JOURNAL_FILE = "sales.db"
+
+# Small per-run chunks are merged once there are more than this many
+MAX_CHUNKS = 16
+
+# Bumped when the meaning of stored codes changes; an older archive is rebuilt on the next ingest
+MANIFEST_VERSION = 3
+
+# Customer key of sales to anyone who is not a loyalty member
+GUEST = ""
+
+BILL_COLUMNS = {
+    "bill": np.int64,           # bill number, unique across the store
+    "day": np.int32,            # days since 1970-01-01
+    "customer": np.int32,       # index into the customer list (keyed by loyalty mobile number)
+    "total": np.float64,
+    "promotion_saving": np.float64,  # taken off the total before the bill discount
+    "discount_pct": np.float64,
+    "total_after_discount": np.float64,
+}
+LINE_COLUMNS = {
+    "bill": np.int64,
+    "day": np.int32,
+    "item": np.int32,           # index into the item list
+    "price": np.float64,
+    "qty": np.int32,
+    "discount_pct": np.float64,
+    "line_total": np.float64,
+}
+
+LEGACY_LINE = re.compile(r"^(?P<name>.+?)\s+(?P<price>[\d.]+) x(?P<qty>\d+)\s+= LKR (?P<total>[\d.]+)$")
+LEGACY_TOTAL = re.compile(r"^TOTAL: LKR (?P<total>[\d.]+)$")
+BILL_FILE_TIME = re.compile(r"(\d{8}_\d{6})")
+
+
+def parse_bill_text(text, filename=""):
+    """Parse a text receipt into (sale, items) in the journal's record layout.
+
+    Handles the receipts finish_bill used to write (header, per-line
+    discounts, bill discount) and the older "name price xqty = LKR total"
+    receipts, which have no date or customer; those take the time from the
+    file name and count as Guest sales. Raises ValueError if neither fits.
+    """
+    lines = [line.rstrip() for line in text.splitlines()]
+    if lines and lines[0].startswith("====="):
+        return _parse_receipt(lines)
+    return _parse_legacy(lines, filename)
+
+
+def _parse_receipt(lines):
+    sale = {"bill_id": None, "customer_name": "Guest", "discount_pct": 0.0, "promotion_saving": 0.0}
+    items = []
+    rules = 0
+    promotions = False
+    for line in lines[1:]:
+        if line.startswith("Bill: "):
+            sale["bill_id"] = line[6:].strip()
+        elif line.startswith("Date: "):
+            sale["created_at"] = line[6:].strip()
+        elif line.startswith("Customer: "):
+            sale["customer_name"] = line[10:].strip()
+        elif line.startswith("-----"):
+            rules += 1
+        elif line == "Promotions:":
+            promotions = True
+        elif promotions and line.startswith("  "):
+            # "  <description>   -12.50": the saving is printed negated in the last column
+            sale["promotion_saving"] -= float(line.rsplit(None, 1)[1])
+        elif line.startswith("Total Before Discount: LKR "):
+            promotions = False
+            sale["total"] = float(line.rsplit(" ", 1)[1])
+        elif line.startswith("Total Discount: "):
+            sale["discount_pct"] = float(line[16:].rstrip("%"))
+        elif line.startswith("Total After Discount: LKR "):
+            sale["total_after_discount"] = float(line.rsplit(" ", 1)[1])
+        elif rules == 1 and line.strip():
+            # Item names may contain spaces, the five numeric columns cannot
+            fields = line.rsplit(None, 5)
+            items.append((fields[0].strip(), float(fields[1]), int(fields[2]), float(fields[3]),
+                          float(fields[4]), float(fields[5])))
+    if "created_at" not in sale or "total_after_discount" not in sale:
+        raise ValueError("incomplete receipt")
+    sale.setdefault("total", sum(item[5] for item in items))
+    return sale, items
+
+
+def _parse_legacy(lines, filename):
+    stamp = BILL_FILE_TIME.search(filename)
+    if not stamp:
+        raise ValueError("no date in file name")
+    created_at = datetime.datetime.strptime(stamp.group(1), "%Y%m%d_%H%M%S")
+    items = []
+    total = None
+    for line in lines:
+        match = LEGACY_LINE.match(line)
+        if match:
+            price, qty = float(match["price"]), int(match["qty"])
+            items.append((match["name"].strip(), price, qty, 0.0, price, float(match["total"])))
+            continue
+        match = LEGACY_TOTAL.match(line)
+        if match:
+            total = float(match["total"])
+    if total is None:
+        raise ValueError("no TOTAL line")
+    sale = {"bill_id": None, "created_at": created_at.strftime("%Y-%m-%d %H:%M:%S"), "customer_name": "Guest",
+            "total": total, "promotion_saving": 0.0, "discount_pct": 0.0, "total_after_discount": total}
+    return sale, items
+
+
+def customer_key(sale):
+    # Members are keyed by mobile number, which stays put when a name is corrected and tells apart
+    # two members with the same name; receipts from before the journal only have the name
+    if sale["customer_name"] == "Guest":
+        return GUEST
+    return sale.get("customer_mobile") or f"name:{sale['customer_name']}"
+
+
+def to_day(created_at):
+    return (datetime.date.fromisoformat(created_at[:10]) - datetime.date(1970, 1, 1)).days
+
+
+class _ChunkBuilder:
+    # Collects parsed bills as Python lists, then becomes one column chunk
+    def __init__(self, archive):
+        self.archive = archive
+        self.bills = {name: [] for name in BILL_COLUMNS}
+        self.lines = {name: [] for name in LINE_COLUMNS}
+
+    def add(self, sale, items):
+        archive = self.archive
+        bill = archive.manifest["next_bill"]
+        archive.manifest["next_bill"] += 1
+        day = to_day(sale["created_at"])
+        self.bills["bill"].append(bill)
+        self.bills["day"].append(day)
+        self.bills["customer"].append(archive.customer_code(sale))
+        self.bills["total"].append(sale["total"])
+        self.bills["promotion_saving"].append(sale["promotion_saving"])
+        self.bills["discount_pct"].append(sale["discount_pct"])
+        self.bills["total_after_discount"].append(sale["total_after_discount"])
+        for name, price, qty, discount_pct, _, line_total in items:
+            self.lines["bill"].append(bill)
+            self.lines["day"].append(day)
+            self.lines["item"].append(archive.code("items", name))
+            self.lines["price"].append(price)
+            self.lines["qty"].append(qty)
+            self.lines["discount_pct"].append(discount_pct)
+            self.lines["line_total"].append(line_total)
+
+    def __len__(self):
+        return len(self.bills["bill"])
+
+    def arrays(self):
+        return ({name: np.asarray(values, dtype=BILL_COLUMNS[name]) for name, values in self.bills.items()},
+                {name: np.asarray(values, dtype=LINE_COLUMNS[name]) for name, values in self.lines.items()})
+
+
+class SalesArchive:
+    """Columnar copy of the sales history for reporting.
+
+    ``ingest`` picks up receipts in bills/ and sales from the journal that
+    it has not seen before and appends them as a chunk of NumPy column
+    arrays. The manifest remembers only the last receipt file name and the
+    journal's last rowid, so each bill is parsed exactly once and the
+    manifest does not grow with the history. Receipts are taken in file
+    name order; their bill_YYYYMMDD_HHMMSS.txt names sort by time. Item names and
+    customers (by loyalty mobile number, with the latest name seen kept
+    as a label) are stored as integer codes. Queries load the columns once and
+    aggregate them with bincount, so they scan millions of lines in a few
+    milliseconds.
+
+    Receipts with a "Bill:" line were exported from the journal, which is
+    already ingested directly, so they are skipped.
+    """
+
+    def __init__(self, store_dir=STORE_DIR, bills_dir=BILLS_DIR, journal_path=JOURNAL_FILE):
+        self.store_dir = store_dir
+        self.bills_dir = bills_dir
+        self.journal_path = journal_path
+        self.manifest_path = os.path.join(store_dir, "manifest.json")
+        self.manifest = {"version": MANIFEST_VERSION, "chunks": [], "last_file": "", "journal_rowid": 0,
+                         "next_bill": 0, "items": [], "customers": [], "customer_names": []}
+        # Chunks of an archive written under an older manifest version, deleted once it is rebuilt
+        self._stale_chunks = []
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get("version") == MANIFEST_VERSION:
+                self.manifest = manifest
+                if "files" in manifest:
+                    # Written when every file name was kept; the last one is all that is needed
+                    manifest["last_file"] = max(manifest.pop("files"), default="")
+            else:
+                self._stale_chunks = manifest["chunks"]
+        self._codes = {kind: {name: i for i, name in enumerate(self.manifest[kind])}
+                       for kind in ("items", "customers")}
+        self._columns = None
+
+    def code(self, kind, name):
+        codes = self._codes[kind]
+        if name not in codes:
+            codes[name] = len(self.manifest[kind])
+            self.manifest[kind].append(name)
+        return codes[name]
+
+    def customer_code(self, sale):
+        code = self.code("customers", customer_key(sale))
+        names = self.manifest["customer_names"]
+        if code == len(names):
+            names.append(sale["customer_name"])
+        else:
+            names[code] = sale["customer_name"]
+        return code
+
+    # -- ingest --
+
+    def ingest(self):
+        """Add new receipts and journal sales; returns (bills added, files skipped as unreadable)."""
+        builder = _ChunkBuilder(self)
+        skipped = []
+        if os.path.isdir(self.bills_dir):
+            for filename in sorted(os.listdir(self.bills_dir)):
+                if filename <= self.manifest["last_file"] or not filename.endswith(".txt"):
+                    continue
+                self.manifest["last_file"] = filename
+                try:
+                    with open(os.path.join(self.bills_dir, filename), "r", encoding="utf-8") as f:
+                        text = f.read()
+                    sale, items = parse_bill_text(text, filename)
+                except (OSError, UnicodeDecodeError) as e:
+                    skipped.append((filename, f"unreadable: {e}"))
+                    continue
+                except (ValueError, IndexError) as e:
+                    skipped.append((filename, str(e)))
+                    continue
+                if sale["bill_id"] is None:
+                    builder.add(sale, items)
+        if os.path.exists(self.journal_path):
+            self._ingest_journal(builder)
+        if len(builder):
+            self._write_chunk(*builder.arrays())
+        self._save_manifest()
+        self._remove_chunks(self._stale_chunks)
+        self._stale_chunks = []
+        if len(self.manifest["chunks"]) > MAX_CHUNKS:
+            self.compact()
+        return len(builder), skipped
+
+    def _ingest_journal(self, builder):
+        conn = sqlite3.connect(f"file:{self.journal_path}?mode=ro", uri=True)
+        try:
+            sales = conn.execute("SELECT rowid, bill_id, created_at, customer_mobile, customer_name, total, "
+                                 "discount_pct, total_after_discount FROM sales WHERE rowid > ? ORDER BY rowid",
+                                 (self.manifest["journal_rowid"],)).fetchall()
+            if not sales:
+                return
+            lines = {}
+            for row in conn.execute("SELECT l.bill_id, l.name, l.price, l.qty, l.discount_pct, "
+                                    "l.discounted_price, l.line_total FROM sale_lines l "
+                                    "JOIN sales s ON s.bill_id = l.bill_id WHERE s.rowid > ? "
+                                    "ORDER BY l.bill_id, l.line_no", (self.manifest["journal_rowid"],)):
+                lines.setdefault(row[0], []).append(row[1:])
+            savings = {}
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sale_promotions'").fetchone():
+                # Journals from before promotions have no such table
+                savings = dict(conn.execute("SELECT p.bill_id, SUM(p.saving) FROM sale_promotions p "
+                                            "JOIN sales s ON s.bill_id = p.bill_id WHERE s.rowid > ? "
+                                            "GROUP BY p.bill_id", (self.manifest["journal_rowid"],)))
+        finally:
+            conn.close()
+        for _, *values in sales:
+            sale = dict(zip(("bill_id", "created_at", "customer_mobile", "customer_name", "total", "discount_pct",
+                             "total_after_discount"), values))
+            sale["promotion_saving"] = savings.get(sale["bill_id"], 0.0)
+            builder.add(sale, lines.get(sale["bill_id"], []))
+        self.manifest["journal_rowid"] = sales[-1][0]
+
+    def _write_chunk(self, bills, lines):
+        os.makedirs(self.store_dir, exist_ok=True)
+        name = f"chunk-{time.time_ns()}"
+        np.savez(os.path.join(self.store_dir, name + ".bills.npz"), **bills)
+        np.savez(os.path.join(self.store_dir, name + ".lines.npz"), **lines)
+        self.manifest["chunks"].append(name)
+        self._columns = None
+
+    def _save_manifest(self):
+        # The manifest is replaced atomically and is what makes a chunk visible,
+        # so an interrupted ingest leaves only an unreferenced chunk behind
+        os.makedirs(self.store_dir, exist_ok=True)
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.manifest_path)
+
+    def compact(self):
+        # Merge all chunks into one so queries open two files instead of many
+        bills, lines = self.columns()
+        old = self.manifest["chunks"]
+        self.manifest["chunks"] = []
+        self._write_chunk(bills, lines)
+        self._save_manifest()
+        self._remove_chunks(old)
+
+    def _remove_chunks(self, names):
+        for name in names:
+            for kind in ("bills", "lines"):
+                path = os.path.join(self.store_dir, f"{name}.{kind}.npz")
+                if os.path.exists(path):
+                    os.remove(path)
+
+    # -- queries --
+
+    def columns(self):
+        """(bills, lines) as dicts of column arrays covering every ingested bill."""
+        if self._columns is None:
+            parts = {"bills": [], "lines": []}
+            for name in self.manifest["chunks"]:
+                for kind in parts:
+                    with np.load(os.path.join(self.store_dir, f"{name}.{kind}.npz")) as chunk:
+                        parts[kind].append({column: chunk[column] for column in chunk.files})
+            self._columns = tuple(
+                {column: (np.concatenate([part[column] for part in parts[kind]]) if parts[kind]
+                          else np.empty(0, dtype))
+                 for column, dtype in spec.items()}
+                for kind, spec in (("bills", BILL_COLUMNS), ("lines", LINE_COLUMNS)))
+        return self._columns
+
+    @staticmethod
+    def _in_range(day, start, end):
+        mask = np.ones(len(day), dtype=bool)
+        if start is not None:
+            mask &= day >= to_day(str(start))
+        if end is not None:
+            mask &= day <= to_day(str(end))
+        return mask
+
+    @staticmethod
+    def _dates(days):
+        return pd.to_datetime(days.astype("datetime64[D]"))
+
+    def daily_revenue(self, start=None, end=None):
+        """Revenue after discounts and number of bills per day."""
+        bills, _ = self.columns()
+        mask = self._in_range(bills["day"], start, end)
+        days, index = np.unique(bills["day"][mask], return_inverse=True)
+        return pd.DataFrame({
+            "bills": np.bincount(index, minlength=len(days)),
+            "revenue": np.bincount(index, weights=bills["total_after_discount"][mask], minlength=len(days)),
+        }, index=pd.Index(self._dates(days), name="date"))
+
+    def top_items(self, n=10, by="revenue", start=None, end=None):
+        """Best-selling items by revenue (line totals) or by quantity."""
+        _, lines = self.columns()
+        mask = self._in_range(lines["day"], start, end)
+        items = lines["item"][mask]
+        size = len(self.manifest["items"])
+        table = pd.DataFrame({
+            "qty": np.bincount(items, weights=lines["qty"][mask], minlength=size).astype(np.int64),
+            "revenue": np.bincount(items, weights=lines["line_total"][mask], minlength=size),
+        }, index=pd.Index(self.manifest["items"], name="item"))
+        return table[table["qty"] > 0].nlargest(n, by)
+
+    def discount_totals(self, start=None, end=None):
+        """Per day, money given away by item discounts, promotions and whole-bill discounts."""
+        bills, lines = self.columns()
+        bill_mask = self._in_range(bills["day"], start, end)
+        line_mask = self._in_range(lines["day"], start, end)
+        line_discount = lines["price"][line_mask] * lines["qty"][line_mask] - lines["line_total"][line_mask]
+        promotion_saving = bills["promotion_saving"][bill_mask]
+        bill_discount = bills["total"][bill_mask] - promotion_saving - bills["total_after_discount"][bill_mask]
+        days, bill_index = np.unique(bills["day"][bill_mask], return_inverse=True)
+        line_index = np.searchsorted(days, lines["day"][line_mask])
+        table = pd.DataFrame({
+            "item_discounts": np.bincount(line_index, weights=line_discount, minlength=len(days)),
+            "promotions": np.bincount(bill_index, weights=promotion_saving, minlength=len(days)),
+            "bill_discounts": np.bincount(bill_index, weights=bill_discount, minlength=len(days)),
+        }, index=pd.Index(self._dates(days), name="date"))
+        table["total"] = table["item_discounts"] + table["promotions"] + table["bill_discounts"]
+        return table
+
+    def customer_spend(self, start=None, end=None, include_guests=False):
+        """Bills and spend (after discounts) per loyalty customer, biggest spenders first.
+
+        Rows are indexed by mobile number ("" for guests, "name:..." for
+        receipts from before the journal) with the latest name as a column.
+        """
+        bills, _ = self.columns()
+        mask = self._in_range(bills["day"], start, end)
+        customers = bills["customer"][mask]
+        size = len(self.manifest["customers"])
+        table = pd.DataFrame({
+            "name": self.manifest["customer_names"],
+            "bills": np.bincount(customers, minlength=size),
+            "spend": np.bincount(customers, weights=bills["total_after_discount"][mask], minlength=size),
+        }, index=pd.Index(self.manifest["customers"], name="customer"))
+        if not include_guests:
+            table = table.drop(index=GUEST, errors="ignore")
+        return table[table["bills"] > 0].sort_values("spend", ascending=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sales reports over the bills archive and the sales journal.")
+    parser.add_argument("report", choices=["ingest", "daily", "items", "discounts", "customers"])
+    parser.add_argument("--start", help="YYYY-MM-DD")
+    parser.add_argument("--end", help="YYYY-MM-DD")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--by", choices=["revenue", "qty"], default="revenue")
+    parser.add_argument("--store", default=STORE_DIR)
+    parser.add_argument("--bills", default=BILLS_DIR)
+    parser.add_argument("--journal", default=JOURNAL_FILE)
+    args = parser.parse_args()
+
+    archive = SalesArchive(args.store, args.bills, args.journal)
+    added, skipped = archive.ingest()
+    for filename, reason in skipped:
+        print(f"skipped {filename}: {reason}")
+    if args.report == "ingest":
+        print(f"Added {added} bill(s)")
+    elif args.report == "daily":
+        print(archive.daily_revenue(args.start, args.end).to_string())
+    elif args.report == "items":
+        print(archive.top_items(args.top, args.by, args.start, args.end).to_string())
+    elif args.report == "discounts":
+        print(archive.discount_totals(args.start, args.end).to_string())
+    else:
+        print(archive.customer_spend(args.start, args.end).to_string())
@@ -0,0 +1,86 @@
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from analytics import SalesArchive
+from journal import SalesJournal
+
+ITEMS = [f"item{i:04d}" for i in range(2000)]
+# (mobile, name); members share names, as real customers do
+CUSTOMERS = [("", "Guest")] * 5 + [(f"07{i:08d}", f"customer{i % 15000:05d}") for i in range(20000)]
+
+
+def synthetic_journal(path, days, bills_per_day, seed=1):
+    # Writes a year of sales straight into the journal tables, bypassing the writer thread
+    SalesJournal(path).close()
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    start = datetime.datetime(2025, 1, 1, 8)
+    lines = 0
+    for day in range(days):
+        sales, sale_lines = [], []
+        for n in range(bills_per_day):
+            created_at = start + datetime.timedelta(days=day, seconds=n * 40)
+            bill_id = f"{created_at:%Y%m%d-%H%M%S}-{n:08x}"
+            total = 0.0
+            for line_no in range(1, rng.randint(2, 15)):
+                price = rng.choice((80.0, 120.0, 180.0, 240.0, 350.0, 900.0))
+                qty = rng.randint(1, 6)
+                discount_pct = rng.choice((0.0, 0.0, 0.0, 5.0, 10.0))
+                discounted = price * (1 - discount_pct / 100)
+                sale_lines.append((bill_id, line_no, rng.choice(ITEMS), price, qty, discount_pct, discounted,
+                                   discounted * qty))
+                total += discounted * qty
+            discount_pct = rng.choice((0.0, 0.0, 3.0))
+            sales.append((bill_id, created_at.strftime("%Y-%m-%d %H:%M:%S"), *rng.choice(CUSTOMERS),
+                          total, discount_pct, total * (1 - discount_pct / 100)))
+        conn.executemany("INSERT INTO sales VALUES (?, ?, ?, ?, ?, ?, ?)", sales)
+        conn.executemany("INSERT INTO sale_lines VALUES (?, ?, ?, ?, ?, ?, ?, ?)", sale_lines)
+        lines += len(sale_lines)
+    conn.commit()
+    conn.close()
+    return lines
+
+
+def timed(label, fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:>32}: {best * 1000:8.1f} ms")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time analytics ingest and queries over a synthetic year of sales.")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--bills-per-day", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        journal_path = os.path.join(tmp, "sales.db")
+        start = time.perf_counter()
+        lines = synthetic_journal(journal_path, args.days, args.bills_per_day)
+        print(f"generated {args.days * args.bills_per_day:,} bills, {lines:,} lines "
+              f"in {time.perf_counter() - start:.1f}s")
+
+        store_dir = os.path.join(tmp, "analytics")
+        archive = SalesArchive(store_dir, os.path.join(tmp, "bills"), journal_path)
+        start = time.perf_counter()
+        added, _ = archive.ingest()
+        print(f"ingested {added:,} bills in {time.perf_counter() - start:.1f}s")
+        start = time.perf_counter()
+        added, _ = archive.ingest()
+        print(f"re-ingest with nothing new ({added} bills) in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        timed("load columns (fresh process)", lambda: SalesArchive(store_dir, journal_path=journal_path).columns())
+        timed("daily revenue, whole year", archive.daily_revenue)
+        timed("top 10 items, whole year", archive.top_items)
+        timed("top 10 items, one month", lambda: archive.top_items(start="2025-06-01", end="2025-06-30"))
+        timed("discount totals, whole year", archive.discount_totals)
+        timed("customer spend, whole year", archive.customer_spend)
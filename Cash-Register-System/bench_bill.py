@@ -0,0 +1,60 @@
+import argparse
+import statistics
+import time
+import tkinter as tk
+
+from bill_view import BillView, format_bill_line
+
+ITEM = ("basmati rice", 420.0, 3, 5.0, 399.0, 1197.0)
+
+
+class FullRedraw:
+    # The previous update_bill: clear the Text widget and re-insert every line
+    def __init__(self, root):
+        self.text = tk.Text(root, height=15, width=60, font=("Courier", 12))
+        self.text.pack()
+        self.lines = []
+
+    def append(self, line):
+        self.lines.append(line)
+        self.text.delete(1.0, tk.END)
+        for existing in self.lines:
+            self.text.insert(tk.END, existing + "\n")
+
+
+def incremental_view(frame):
+    view = BillView(frame)
+    view.pack()
+    return view
+
+
+def scan_latency(root, make_view, lines, repeats):
+    frame = tk.Frame(root)
+    frame.pack()
+    view = make_view(frame)
+    for _ in range(lines - 1):
+        view.append(format_bill_line(ITEM))
+    root.update()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        view.append(format_bill_line(ITEM))
+        root.update_idletasks()
+        samples.append(time.perf_counter() - start)
+    frame.destroy()
+    return statistics.median(samples) * 1000
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Per-scan latency of the bill display (needs a display).")
+    parser.add_argument('--lines', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--repeats', type=int, default=25)
+    args = parser.parse_args()
+
+    root = tk.Tk()
+    print(f"{'lines':>7} {'full redraw ms':>15} {'incremental ms':>15}")
+    for lines in args.lines:
+        full = scan_latency(root, FullRedraw, lines, args.repeats)
+        incremental = scan_latency(root, incremental_view, lines, args.repeats)
+        print(f"{lines:>7} {full:>15.3f} {incremental:>15.3f}")
+    root.destroy()
@@ -0,0 +1,153 @@
+import argparse
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from catalog_index import CatalogIndex
+from catalog_store import CatalogStore
+from journal import SalesJournal, make_sale
+from loyalty_store import LoyaltyStore
+from pricing import bill_totals, make_bill_item
+from store_client import StoreClient
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+WORDS = ["milk", "bread", "sugar", "rice", "tea", "soap", "dhal", "flour", "biscuit", "butter", "cheese", "egg",
+         "noodles", "salt", "chilli", "curry", "coconut", "banana", "apple", "mango"]
+
+
+def item_names(count):
+    rng = random.Random(7)
+    names = set()
+    while len(names) < count:
+        names.add(f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.randrange(1000)}")
+    return sorted(names)
+
+
+def setup(directory, items, members):
+    with open(os.path.join(directory, "items.txt"), "w") as f:
+        for i, name in enumerate(item_names(items)):
+            f.write(f"{name},{100 + i % 900}.00,{4790000000 + i}\n")
+    store = LoyaltyStore(os.path.join(directory, "loyalty.db"))
+    store.add_many((f"07{i:08d}", f"member {i}") for i in range(members))
+    store.close()
+
+
+class LocalLane:
+    # What every till did before the store server: its own connections and its own index
+    def __init__(self, directory):
+        self.items = CatalogStore(os.path.join(directory, "items.db"))
+        self.items.sync_text(os.path.join(directory, "items.txt"))
+        self.catalog = CatalogIndex(self.items, self.items.barcodes)
+        self.customers = LoyaltyStore(os.path.join(directory, "loyalty.db"))
+        self.journal = SalesJournal(os.path.join(directory, "sales.db"))
+
+    def close(self):
+        self.journal.close()
+
+
+class RemoteLane:
+    def __init__(self, address):
+        self.client = StoreClient(address)
+        self.items = self.catalog = self.client.catalog
+        self.customers = self.client.members
+        self.journal = self.client.journal
+
+    def close(self):
+        self.client.close()
+
+
+def lane(mode, target, lane_no, bills, items_per_bill, names, members, results):
+    rng = random.Random(lane_no)
+    till = LocalLane(target) if mode == "local" else RemoteLane(target)
+    # A store sells the same few hundred items most of the time
+    popular = rng.sample(names, 300)
+    timings = {"keystroke": [], "member": [], "bill": []}
+    start_all = time.perf_counter()
+    for _ in range(bills):
+        start = time.perf_counter()
+        till.customers.lookup(f"07{rng.randrange(members * 2):08d}")
+        timings["member"].append(time.perf_counter() - start)
+        items = []
+        for _ in range(items_per_bill):
+            name = rng.choice(popular) if rng.random() < 0.9 else rng.choice(names)
+            for end in range(1, len(name) + 1):
+                start = time.perf_counter()
+                for suggestion in till.catalog.search(name[:end]):
+                    till.items[suggestion]
+                till.catalog.resolve(name[:end])
+                timings["keystroke"].append(time.perf_counter() - start)
+            items.append(make_bill_item(name, till.items[name], rng.randint(1, 4), 0))
+        total, total_after_discount = bill_totals(items, 0)
+        start = time.perf_counter()
+        till.journal.record(make_sale(items, total, 0, total_after_discount)).result(30)
+        timings["bill"].append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - start_all
+    stats = getattr(till, "client", None) and till.client.stats
+    till.close()
+    results.put((elapsed, timings, stats))
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def run(mode, target, lanes, args, names):
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=lane, args=(mode, target, n, args.bills, args.items_per_bill, names,
+                                                        args.members, results))
+             for n in range(lanes)]
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    outcomes = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - start
+    timings = {key: [v for _, t, _ in outcomes for v in t[key]] for key in outcomes[0][1]}
+    hits = sum(s["hits"] for _, _, s in outcomes if s)
+    misses = sum(s["misses"] for _, _, s in outcomes if s)
+    line = (f"{mode:>6} {lanes:>3} lanes: {lanes * args.bills / elapsed:7.1f} bills/s  "
+            f"keystroke p50 {percentile(timings['keystroke'], 50) * 1e6:6.0f} us p99 "
+            f"{percentile(timings['keystroke'], 99) * 1e6:6.0f} us  "
+            f"bill commit p50 {percentile(timings['bill'], 50) * 1000:5.1f} ms p99 "
+            f"{percentile(timings['bill'], 99) * 1000:5.1f} ms")
+    line += "  time in " + ", ".join(f"{key} {sum(values) / lanes:.2f}s" for key, values in timings.items())
+    if hits + misses:
+        line += f"  cache hits {hits / (hits + misses) * 100:.0f}%"
+    print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate several POS lanes, each on its own databases or "
+                                                 "all on one store server.")
+    parser.add_argument("--lanes", type=int, nargs="+", default=[1, 4, 12])
+    parser.add_argument("--bills", type=int, default=100, help="bills per lane")
+    parser.add_argument("--items-per-bill", type=int, default=12)
+    parser.add_argument("--items", type=int, default=20000, help="catalog size")
+    parser.add_argument("--members", type=int, default=100000)
+    parser.add_argument("--mode", choices=["local", "server", "both"], default="both")
+    args = parser.parse_args()
+
+    names = item_names(args.items)
+    with tempfile.TemporaryDirectory() as tmp:
+        setup(tmp, args.items, args.members)
+        if args.mode in ("local", "both"):
+            for lanes in args.lanes:
+                run("local", tmp, lanes, args, names)
+        if args.mode in ("server", "both"):
+            address = f"unix:{os.path.join(tmp, 'pos.sock')}"
+            server = subprocess.Popen([sys.executable, os.path.join(HERE, "store_server.py"), "--address", address],
+                                      cwd=tmp, stdout=subprocess.DEVNULL)
+            try:
+                while not os.path.exists(address[5:]):
+                    time.sleep(0.05)
+                for lanes in args.lanes:
+                    run("server", address, lanes, args, names)
+            finally:
+                server.terminate()
+                server.wait()
@@ -0,0 +1,106 @@
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from loyalty_store import LoyaltyStore
+
+
+def member_mobile(i):
+    return f"07{i:08d}"
+
+
+def build(path, members, batch=500000):
+    # Bulk load straight into the table; the numbers are generated in canonical form already
+    LoyaltyStore(path).close()
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous=OFF")
+    for start in range(0, members, batch):
+        conn.executemany("INSERT INTO members (mobile, name) VALUES (?, ?)",
+                         ((member_mobile(i), f"member {i}") for i in range(start, min(start + batch, members))))
+        conn.commit()
+    conn.close()
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def till(path, till_no, adds, members, overlap, results):
+    # One till adding members; every till also tries the same `overlap` shared numbers
+    store = LoyaltyStore(path)
+    rng = random.Random(till_no)
+    shared = [member_mobile(members + i) for i in range(overlap)]
+    own = [member_mobile(members + overlap + till_no * adds + i) for i in range(adds)]
+    numbers = shared + own
+    rng.shuffle(numbers)
+    added = 0
+    latencies = []
+    for mobile in numbers:
+        # Mix of formats, as typed at the counter
+        typed = rng.choice((mobile, "+94" + mobile[1:], mobile[:3] + " " + mobile[3:6] + " " + mobile[6:]))
+        start = time.perf_counter()
+        added += store.add(typed, f"till {till_no}")
+        latencies.append(time.perf_counter() - start)
+    store.close()
+    results.put((added, latencies))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Loyalty store at scale: startup, lookups and concurrent tills.")
+    parser.add_argument("--members", type=int, default=5000000)
+    parser.add_argument("--lookups", type=int, default=200000)
+    parser.add_argument("--tills", type=int, default=4)
+    parser.add_argument("--adds", type=int, default=1000, help="new members per till")
+    parser.add_argument("--overlap", type=int, default=200, help="numbers every till tries to add")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "loyalty.db")
+        start = time.perf_counter()
+        build(path, args.members)
+        print(f"built {args.members:,} members in {time.perf_counter() - start:.1f}s "
+              f"({os.path.getsize(path) / 1e6:,.0f} MB)")
+
+        start = time.perf_counter()
+        store = LoyaltyStore(path)
+        store.lookup("0700000000")
+        print(f"open + first lookup: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+        rng = random.Random(1)
+        probes = [member_mobile(rng.randrange(args.members * 2)) for _ in range(args.lookups)]
+        latencies = []
+        hits = 0
+        for mobile in probes:
+            t = time.perf_counter()
+            hits += store.lookup(mobile) is not None
+            latencies.append(time.perf_counter() - t)
+        latencies.sort()
+        print(f"{args.lookups:,} lookups ({hits:,} hits): p50 {percentile(latencies, 50) * 1e6:.1f} us, "
+              f"p99 {percentile(latencies, 99) * 1e6:.1f} us, max {latencies[-1] * 1e6:.0f} us")
+        store.close()
+
+        results = multiprocessing.Queue()
+        tills = [multiprocessing.Process(target=till, args=(path, n, args.adds, args.members, args.overlap, results))
+                 for n in range(args.tills)]
+        start = time.perf_counter()
+        for p in tills:
+            p.start()
+        outcomes = [results.get() for _ in tills]
+        for p in tills:
+            p.join()
+        elapsed = time.perf_counter() - start
+
+        added = sum(count for count, _ in outcomes)
+        latencies = sorted(v for _, values in outcomes for v in values)
+        expected = args.overlap + args.tills * args.adds
+        total = len(LoyaltyStore(path))
+        print(f"{args.tills} tills added {added:,} members in {elapsed:.1f}s "
+              f"({len(latencies) / elapsed:,.0f} adds/s): p50 {percentile(latencies, 50) * 1000:.2f} ms, "
+              f"p99 {percentile(latencies, 99) * 1000:.2f} ms")
+        assert added == expected, f"expected {expected} new members, got {added}"
+        assert total == args.members + expected, "member count does not match"
+        print(f"no duplicates: each of the {args.overlap} shared numbers was added exactly once")
@@ -0,0 +1,59 @@
+import argparse
+import random
+import time
+from decimal import Decimal
+
+import numpy as np
+
+from pricing import price_basket, price_batch
+
+
+def synthetic_baskets(count, seed=1):
+    rng = random.Random(seed)
+    baskets = []
+    for _ in range(count):
+        lines = [(f"item{rng.randrange(2000)}", Decimal(rng.randrange(50, 500000)) / 100, rng.randint(1, 12),
+                  rng.choice(("0", "0", "5", "10", "12.5", "33.33"))) for _ in range(rng.randint(1, 30))]
+        baskets.append((lines, rng.choice(("0", "0", "3", "7.5"))))
+    return baskets
+
+
+def to_arrays(baskets):
+    basket, prices, qtys, discounts, bill_discounts = [], [], [], [], []
+    for i, (lines, bill_discount) in enumerate(baskets):
+        for _, price, qty, discount in lines:
+            basket.append(i)
+            prices.append(float(price))
+            qtys.append(qty)
+            discounts.append(float(discount))
+        bill_discounts.append(float(bill_discount))
+    return (np.array(basket), np.array(prices), np.array(qtys), np.array(discounts), np.array(bill_discounts))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare Decimal basket pricing with the NumPy batch mode.")
+    parser.add_argument("--baskets", type=int, default=100000)
+    args = parser.parse_args()
+
+    baskets = synthetic_baskets(args.baskets)
+    arrays = to_arrays(baskets)
+    lines = len(arrays[0])
+
+    start = time.perf_counter()
+    exact = [price_basket(lines, bill_discount) for lines, bill_discount in baskets]
+    decimal_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    line_totals, totals, totals_after = price_batch(*arrays)
+    batch_s = time.perf_counter() - start
+
+    # The batch results must match the Decimal engine to the cent
+    expected_lines = [int(item[5] * 100) for items, _, _ in exact for item in items]
+    expected_after = [int(after * 100) for _, _, after in exact]
+    assert line_totals.tolist() == expected_lines, "line totals differ"
+    assert totals_after.tolist() == expected_after, "basket totals differ"
+
+    print(f"{args.baskets:,} baskets, {lines:,} lines")
+    print(f"Decimal, one basket at a time: {decimal_s:6.2f}s  {args.baskets / decimal_s:>12,.0f} baskets/s")
+    print(f"NumPy batch (int64 cents):     {batch_s:6.2f}s  {args.baskets / batch_s:>12,.0f} baskets/s")
+    print("batch results identical to Decimal pricing")
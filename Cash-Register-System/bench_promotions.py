@@ -0,0 +1,131 @@
+import argparse
+import datetime
+import random
+import time
+from decimal import Decimal
+
+from pricing import make_bill_item
+from promotions import LINE_RULES, PromotionBasket, PromotionEngine, is_active
+
+
+def synthetic_spec(items, categories, promotions, seed=1):
+    rng = random.Random(seed)
+    names = [f"item{i:05d}" for i in range(items)]
+    category_names = [f"cat{i:03d}" for i in range(categories)]
+    spec = {"categories": {category: [] for category in category_names}, "promotions": []}
+    for name in names:
+        spec["categories"][rng.choice(category_names)].append(name)
+    for i in range(promotions):
+        kind = rng.choice(("percent_off", "percent_off", "fixed_price", "multi_buy", "threshold"))
+        rule = {"id": f"P{i:05d}", "type": kind, "loyalty_only": rng.random() < 0.2}
+        if rng.random() < 0.1:
+            rule["end"] = "2020-12-31"  # expired, must be ignored
+        if kind == "threshold":
+            rule["min_total"] = rng.randrange(1000, 100000)
+            if rng.random() < 0.5:
+                rule["percent"] = rng.choice((2, 5, 10))
+            else:
+                rule["amount"] = rng.choice((100, 250, 500))
+        elif kind == "percent_off" and rng.random() < 0.02:
+            rule["categories"] = [rng.choice(category_names)]
+            rule["percent"] = rng.choice((5, 10, 15))
+        else:
+            rule["items"] = rng.sample(names, rng.randint(1, 5))
+            if kind == "percent_off":
+                rule["percent"] = rng.choice((5, 10, 12.5, 20, 25))
+            elif kind == "fixed_price":
+                rule["price"] = rng.randrange(50, 400)
+            else:
+                rule["buy"], rule["pay"] = rng.choice(((2, 1), (3, 2), (4, 3)))
+        spec["promotions"].append(rule)
+    return names, spec
+
+
+def naive_rules(spec, today):
+    # Reference: every active line rule with its targets, checked one by one per item
+    rules = []
+    for rule_spec in spec["promotions"]:
+        if rule_spec["type"] == "threshold" or not is_active(rule_spec, today):
+            continue
+        rule = LINE_RULES[rule_spec["type"]](rule_spec)
+        rule.loyalty_only = bool(rule_spec.get("loyalty_only"))
+        rules.append((set(rule_spec.get("items", [])), set(rule_spec.get("categories", [])), rule))
+    return rules
+
+
+def naive_line_saving(rules, category_of, items, loyalty):
+    quantities = {}
+    for name, price, qty, discount, _, _ in items:
+        if discount == 0:
+            quantities[name, price] = quantities.get((name, price), 0) + qty
+    saving = Decimal("0.00")
+    for (name, price), qty in quantities.items():
+        best = Decimal("0.00")
+        for targets, categories, rule in rules:
+            if name in targets or category_of.get(name) in categories:
+                if loyalty or not rule.loyalty_only:
+                    best = max(best, rule.saving(qty, price))
+        saving += best
+    return saving
+
+
+def random_basket(rng, names, lines):
+    return [make_bill_item(rng.choice(names), Decimal(rng.randrange(5000, 90000)) / 100, rng.randint(1, 8),
+                           rng.choice(("0", "0", "0", "0", "10"))) for _ in range(lines)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Promotion engine throughput with many active promotions.")
+    parser.add_argument("--items", type=int, default=50000)
+    parser.add_argument("--categories", type=int, default=200)
+    parser.add_argument("--promotions", type=int, default=10000)
+    parser.add_argument("--baskets", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=300, help="lines per basket")
+    args = parser.parse_args()
+
+    names, spec = synthetic_spec(args.items, args.categories, args.promotions)
+    start = time.perf_counter()
+    engine = PromotionEngine(spec)
+    print(f"compiled {args.promotions:,} promotions in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    rng = random.Random(2)
+    # Half the basket lines are items that have promotions, as on a busy promotion week
+    promoted = list(engine.by_item)
+    baskets = [random_basket(rng, promoted if i % 2 else names, args.lines) for i in range(args.baskets)]
+
+    start = time.perf_counter()
+    results = [engine.apply(basket, loyalty=i % 3 == 0) for i, basket in enumerate(baskets)]
+    elapsed = time.perf_counter() - start
+    applied = sum(len(result[0]) for result in results)
+    print(f"indexed: {args.baskets} baskets x {args.lines} lines in {elapsed * 1000:.0f} ms "
+          f"({args.baskets / elapsed:,.0f} baskets/s, {elapsed / args.baskets * 1000:.2f} ms/basket), "
+          f"{applied:,} promotions applied")
+
+    # The naive scan is slow, so it only checks a few baskets
+    rules = naive_rules(spec, datetime.date.today().isoformat())
+    thresholds = {rule["id"] for rule in spec["promotions"] if rule["type"] == "threshold"}
+    sample = min(5, args.baskets)
+    start = time.perf_counter()
+    for i in range(sample):
+        line_saving = naive_line_saving(rules, engine.item_category, baskets[i], loyalty=i % 3 == 0)
+        threshold_saving = sum(saving for rule_id, _, saving in results[i][0] if rule_id in thresholds)
+        assert line_saving + threshold_saving == results[i][1], f"basket {i} differs"
+    naive = (time.perf_counter() - start) / sample
+    print(f"naive scan of every rule per item: {naive * 1000:.0f} ms/basket "
+          f"({naive / (elapsed / args.baskets):,.0f}x slower), same savings")
+
+    # Scanning a bill line by line: the total shown after every line
+    bill = baskets[1]
+    start = time.perf_counter()
+    for end in range(1, len(bill) + 1):
+        engine.apply(bill[:end])
+    rescan = time.perf_counter() - start
+    start = time.perf_counter()
+    basket = PromotionBasket(engine)
+    for item in bill:
+        basket.add(item)
+        basket.saving()
+    running = time.perf_counter() - start
+    assert basket.saving() == engine.apply(bill)[1]
+    print(f"building a {len(bill)}-line bill: whole bill re-run per line {rescan * 1000:.1f} ms, "
+          f"running basket {running * 1000:.2f} ms ({rescan / running:,.0f}x)")
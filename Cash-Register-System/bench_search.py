@@ -0,0 +1,81 @@
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from catalog_index import CatalogIndex
+from catalog_store import CatalogStore
+
+WORDS = ["rice", "milk", "bread", "sugar", "tea", "soap", "salt", "flour", "noodles", "oil", "butter",
+         "cheese", "yogurt", "jam", "honey", "biscuits", "chocolate", "juice", "coffee", "eggs", "dhal",
+         "coconut", "chilli", "curry", "powder", "sauce", "paste", "shampoo", "detergent", "water"]
+BRANDS = ["keells", "elephant", "anchor", "maliban", "munchee", "prima", "harischandra", "sunlight",
+          "nestle", "highland", "kist", "motha", "dilmah", "astra", "raigam", "baby", "signal", "lux"]
+
+
+def synthetic_catalog(size, seed=1):
+    rng = random.Random(seed)
+    prices, barcodes = {}, {}
+    while len(prices) < size:
+        name = f"{rng.choice(BRANDS)} {rng.choice(WORDS)} {rng.choice(WORDS)} {rng.randint(1, 999)}g"
+        if name not in prices:
+            prices[name] = round(rng.uniform(20, 5000), 2)
+            barcodes[str(4790000000000 + len(prices))] = name
+    return prices, barcodes
+
+
+def typo(name, rng):
+    i = rng.randrange(1, len(name) - 1)
+    return name[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + name[i + 1:]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Per-keystroke search latency over a synthetic catalog.")
+    parser.add_argument('--items', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--typo-rate', type=float, default=0.2)
+    parser.add_argument('--store', action='store_true', help="search an items.db (as the tills do) instead of a dict")
+    args = parser.parse_args()
+
+    prices, barcodes = synthetic_catalog(args.items)
+    if args.store:
+        tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join(tmp.name, "items.txt"), "w") as f:
+            f.writelines(f"{name},{prices[name]},{code}\n" for code, name in barcodes.items())
+        store = CatalogStore(os.path.join(tmp.name, "items.db"))
+        store.import_text(os.path.join(tmp.name, "items.txt"))
+        start = time.perf_counter()
+        index = CatalogIndex(store, store.barcodes)
+    else:
+        start = time.perf_counter()
+        index = CatalogIndex(prices, barcodes)
+    print(f"built index over {len(prices):,} items in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    rng = random.Random(2)
+    names = list(prices)
+    keystrokes = []
+    for _ in range(args.queries):
+        name = rng.choice(names)
+        if rng.random() < args.typo_rate:
+            name = typo(name, rng)
+        # The till searches after every key release
+        for i in range(1, len(name) + 1):
+            start = time.perf_counter()
+            index.search(name[:i])
+            keystrokes.append(time.perf_counter() - start)
+
+    codes = list(barcodes)
+    scans = []
+    for _ in range(args.queries):
+        code = rng.choice(codes)
+        start = time.perf_counter()
+        index.resolve(code)
+        scans.append(time.perf_counter() - start)
+
+    keystrokes.sort()
+    print(f"{len(keystrokes):,} keystrokes: mean {statistics.mean(keystrokes) * 1e6:.0f} us, "
+          f"p50 {keystrokes[len(keystrokes) // 2] * 1e6:.0f} us, "
+          f"p99 {keystrokes[int(len(keystrokes) * 0.99)] * 1e6:.0f} us, max {keystrokes[-1] * 1e6:.0f} us")
+    print(f"{len(scans):,} barcode lookups: mean {statistics.mean(scans) * 1e6:.2f} us")
@@ -0,0 +1,119 @@
+import tkinter as tk
+
+
+def format_bill_line(item):
+    return (f"{item[0]:<15} {item[1]:>6.2f} LKR  Qty:{item[2]:<3}  Disc:{item[3]:>5.1f}%  "
+            f"Price after disc: {item[4]:>6.2f}  Line Total: LKR {item[5]:.2f}")
+
+
+class BillView:
+    """Scrollable bill display that only keeps the visible rows in the Text widget.
+
+    Lines live in ``self.lines``; the Text widget shows ``height`` of them
+    starting at ``self.top``. Appending while the view follows the end of the
+    bill drops the top row and adds the new one, editing a line rewrites just
+    that row, and scrolling or removing a line redraws at most one screenful,
+    so the cost of a scan does not grow with the length of the bill.
+    """
+
+    def __init__(self, parent, height=15, width=60, font=("Courier", 12)):
+        self.height = height
+        self.lines = []
+        self.top = 0
+        self.selected = None
+
+        self.frame = tk.Frame(parent)
+        self.text = tk.Text(self.frame, height=height, width=width, font=font, wrap="none")
+        self.scrollbar = tk.Scrollbar(self.frame, command=self.on_scroll)
+        self.text.pack(side=tk.LEFT)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text.tag_configure("selected", background="#cce5ff")
+        self.text.bind("<Key>", lambda e: "break")
+        self.text.bind("<Button-1>", self.on_click)
+        self.text.bind("<MouseWheel>", self.on_wheel)
+        self.text.bind("<Button-4>", lambda e: self.scroll_to(self.top - 3))
+        self.text.bind("<Button-5>", lambda e: self.scroll_to(self.top + 3))
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def _following_end(self):
+        return self.top + self.height >= len(self.lines)
+
+    def _update_scrollbar(self):
+        count = max(len(self.lines), 1)
+        self.scrollbar.set(self.top / count, min(self.top + self.height, count) / count)
+
+    def _redraw(self):
+        self.text.delete(1.0, tk.END)
+        self.text.insert(tk.END, "\n".join(self.lines[self.top:self.top + self.height]))
+        self._show_selection()
+        self._update_scrollbar()
+
+    def append(self, line):
+        following = self._following_end()
+        self.lines.append(line)
+        if not following:
+            self.scroll_to(len(self.lines) - self.height)
+            return
+        if len(self.lines) - self.top > self.height:
+            self.text.delete(1.0, 2.0)
+            self.top += 1
+        shown = len(self.lines) - 1 - self.top
+        self.text.insert("end-1c", "\n" + line if shown else line)
+        self._update_scrollbar()
+
+    def update(self, index, line):
+        self.lines[index] = line
+        row = index - self.top
+        if 0 <= row < self.height:
+            self.text.delete(f"{row + 1}.0", f"{row + 1}.end")
+            self.text.insert(f"{row + 1}.0", line)
+            self._show_selection()
+
+    def remove(self, index):
+        del self.lines[index]
+        self.selected = None
+        self.top = max(0, min(self.top, len(self.lines) - self.height))
+        self._redraw()
+
+    def clear(self):
+        self.lines = []
+        self.top = 0
+        self.selected = None
+        self._redraw()
+
+    def scroll_to(self, top):
+        top = max(0, min(top, len(self.lines) - self.height))
+        if top != self.top:
+            self.top = top
+            self._redraw()
+
+    def on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * len(self.lines)))
+        elif unit == "pages":
+            self.scroll_to(self.top + int(amount) * self.height)
+        else:
+            self.scroll_to(self.top + int(amount))
+
+    def on_wheel(self, event):
+        self.scroll_to(self.top - (1 if event.delta > 0 else -1) * 3)
+
+    def on_click(self, event):
+        row = int(self.text.index(f"@{event.x},{event.y}").split(".")[0]) - 1
+        index = self.top + row
+        self.selected = index if index < len(self.lines) else None
+        self._show_selection()
+        return "break"
+
+    def _show_selection(self):
+        self.text.tag_remove("selected", 1.0, tk.END)
+        if self.selected is not None:
+            row = self.selected - self.top
+            if 0 <= row < self.height:
+                self.text.tag_add("selected", f"{row + 1}.0", f"{row + 1}.end")
+
+    def selected_index(self):
+        # Bill line last clicked on, or None
+        return self.selected
@@ -0,0 +1,117 @@
+from bisect import bisect_left
+
+
+class _SortedNames:
+    # names_from() over a plain dict of prices, from a sorted copy of its keys
+    def __init__(self, prices):
+        self.names = sorted(prices)
+
+    def names_from(self, start, limit):
+        i = bisect_left(self.names, start)
+        return self.names[i:i + limit]
+
+
+class CatalogIndex:
+    """Search index over the item catalog.
+
+    Every lookup is "the first few names at or after this text" in name
+    order: a prefix's matches are the names that follow it, and a prefix
+    exists if the first of them starts with it. A CatalogStore answers
+    that off its primary key, so nothing is loaded and opening the index
+    costs the same however large the catalog is; a plain dict is sorted
+    once. When nothing starts with the typed text, single-edit variants
+    of it (substitution, transposition, deletion, insertion) are tried as
+    prefixes instead, so one typo still finds the item. Barcodes/SKUs
+    resolve through ``barcodes``.
+    """
+
+    def __init__(self, prices, barcodes=None):
+        # prices and barcodes only need `in`/`get`, so a CatalogStore works as well as dicts
+        self.prices = prices
+        self.barcodes = barcodes if barcodes is not None else {}
+        self.refresh()
+
+    def refresh(self):
+        # A store reads names live; a dict's sorted copy is rebuilt after items were added or removed
+        if hasattr(self.prices, "names_from"):
+            self.names_from = self.prices.names_from
+        else:
+            self.names_from = _SortedNames(self.prices).names_from
+
+    def resolve(self, text):
+        # Exact item name or barcode -> item name, else None
+        text = text.strip().lower()
+        if text in self.prices:
+            return text
+        return self.barcodes.get(text)
+
+    def _prefix_matches(self, prefix, limit, found):
+        # found holds at most limit names, so limit rows always cover the ones still missing
+        for name in self.names_from(prefix, limit):
+            if len(found) >= limit or not name.startswith(prefix):
+                break
+            if name not in found:
+                found[name] = None
+
+    def _has_prefix(self, prefix):
+        first = self.names_from(prefix, 1)
+        return bool(first) and first[0].startswith(prefix)
+
+    def _matched_length(self, text):
+        # Length of the longest prefix of text that some item starts with
+        lo, hi = 0, len(text)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self._has_prefix(text[:mid]):
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    def _next_chars(self, prefix):
+        # Distinct characters that follow prefix in the catalog, one lookup each
+        n = len(prefix)
+        start = prefix
+        while True:
+            first = self.names_from(start, 1)
+            if not first or not first[0].startswith(prefix):
+                return
+            if len(first[0]) > n:
+                c = first[0][n]
+                yield c
+                start = prefix + chr(ord(c) + 1)
+            else:
+                # The prefix is itself an item name; every longer name sorts after prefix + "\0"
+                start = prefix + "\0"
+
+    def _edits(self, text, matched):
+        # An edit after the first unmatched character cannot produce a match,
+        # so only positions up to it are tried, nearest first, and only with
+        # characters that actually occur there in the catalog.
+        for i in range(matched, -1, -1):
+            head = text[:i]
+            yield head + text[i + 1:]
+            if i + 1 < len(text):
+                yield head + text[i + 1] + text[i] + text[i + 2:]
+            for c in self._next_chars(head):
+                if c != text[i]:
+                    yield head + c + text[i + 1:]
+                yield head + c + text[i:]
+
+    def search(self, text, limit=8, fuzzy_from=3):
+        """Ranked matches: barcode or exact name, then prefix matches, then one-typo matches."""
+        text = text.strip().lower()
+        if not text:
+            return []
+        found = {}
+        exact = self.resolve(text)
+        if exact:
+            found[exact] = None
+        self._prefix_matches(text, limit, found)
+        if not found and len(text) >= fuzzy_from:
+            matched = self._matched_length(text)
+            for variant in self._edits(text, matched):
+                self._prefix_matches(variant, limit, found)
+                if len(found) >= limit:
+                    break
+        return list(found)
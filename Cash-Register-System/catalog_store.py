@@ -0,0 +1,208 @@
+import argparse
+import math
+import os
+import sqlite3
+
+DB_FILE = "items.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    name TEXT PRIMARY KEY,
+    price REAL NOT NULL,
+    barcode TEXT UNIQUE
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def parse_item_line(line):
+    """Validate one ``name,price[,barcode]`` line, returning (name, price, barcode).
+
+    Raises ValueError with a short reason for rows that should be skipped.
+    """
+    fields = [field.strip() for field in line.strip().split(",")]
+    if len(fields) not in (2, 3):
+        raise ValueError(f"expected name,price[,barcode], got {len(fields)} field(s)")
+    name = fields[0].lower()
+    if not name:
+        raise ValueError("empty item name")
+    try:
+        price = float(fields[1])
+    except ValueError:
+        raise ValueError(f"bad price {fields[1]!r}") from None
+    if not math.isfinite(price) or price < 0:
+        raise ValueError(f"bad price {fields[1]!r}")
+    barcode = fields[2] if len(fields) == 3 and fields[2] else None
+    return name, price, barcode
+
+
+class CatalogStore:
+    """Item catalog kept in SQLite and read on demand.
+
+    Nothing is loaded up front: a price is one primary-key lookup, so opening
+    the catalog costs the same however many items it holds. The store acts
+    as a read-only mapping of item name -> price (iteration is in name order,
+    straight off the primary key) and ``barcodes`` maps barcode -> item name,
+    so it drops in where the old items dict was used.
+
+    Prices can be changed while tills are running (``set_price``, the
+    ``catalog_store.py`` command line, or re-importing items.txt); each till
+    polls ``changed()``, which compares SQLite's data_version, to notice.
+    """
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.barcodes = _Barcodes(self.conn)
+        self._data_version = self._current_data_version()
+
+    def close(self):
+        self.conn.close()
+
+    # -- mapping of name -> price --
+
+    def __getitem__(self, name):
+        row = self.conn.execute("SELECT price FROM items WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        return row[0]
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def __contains__(self, name):
+        return self.conn.execute("SELECT 1 FROM items WHERE name = ?", (name,)).fetchone() is not None
+
+    def __iter__(self):
+        return (row[0] for row in self.conn.execute("SELECT name FROM items ORDER BY name"))
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def names_from(self, start, limit):
+        """Up to limit item names >= start, in name order, read off the primary key."""
+        return [row[0] for row in self.conn.execute("SELECT name FROM items WHERE name >= ? ORDER BY name LIMIT ?",
+                                                    (start, limit))]
+
+    # -- updates --
+
+    def set_price(self, name, price, barcode=None):
+        name = name.strip().lower()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            # As in import_text, a barcode given to this item is taken off any other
+            if barcode is not None:
+                self.conn.execute("UPDATE items SET barcode = NULL WHERE barcode = ? AND name != ?", (barcode, name))
+            self.conn.execute(
+                "INSERT INTO items (name, price, barcode) VALUES (?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET price = excluded.price, "
+                "barcode = COALESCE(excluded.barcode, items.barcode)",
+                (name, price, barcode))
+
+    def remove(self, name):
+        self.conn.execute("DELETE FROM items WHERE name = ?", (name.strip().lower(),))
+
+    def import_text(self, path):
+        """Load a name,price[,barcode] file in one transaction; bad rows are skipped.
+
+        Returns (imported, skipped) where skipped lists (line number, reason).
+        The file is the whole catalog: items no longer in it are removed and
+        each item gets the barcode its line gives, or none. An item whose
+        line was skipped keeps its current price rather than being removed.
+        """
+        rows, skipped, kept = [], [], set()
+        with open(path, "r") as f:
+            for lineno, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    rows.append(parse_item_line(line))
+                except ValueError as e:
+                    skipped.append((lineno, str(e)))
+                    kept.add(line.split(",", 1)[0].strip().lower())
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS imported (name TEXT PRIMARY KEY) WITHOUT ROWID")
+            self.conn.execute("DELETE FROM temp.imported")
+            self.conn.executemany("INSERT OR IGNORE INTO temp.imported (name) VALUES (?)",
+                                  [(row[0],) for row in rows] + [(name,) for name in kept])
+            self.conn.execute("DELETE FROM items WHERE name NOT IN (SELECT name FROM temp.imported)")
+            for name, price, barcode in rows:
+                # A barcode moved to another item is released from the old one first
+                if barcode is not None:
+                    self.conn.execute("UPDATE items SET barcode = NULL WHERE barcode = ? AND name != ?",
+                                      (barcode, name))
+                self.conn.execute(
+                    "INSERT INTO items (name, price, barcode) VALUES (?, ?, ?) "
+                    "ON CONFLICT (name) DO UPDATE SET price = excluded.price, barcode = excluded.barcode",
+                    (name, price, barcode))
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('source_mtime', ?)",
+                              (str(os.path.getmtime(path)),))
+        return len(rows), skipped
+
+    def sync_text(self, path):
+        # Re-import the text file if it changed since the last import; None if nothing to do
+        if not os.path.exists(path):
+            return None
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'source_mtime'").fetchone()
+        if row is not None and float(row[0]) == os.path.getmtime(path):
+            return None
+        return self.import_text(path)
+
+    # -- change detection --
+
+    def _current_data_version(self):
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def changed(self):
+        """True once after another connection (another till, the CLI) commits a change."""
+        version = self._current_data_version()
+        if version == self._data_version:
+            return False
+        self._data_version = version
+        return True
+
+
+class _Barcodes:
+    # barcode -> item name, looked up in SQLite
+    def __init__(self, conn):
+        self.conn = conn
+
+    def get(self, barcode, default=None):
+        row = self.conn.execute("SELECT name FROM items WHERE barcode = ?", (barcode,)).fetchone()
+        return row[0] if row else default
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the POS item catalog; running tills pick up changes live.")
+    parser.add_argument("--db", default=DB_FILE)
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_cmd = commands.add_parser("import", help="load a name,price[,barcode] text file")
+    import_cmd.add_argument("file")
+    price_cmd = commands.add_parser("set-price", help="add an item or change its price")
+    price_cmd.add_argument("name")
+    price_cmd.add_argument("price", type=float)
+    price_cmd.add_argument("--barcode")
+    remove_cmd = commands.add_parser("remove", help="delete an item")
+    remove_cmd.add_argument("name")
+    args = parser.parse_args()
+
+    store = CatalogStore(args.db)
+    if args.command == "import":
+        imported, skipped = store.import_text(args.file)
+        for lineno, reason in skipped:
+            print(f"{args.file}:{lineno}: skipped, {reason}")
+        print(f"Imported {imported} item(s), skipped {len(skipped)}")
+    elif args.command == "set-price":
+        store.set_price(args.name, args.price, args.barcode)
+    else:
+        store.remove(args.name)
+    store.close()
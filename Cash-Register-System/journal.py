@@ -0,0 +1,256 @@
+import argparse
+import datetime
+import os
+import queue
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import Future
+from decimal import Decimal
+
+DB_FILE = "sales.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sales (
+    bill_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    customer_mobile TEXT NOT NULL,
+    customer_name TEXT NOT NULL,
+    total REAL NOT NULL,
+    discount_pct REAL NOT NULL,
+    total_after_discount REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sale_lines (
+    bill_id TEXT NOT NULL REFERENCES sales (bill_id),
+    line_no INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    price REAL NOT NULL,
+    qty INTEGER NOT NULL,
+    discount_pct REAL NOT NULL,
+    discounted_price REAL NOT NULL,
+    line_total REAL NOT NULL,
+    PRIMARY KEY (bill_id, line_no)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sale_promotions (
+    bill_id TEXT NOT NULL REFERENCES sales (bill_id),
+    promo_no INTEGER NOT NULL,
+    promo_id TEXT NOT NULL,
+    description TEXT NOT NULL,
+    saving REAL NOT NULL,
+    PRIMARY KEY (bill_id, promo_no)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sales_created_at ON sales (created_at);
+"""
+# sales keeps its rowid: commits are serialised, so rowid order is commit
+# order and readers such as analytics.py can resume from the last one seen.
+
+_STOP = object()
+
+# Amounts from pricing.py are Decimals; bound as text, the REAL columns'
+# affinity stores them as numbers
+sqlite3.register_adapter(Decimal, str)
+
+
+def new_bill_id(now):
+    # Timestamp for readability plus a random suffix, so two tills (or two
+    # checkouts in the same second) never share an ID
+    return f"{now:%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+
+def make_sale(items, total, discount_pct, total_after_discount, customer_mobile="", customer_name="Guest",
+              now=None, promotions=()):
+    """Sale record for the journal; items are bill-item tuples from make_bill_item.
+
+    promotions lists the (rule id, description, saving) applied to the bill.
+    """
+    now = now or datetime.datetime.now()
+    return {
+        "bill_id": new_bill_id(now),
+        "created_at": now.strftime("%Y-%m-%d %H:%M:%S"),
+        "customer_mobile": customer_mobile,
+        "customer_name": customer_name,
+        "items": [tuple(item) for item in items],
+        "total": total,
+        "discount_pct": discount_pct,
+        "total_after_discount": total_after_discount,
+        "promotions": [tuple(promotion) for promotion in promotions],
+    }
+
+
+def render_receipt(sale):
+    """The printable receipt text for a sale record."""
+    bill_text = "===== Grocery Bill =====\n"
+    bill_text += f"Bill: {sale['bill_id']}\n"
+    bill_text += f"Date: {sale['created_at']}\n"
+    bill_text += f"Customer: {sale['customer_name']}\n\n"
+    bill_text += f"{'Item':<15}{'Price':>8}{'Qty':>5}{'Disc%':>7}{'Price After Disc':>18}{'Total':>10}\n"
+    bill_text += "-"*70 + "\n"
+    for item in sale["items"]:
+        bill_text += f"{item[0]:<15}{item[1]:>8.2f}{item[2]:>5}{item[3]:>7.1f}{item[4]:>18.2f}{item[5]:>10.2f}\n"
+    bill_text += "-"*70 + "\n"
+    if sale.get("promotions"):
+        bill_text += "Promotions:\n"
+        for _, description, saving in sale["promotions"]:
+            bill_text += f"  {description:<56}{-saving:>12.2f}\n"
+    bill_text += f"Total Before Discount: LKR {sale['total']:.2f}\n"
+    bill_text += f"Total Discount: {sale['discount_pct']}%\n"
+    bill_text += f"Total After Discount: LKR {sale['total_after_discount']:.2f}\n"
+    bill_text += "=======================\n"
+    return bill_text
+
+
+class SalesJournal:
+    """Durable record of finished sales in SQLite (WAL).
+
+    ``record`` hands the sale to a background writer thread and returns a
+    Future straight away, so the till never waits on the disk. The writer
+    commits whatever has queued up in one transaction (one fsync per batch)
+    and only then resolves the futures: a sale whose future has completed
+    survives a crash or power cut. Receipts are rendered from the stored
+    records on demand rather than written out as separate files.
+    """
+
+    def __init__(self, path=DB_FILE, max_batch=256, synchronous="FULL"):
+        self.path = path
+        self.max_batch = max_batch
+        self.synchronous = synchronous
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.close()
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="sales-journal", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
+
+    def record(self, sale):
+        future = Future()
+        self._queue.put((sale, future))
+        return future
+
+    def close(self):
+        # Flushes everything already recorded before returning
+        self._queue.put(_STOP)
+        self._writer.join()
+
+    def _write_loop(self):
+        conn = self._connect()
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                stopping = True
+                batch = [entry for entry in batch if entry is not _STOP]
+            if batch:
+                self._commit(conn, batch)
+        conn.close()
+
+    def _commit(self, conn, batch):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for sale, _ in batch:
+                self._insert(conn, sale)
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            # Commit the sales one at a time so one bad record fails alone
+            for sale, future in batch:
+                try:
+                    with conn:
+                        conn.execute("BEGIN IMMEDIATE")
+                        self._insert(conn, sale)
+                except sqlite3.Error as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(sale["bill_id"])
+            return
+        for sale, future in batch:
+            future.set_result(sale["bill_id"])
+
+    @staticmethod
+    def _insert(conn, sale):
+        conn.execute("INSERT INTO sales (bill_id, created_at, customer_mobile, customer_name, total, "
+                     "discount_pct, total_after_discount) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     (sale["bill_id"], sale["created_at"], sale["customer_mobile"], sale["customer_name"],
+                      sale["total"], sale["discount_pct"], sale["total_after_discount"]))
+        conn.executemany("INSERT INTO sale_lines (bill_id, line_no, name, price, qty, discount_pct, "
+                         "discounted_price, line_total) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         [(sale["bill_id"], line_no) + tuple(item)
+                          for line_no, item in enumerate(sale["items"], 1)])
+        conn.executemany("INSERT INTO sale_promotions (bill_id, promo_no, promo_id, description, saving) "
+                         "VALUES (?, ?, ?, ?, ?)",
+                         [(sale["bill_id"], promo_no) + tuple(promotion)
+                          for promo_no, promotion in enumerate(sale.get("promotions", ()), 1)])
+
+    # -- reading back --
+
+    def get(self, bill_id):
+        conn = sqlite3.connect(self.path)
+        try:
+            row = conn.execute("SELECT bill_id, created_at, customer_mobile, customer_name, total, discount_pct, "
+                               "total_after_discount FROM sales WHERE bill_id = ?", (bill_id,)).fetchone()
+            if row is None:
+                return None
+            sale = dict(zip(("bill_id", "created_at", "customer_mobile", "customer_name", "total",
+                             "discount_pct", "total_after_discount"), row))
+            sale["items"] = conn.execute("SELECT name, price, qty, discount_pct, discounted_price, line_total "
+                                         "FROM sale_lines WHERE bill_id = ? ORDER BY line_no",
+                                         (bill_id,)).fetchall()
+            sale["promotions"] = conn.execute("SELECT promo_id, description, saving FROM sale_promotions "
+                                              "WHERE bill_id = ? ORDER BY promo_no", (bill_id,)).fetchall()
+            return sale
+        finally:
+            conn.close()
+
+    def bill_ids(self, day=None):
+        conn = sqlite3.connect(self.path)
+        try:
+            if day:
+                rows = conn.execute("SELECT bill_id FROM sales WHERE created_at >= ? AND created_at < ? "
+                                    "ORDER BY created_at", (day, day + "\x7f"))
+            else:
+                rows = conn.execute("SELECT bill_id FROM sales ORDER BY created_at")
+            return [row[0] for row in rows]
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show or export receipts from the sales journal.")
+    parser.add_argument("--db", default=DB_FILE)
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_cmd = commands.add_parser("list", help="list bill IDs")
+    list_cmd.add_argument("--day", help="YYYY-MM-DD")
+    show_cmd = commands.add_parser("show", help="print a receipt")
+    show_cmd.add_argument("bill_id")
+    export_cmd = commands.add_parser("export", help="write receipts as text files")
+    export_cmd.add_argument("--day", help="YYYY-MM-DD")
+    export_cmd.add_argument("--dir", default="bills")
+    args = parser.parse_args()
+
+    journal = SalesJournal(args.db)
+    if args.command == "list":
+        print("\n".join(journal.bill_ids(args.day)))
+    elif args.command == "show":
+        sale = journal.get(args.bill_id)
+        if sale is None:
+            raise SystemExit(f"no bill {args.bill_id}")
+        print(render_receipt(sale), end="")
+    else:
+        os.makedirs(args.dir, exist_ok=True)
+        bill_ids = journal.bill_ids(args.day)
+        for bill_id in bill_ids:
+            with open(os.path.join(args.dir, f"bill_{bill_id}.txt"), "w") as f:
+                f.write(render_receipt(journal.get(bill_id)))
+        print(f"Exported {len(bill_ids)} receipt(s) to {args.dir}")
+    journal.close()
@@ -0,0 +1,141 @@
+import argparse
+import re
+import sqlite3
+
+DB_FILE = "loyalty.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS members (
+    mobile TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    joined_at TEXT NOT NULL DEFAULT (datetime('now', 'localtime'))
+) WITHOUT ROWID;
+"""
+
+_SEPARATORS = re.compile(r"[\s\-().]")
+
+
+def normalize_mobile(text):
+    """Canonical 0XXXXXXXXX form of a Sri Lankan mobile number.
+
+    Accepts spaces, dashes, dots and brackets and the +94 / 0094 / 94
+    country-code forms, so "+94 77 123 4567" and "0771234567" are the same
+    member. Raises ValueError for anything that is not a 10-digit number.
+    """
+    digits = _SEPARATORS.sub("", text.strip())
+    if digits.startswith("+"):
+        digits = digits[1:]
+        if not digits.startswith("94"):
+            raise ValueError(f"not a Sri Lankan number: {text!r}")
+    if digits.startswith("0094"):
+        digits = digits[4:]
+    elif digits.startswith("94") and len(digits) == 11:
+        digits = digits[2:]
+    if len(digits) == 9:
+        digits = "0" + digits
+    if len(digits) != 10 or not digits.isdigit() or digits[0] != "0":
+        raise ValueError(f"invalid mobile number: {text!r}")
+    return digits
+
+
+class LoyaltyStore:
+    """Loyalty members in SQLite (WAL), keyed by normalized mobile number.
+
+    A lookup is one primary-key probe and nothing is loaded at startup, so
+    neither grows with the member base. Tills may add members at the same
+    time: each add is its own short transaction, SQLite serialises the
+    writers (waiting up to ``busy_timeout`` ms for the lock), and the primary
+    key makes "add unless already a member" atomic.
+    """
+
+    def __init__(self, path=DB_FILE, busy_timeout=5000):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=busy_timeout / 1000, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def lookup(self, mobile):
+        """Member name for a mobile number in any accepted format, or None."""
+        try:
+            mobile = normalize_mobile(mobile)
+        except ValueError:
+            return None
+        row = self.conn.execute("SELECT name FROM members WHERE mobile = ?", (mobile,)).fetchone()
+        return row[0] if row else None
+
+    def add(self, mobile, name):
+        """Register a member; False if the number is already registered.
+
+        Raises ValueError for an invalid number or an empty name.
+        """
+        mobile = normalize_mobile(mobile)
+        name = name.strip()
+        if not name:
+            raise ValueError("empty name")
+        cursor = self.conn.execute("INSERT INTO members (mobile, name) VALUES (?, ?) ON CONFLICT (mobile) DO NOTHING",
+                                   (mobile, name))
+        return cursor.rowcount == 1
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM members").fetchone()[0]
+
+    def is_empty(self):
+        return self.conn.execute("SELECT 1 FROM members LIMIT 1").fetchone() is None
+
+    def add_many(self, rows):
+        """Bulk-add (mobile, name) pairs in one transaction.
+
+        Returns (added, duplicates, invalid); a number already registered or
+        repeated in ``rows`` counts as a duplicate and keeps its first name.
+        """
+        added = duplicates = invalid = 0
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            for mobile, name in rows:
+                try:
+                    mobile = normalize_mobile(mobile)
+                except ValueError:
+                    invalid += 1
+                    continue
+                if not name.strip():
+                    invalid += 1
+                    continue
+                cursor = self.conn.execute("INSERT INTO members (mobile, name) VALUES (?, ?) "
+                                           "ON CONFLICT (mobile) DO NOTHING", (mobile, name.strip()))
+                if cursor.rowcount == 1:
+                    added += 1
+                else:
+                    duplicates += 1
+        return added, duplicates, invalid
+
+    def import_text(self, path):
+        # customers.txt layout: mobile,name per line
+        def rows():
+            with open(path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        mobile, _, name = line.strip().partition(",")
+                        yield mobile, name
+        return self.add_many(rows())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage loyalty members.")
+    parser.add_argument("--db", default=DB_FILE)
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_cmd = commands.add_parser("import", help="load a mobile,name text file")
+    import_cmd.add_argument("file")
+    lookup_cmd = commands.add_parser("lookup")
+    lookup_cmd.add_argument("mobile")
+    args = parser.parse_args()
+
+    store = LoyaltyStore(args.db)
+    if args.command == "import":
+        added, duplicates, invalid = store.import_text(args.file)
+        print(f"Added {added:,} member(s); {duplicates:,} duplicate(s), {invalid:,} invalid")
+    else:
+        print(store.lookup(args.mobile) or "(not a member)")
+    store.close()
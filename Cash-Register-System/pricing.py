@@ -0,0 +1,91 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+CENT = Decimal("0.01")
+HUNDRED = Decimal(100)
+ZERO = Decimal("0.00")
+
+
+def to_money(value):
+    """Decimal amount rounded half-up to cents; floats go through str so 0.1 stays 0.1."""
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return value.quantize(CENT, ROUND_HALF_UP)
+
+
+def parse_percent(text):
+    """Discount percentage 0-100 with at most two decimals; ValueError otherwise."""
+    try:
+        pct = Decimal(str(text).strip())
+    except ArithmeticError:
+        raise ValueError(f"bad discount {text!r}") from None
+    if not pct.is_finite() or pct < 0 or pct > 100 or pct != pct.quantize(CENT):
+        raise ValueError(f"bad discount {text!r}")
+    return pct
+
+
+def discounted(amount, pct):
+    return to_money(amount * (HUNDRED - pct) / HUNDRED)
+
+
+def make_bill_item(name, price, qty, discount):
+    """Bill line tuple (name, price, qty, discount %, discounted price, line total).
+
+    The discounted unit price is rounded to cents first and the line total is
+    that times the quantity, so the printed columns always multiply out.
+    """
+    price = to_money(price)
+    discount = parse_percent(discount)
+    discounted_price = discounted(price, discount)
+    return (name, price, qty, discount, discounted_price, discounted_price * qty)
+
+
+def bill_totals(items, bill_discount, promotion_saving=ZERO):
+    """(total, total after promotions and the whole-bill discount) for a list of bill items."""
+    total = sum((item[5] for item in items), ZERO)
+    return total, discounted(total - promotion_saving, parse_percent(bill_discount))
+
+
+def price_basket(lines, bill_discount=0):
+    """Price (name, price, qty, discount %) lines; returns (items, total, total after discount)."""
+    items = [make_bill_item(*line) for line in lines]
+    total, total_after_discount = bill_totals(items, bill_discount)
+    return items, total, total_after_discount
+
+
+# -- batch mode --
+
+def to_cents(values):
+    # Money or percentages (two decimals at most) as exact int64 hundredths
+    return np.rint(np.asarray(values, dtype=np.float64) * 100).astype(np.int64)
+
+
+def _discount_cents(cents, pct_hundredths):
+    # Half-up rounding of cents * (100 - pct) / 100 in integers, matching to_money
+    numerator = cents * (10000 - pct_hundredths)
+    return (numerator * 2 + 10000) // 20000
+
+
+def price_batch(basket, prices, qtys, discounts, bill_discounts):
+    """Reprice many baskets at once in integer cents.
+
+    ``basket``, ``prices``, ``qtys`` and ``discounts`` describe one bill line
+    per element, with ``basket`` the basket index of each line
+    (non-decreasing, starting at 0). ``bill_discounts`` has one whole-bill
+    discount per basket. Prices are in LKR and discounts in percent, both
+    with at most two decimals, which is all the till accepts.
+
+    Returns (line totals, basket totals, basket totals after discount) as
+    int64 cents, identical to what make_bill_item/bill_totals give one
+    basket at a time.
+    """
+    basket = np.asarray(basket, dtype=np.int64)
+    qtys = np.asarray(qtys, dtype=np.int64)
+    line_totals = _discount_cents(to_cents(prices), to_cents(discounts)) * qtys
+    bill_discounts = to_cents(bill_discounts)
+    totals = np.zeros(len(bill_discounts), dtype=np.int64)
+    if len(basket):
+        starts = np.flatnonzero(np.r_[True, basket[1:] != basket[:-1]])
+        totals[basket[starts]] = np.add.reduceat(line_totals, starts)
+    return line_totals, totals, _discount_cents(totals, bill_discounts)
@@ -0,0 +1,261 @@
+import bisect
+import datetime
+import json
+import os
+
+from pricing import ZERO, discounted, parse_percent, to_money
+
+PROMOTIONS_FILE = "promotions.json"
+
+# promotions.json:
+# {"categories": {"dairy": ["milk", "cheese"]},
+#  "promotions": [
+#   {"id": "D10", "type": "percent_off", "categories": ["dairy"], "percent": 10},
+#   {"id": "M200", "type": "fixed_price", "items": ["milk"], "price": 200, "loyalty_only": true},
+#   {"id": "S32", "type": "multi_buy", "items": ["soap"], "buy": 3, "pay": 2, "end": "2025-12-31"},
+#   {"id": "T5K", "type": "threshold", "min_total": 5000, "percent": 5}]}
+# Threshold rules take "percent" or "amount"; "start"/"end" dates are optional.
+
+
+class _PercentOff:
+    __slots__ = ("id", "description", "loyalty_only", "pct")
+
+    def __init__(self, spec):
+        self.pct = parse_percent(spec["percent"])
+
+    def saving(self, qty, price):
+        return (price - discounted(price, self.pct)) * qty
+
+
+class _FixedPrice:
+    __slots__ = ("id", "description", "loyalty_only", "price")
+
+    def __init__(self, spec):
+        self.price = to_money(spec["price"])
+
+    def saving(self, qty, price):
+        return max(price - self.price, ZERO) * qty
+
+
+class _MultiBuy:
+    # "buy 3, pay for 2": every complete group of `buy` units has `buy - pay` free units
+    __slots__ = ("id", "description", "loyalty_only", "buy", "pay")
+
+    def __init__(self, spec):
+        self.buy = int(spec["buy"])
+        self.pay = int(spec["pay"])
+        if not 0 <= self.pay < self.buy:
+            raise ValueError("multi_buy needs 0 <= pay < buy")
+
+    def saving(self, qty, price):
+        return (qty // self.buy) * (self.buy - self.pay) * price
+
+
+LINE_RULES = {"percent_off": _PercentOff, "fixed_price": _FixedPrice, "multi_buy": _MultiBuy}
+
+
+def _describe(spec):
+    kind = spec["type"]
+    if kind == "percent_off":
+        text = f"{spec['percent']}% off"
+    elif kind == "fixed_price":
+        text = f"now LKR {to_money(spec['price'])}"
+    elif kind == "multi_buy":
+        text = f"buy {spec['buy']} pay {spec['pay']}"
+    elif "percent" in spec:
+        text = f"{spec['percent']}% off bills over LKR {to_money(spec['min_total'])}"
+    else:
+        text = f"LKR {to_money(spec['amount'])} off bills over LKR {to_money(spec['min_total'])}"
+    if spec.get("loyalty_only"):
+        text += " (loyalty)"
+    return spec.get("description") or text
+
+
+def is_active(spec, today):
+    start, end = spec.get("start"), spec.get("end")
+    return (start is None or start <= today) and (end is None or today <= end)
+
+
+class PromotionEngine:
+    """Active promotions compiled for fast basket evaluation.
+
+    Line promotions (percent off, fixed price, multi-buy) are indexed by
+    the item and by the category they target, so pricing a basket touches
+    each distinct item once plus the rules that name it or its category,
+    not every rule. Threshold (spend X) promotions are kept sorted by
+    their minimum spend with running best percent/amount, so the best one
+    for a total is a single bisect.
+
+    Rules do not stack: each item gets the one promotion that saves the
+    most, and lines with a manual discount are left to that discount.
+    ``loyalty_only`` rules apply only when the customer is a member.
+    Start and end dates are checked against ``today`` when compiling;
+    ``day`` records it so the caller can recompile when the date changes.
+    Raises ValueError or KeyError for a rule it cannot compile, such as
+    an unknown type or a missing field.
+    """
+
+    def __init__(self, spec, today=None):
+        today = (today or datetime.date.today()).isoformat()
+        self.day = today
+        self.item_category = {item: category for category, items in spec.get("categories", {}).items()
+                              for item in items}
+        self.by_item = {}
+        self.by_category = {}
+        thresholds = []
+        for rule_spec in spec.get("promotions", []):
+            if rule_spec["type"] != "threshold" and rule_spec["type"] not in LINE_RULES:
+                raise ValueError(f"promotion {rule_spec.get('id')!r}: unknown type {rule_spec['type']!r}")
+            if not is_active(rule_spec, today):
+                continue
+            if rule_spec["type"] == "threshold":
+                thresholds.append(rule_spec)
+                continue
+            rule = LINE_RULES[rule_spec["type"]](rule_spec)
+            rule.id = rule_spec["id"]
+            rule.description = _describe(rule_spec)
+            rule.loyalty_only = bool(rule_spec.get("loyalty_only"))
+            for item in rule_spec.get("items", []):
+                self.by_item.setdefault(item, []).append(rule)
+            for category in rule_spec.get("categories", []):
+                self.by_category.setdefault(category, []).append(rule)
+        self._compile_thresholds(thresholds)
+
+    def _compile_thresholds(self, thresholds):
+        # One ladder for members and one for everyone; each step keeps the best rule so far
+        self.ladders = {}
+        for loyalty in (False, True):
+            eligible = sorted((spec for spec in thresholds if loyalty or not spec.get("loyalty_only")),
+                              key=lambda spec: to_money(spec["min_total"]))
+            minimums, best_pct, best_amount = [], [], []
+            pct, amount = None, None
+            for spec in eligible:
+                if "percent" in spec:
+                    if pct is None or parse_percent(spec["percent"]) > pct[0]:
+                        pct = (parse_percent(spec["percent"]), spec["id"], _describe(spec))
+                elif amount is None or to_money(spec["amount"]) > amount[0]:
+                    amount = (to_money(spec["amount"]), spec["id"], _describe(spec))
+                minimums.append(to_money(spec["min_total"]))
+                best_pct.append(pct)
+                best_amount.append(amount)
+            self.ladders[loyalty] = (minimums, best_pct, best_amount)
+
+    @classmethod
+    def load(cls, path=PROMOTIONS_FILE, today=None):
+        # No promotions file means no promotions
+        if not os.path.exists(path):
+            return cls({}, today)
+        with open(path, "r") as f:
+            return cls(json.load(f), today)
+
+    def rules_for(self, item):
+        rules = self.by_item.get(item, [])
+        category = self.item_category.get(item)
+        if category in self.by_category:
+            rules = rules + self.by_category[category]
+        return rules
+
+    def best_line_rule(self, name, price, qty, loyalty=False):
+        """(saving, rule) of the promotion that saves most on qty units of an item, or None."""
+        best = None
+        for rule in self.rules_for(name):
+            if rule.loyalty_only and not loyalty:
+                continue
+            rule_saving = rule.saving(qty, price)
+            if rule_saving > 0 and (best is None or rule_saving > best[0]):
+                best = (rule_saving, rule)
+        return best
+
+    def best_threshold(self, total, loyalty=False):
+        minimums, best_pct, best_amount = self.ladders[loyalty]
+        step = bisect.bisect_right(minimums, total) - 1
+        if step < 0:
+            return None
+        options = []
+        if best_pct[step]:
+            pct, rule_id, description = best_pct[step]
+            options.append((total - discounted(total, pct), rule_id, description))
+        if best_amount[step]:
+            amount, rule_id, description = best_amount[step]
+            options.append((min(amount, total), rule_id, description))
+        return max(options, key=lambda option: option[0])
+
+    def apply(self, items, loyalty=False):
+        """Promotions for bill items (make_bill_item tuples).
+
+        Returns (applied, saving): applied lists (rule id, description,
+        saving) for the receipt, saving is their total.
+        """
+        quantities = {}
+        for name, price, qty, discount, _, _ in items:
+            if discount == 0:
+                quantities[name, price] = quantities.get((name, price), 0) + qty
+        applied = []
+        saving = ZERO
+        for (name, price), qty in quantities.items():
+            best = self.best_line_rule(name, price, qty, loyalty)
+            if best:
+                applied.append((best[1].id, f"{name}: {best[1].description}", best[0]))
+                saving += best[0]
+        subtotal = sum((item[5] for item in items), ZERO) - saving
+        threshold = self.best_threshold(subtotal, loyalty)
+        if threshold:
+            threshold_saving, rule_id, description = threshold
+            applied.append((rule_id, description, threshold_saving))
+            saving += threshold_saving
+        return applied, saving
+
+
+class PromotionBasket:
+    """The promotion saving of a bill kept current as lines come and go.
+
+    Each promoted item's quantity and best saving are kept, so adding,
+    changing or removing a line re-prices only that item, and the
+    threshold rule is one bisect on the running subtotal. The saving is
+    the same as ``engine.apply`` on the whole bill, which the till still
+    runs once at checkout for the receipt.
+    """
+
+    def __init__(self, engine, items=(), loyalty=False):
+        self.engine = engine
+        self.loyalty = loyalty
+        self.quantities = {}
+        self.savings = {}
+        self.line_saving = ZERO
+        self.subtotal = ZERO
+        for item in items:
+            self.add(item)
+
+    def add(self, item, sign=1):
+        name, price, qty, discount, _, line_total = item
+        self.subtotal += line_total * sign
+        if discount == 0:
+            key = (name, price)
+            qty = self.quantities.get(key, 0) + qty * sign
+            if qty:
+                self.quantities[key] = qty
+            else:
+                self.quantities.pop(key, None)
+            self._reprice(key)
+
+    def remove(self, item):
+        self.add(item, -1)
+
+    def set_loyalty(self, loyalty):
+        if loyalty != self.loyalty:
+            self.loyalty = loyalty
+            for key in self.quantities:
+                self._reprice(key)
+
+    def _reprice(self, key):
+        self.line_saving -= self.savings.pop(key, ZERO)
+        qty = self.quantities.get(key)
+        best = self.engine.best_line_rule(key[0], key[1], qty, self.loyalty) if qty else None
+        if best:
+            self.savings[key] = best[0]
+            self.line_saving += best[0]
+
+    def saving(self):
+        threshold = self.engine.best_threshold(self.subtotal - self.line_saving, self.loyalty)
+        return self.line_saving + (threshold[0] if threshold else ZERO)
+
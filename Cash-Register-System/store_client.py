@@ -0,0 +1,254 @@
+import itertools
+import json
+import socket
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout, wait
+
+from loyalty_store import normalize_mobile
+from store_server import encode, parse_address
+
+# Caches are keyed by what was typed, so cap them rather than grow all day
+MAX_CACHE_ENTRIES = 20000
+
+
+class StoreError(Exception):
+    # The store server could not be reached, did not answer or failed the request
+    pass
+
+
+class _Connection:
+    # One persistent socket; requests are pipelined and matched to answers by id
+    def __init__(self, address, on_event):
+        target = parse_address(address)
+        if "path" in target:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(target["path"])
+        else:
+            self.sock = socket.create_connection((target["host"], target["port"]))
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.on_event = on_event
+        self.ids = itertools.count(1)
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.closed = False
+        self.reader = threading.Thread(target=self._read_loop, name="store-client", daemon=True)
+        self.reader.start()
+
+    def send(self, op, args):
+        future = Future()
+        with self.lock:
+            if self.closed:
+                raise StoreError("connection closed")
+            request_id = next(self.ids)
+            self.pending[request_id] = future
+            try:
+                self.sock.sendall(encode({"id": request_id, "op": op, "args": args}))
+            except OSError as e:
+                self.closed = True
+                del self.pending[request_id]
+                raise StoreError(f"connection to store server lost: {e}") from None
+        return future
+
+    def _read_loop(self):
+        try:
+            for line in self.sock.makefile("rb"):
+                message = json.loads(line)
+                if "event" in message:
+                    self.on_event(message)
+                    continue
+                with self.lock:
+                    future = self.pending.pop(message["id"], None)
+                if future is None:
+                    continue
+                if message.get("invalid"):
+                    # Rejected arguments, e.g. a malformed mobile number: the caller's input was wrong
+                    future.set_exception(ValueError(message["error"]))
+                elif "error" in message:
+                    future.set_exception(StoreError(message["error"]))
+                else:
+                    future.set_result(message.get("result"))
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self.lock:
+                self.closed = True
+                pending, self.pending = self.pending, {}
+            for future in pending.values():
+                future.set_exception(StoreError("connection to store server lost"))
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class StoreClient:
+    """A till's connection pool to the store server, with a local cache.
+
+    Price, search and member answers are cached until the server pushes an
+    invalidation for them, so a till mostly answers keystrokes from memory.
+    Each cache fill is tagged with the cache generation when the request was
+    sent and dropped if an invalidation arrived in between. Connections are
+    persistent and reopened on demand; when one is reopened the cache is
+    cleared, since pushes may have been missed while it was down.
+
+    ``catalog``, ``members`` and ``journal`` have the same methods the POS
+    uses on CatalogIndex/CatalogStore, LoyaltyStore and SalesJournal.
+    """
+
+    def __init__(self, address, connections=2, timeout=10):
+        self.address = address
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.pool = [None] * connections
+        self.turn = itertools.count()
+        self.generation = 0
+        self.prices = {}
+        self.searches = {}
+        self.member_names = {}
+        self.stats = {"hits": 0, "misses": 0}
+        self.catalog = _RemoteCatalog(self)
+        self.members = _RemoteMembers(self)
+        self.journal = _RemoteJournal(self)
+
+    def _connection(self):
+        slot = next(self.turn) % len(self.pool)
+        with self.lock:
+            conn = self.pool[slot]
+            if conn is None or conn.closed:
+                if conn is not None:
+                    self._clear()
+                try:
+                    conn = self.pool[slot] = _Connection(self.address, self._on_event)
+                except OSError as e:
+                    raise StoreError(f"cannot connect to store server: {e}") from None
+            return conn
+
+    def submit(self, op, **args):
+        return self._connection().send(op, args)
+
+    def call(self, op, **args):
+        try:
+            return self.submit(op, **args).result(self.timeout)
+        except FutureTimeout:
+            raise StoreError(f"store server did not answer within {self.timeout}s") from None
+
+    def cached(self, cache, key, op, **args):
+        return self.cached_fill(cache, key, op, lambda value: [(cache, key, value)], **args)
+
+    def cached_fill(self, cache, key, op, entries, **args):
+        # Like cached(), but entries(value) lists every (cache, key, value) the answer fills
+        with self.lock:
+            if key in cache:
+                self.stats["hits"] += 1
+                return cache[key]
+            self.stats["misses"] += 1
+            generation = self.generation
+        value = self.call(op, **args)
+        with self.lock:
+            if generation == self.generation:
+                for target, target_key, target_value in entries(value):
+                    if len(target) >= MAX_CACHE_ENTRIES:
+                        target.clear()
+                    target[target_key] = target_value
+        return value
+
+    def _clear(self):
+        self.generation += 1
+        self.prices.clear()
+        self.searches.clear()
+        self.member_names.clear()
+
+    def _on_event(self, message):
+        with self.lock:
+            if message.get("scope") == "member":
+                self.generation += 1
+                self.member_names.pop(message["key"], None)
+            else:
+                self._clear()
+
+    def close(self):
+        with self.lock:
+            pool, self.pool = self.pool, [None] * len(self.pool)
+        for conn in pool:
+            if conn is not None:
+                conn.close()
+
+
+class _RemoteCatalog:
+    def __init__(self, client):
+        self.client = client
+
+    def __getitem__(self, name):
+        price = self.client.cached(self.client.prices, name, "price", name=name)
+        if price is None:
+            raise KeyError(name)
+        return price
+
+    def get(self, name, default=None):
+        price = self.client.cached(self.client.prices, name, "price", name=name)
+        return default if price is None else price
+
+    def search(self, text, limit=8):
+        key = (text.strip().lower(), limit)
+        client = self.client
+        # A search answer carries the prices, so the suggestions' prices are cached too
+        results = client.cached_fill(client.searches, key, "search",
+                                     lambda value: [(client.searches, key, value)] +
+                                                   [(client.prices, name, price) for name, price in value],
+                                     text=text, limit=limit)
+        return [name for name, _ in results]
+
+    def resolve(self, text):
+        key = ("resolve", text.strip().lower())
+        return self.client.cached(self.client.searches, key, "resolve", text=text)
+
+    def refresh(self):
+        pass
+
+
+class _RemoteMembers:
+    def __init__(self, client):
+        self.client = client
+
+    def lookup(self, mobile):
+        try:
+            key = normalize_mobile(mobile)
+        except ValueError:
+            return None
+        return self.client.cached(self.client.member_names, key, "member", mobile=key)
+
+    def add(self, mobile, name):
+        # A malformed mobile number raises ValueError, as LoyaltyStore.add does; outages raise StoreError
+        return self.client.call("add_member", mobile=mobile, name=name)
+
+    def close(self):
+        self.client.close()
+
+
+class _RemoteJournal:
+    def __init__(self, client):
+        self.client = client
+        self.lock = threading.Lock()
+        self.pending = set()
+
+    def record(self, sale):
+        # Resolves with the bill id once the server's journal has committed it
+        future = self.client.submit("submit_bill", sale=sale)
+        with self.lock:
+            self.pending.add(future)
+        future.add_done_callback(self._settled)
+        return future
+
+    def _settled(self, future):
+        with self.lock:
+            self.pending.discard(future)
+
+    def close(self):
+        # Like SalesJournal.close, returns once the bills already handed over are committed (or failed)
+        with self.lock:
+            pending = list(self.pending)
+        if pending:
+            wait(pending, timeout=self.client.timeout)
@@ -0,0 +1,255 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from catalog_index import CatalogIndex
+from catalog_store import CatalogStore
+from journal import SalesJournal
+from loyalty_store import LoyaltyStore, normalize_mobile
+
+DEFAULT_ADDRESS = "127.0.0.1:7470"
+
+# How often the server checks items.txt / items.db for price changes
+CATALOG_POLL_S = 2.0
+
+log = logging.getLogger(__name__)
+
+
+def parse_address(address):
+    # "unix:/path/to/pos.sock" or "host:port"
+    if address.startswith("unix:"):
+        return {"path": address[5:]}
+    host, _, port = address.rpartition(":")
+    return {"host": host or "127.0.0.1", "port": int(port)}
+
+
+def encode(message):
+    # Decimals (prices, totals) travel as strings
+    return (json.dumps(message, separators=(",", ":"), default=str) + "\n").encode()
+
+
+class StoreServer:
+    """One process that owns the catalog, loyalty and sales databases for every lane.
+
+    Tills talk to it over persistent connections with newline-delimited
+    JSON: ``{"id": 1, "op": "price", "args": {...}}`` is answered with
+    ``{"id": 1, "result": ...}`` (or ``"error"``, with ``"invalid": true``
+    when the arguments were rejected, such as a malformed mobile number).
+    Requests on a connection may be pipelined; answers carry the request
+    id. A malformed request line is answered with an error and the
+    connection keeps serving.
+
+    When a price or member changes the server pushes
+    ``{"event": "invalidate", ...}`` to every connection so tills can drop
+    what they cached. Because the push is written in order with the
+    answers, a till never keeps a value that was answered before the
+    change but read after the push. Only the server opens the database
+    files, so adding lanes adds no filesystem load.
+    """
+
+    def __init__(self, catalog_path="items.db", loyalty_path="loyalty.db", journal_path="sales.db",
+                 items_txt="items.txt"):
+        self.catalog = CatalogStore(catalog_path)
+        self.items_txt = items_txt
+        self.catalog.sync_text(items_txt)
+        self.index = CatalogIndex(self.catalog, self.catalog.barcodes)
+        # items.txt imports and change checks block, so they run on one thread with its own connection
+        self.watch_pool = ThreadPoolExecutor(1, thread_name_prefix="catalog-watch")
+        self.watch_store = None
+        # Lanes type the same popular prefixes, so search answers are shared until the catalog changes
+        self.searches = {}
+        self.members = LoyaltyStore(loyalty_path)
+        self.journal = SalesJournal(journal_path)
+        self.writers = set()
+        self.stats = {"connections": 0, "requests": 0, "bills": 0, "invalidations": 0}
+        self.ops = {
+            "price": self.op_price,
+            "search": self.op_search,
+            "resolve": self.op_resolve,
+            "set_price": self.op_set_price,
+            "member": self.op_member,
+            "add_member": self.op_add_member,
+            "submit_bill": self.op_submit_bill,
+            "stats": self.op_stats,
+        }
+
+    # -- operations --
+
+    def op_price(self, name):
+        return self.catalog.get(name)
+
+    def op_search(self, text, limit=8):
+        key = (text.strip().lower(), limit)
+        if key not in self.searches:
+            if len(self.searches) >= 100000:
+                self.searches.clear()
+            self.searches[key] = [[name, self.catalog[name]] for name in self.index.search(text, limit)]
+        return self.searches[key]
+
+    def op_resolve(self, text):
+        return self.index.resolve(text)
+
+    def op_set_price(self, name, price, barcode=None):
+        self.catalog.set_price(name, price, barcode)
+        self.catalog_changed()
+
+    def op_member(self, mobile):
+        return self.members.lookup(mobile)
+
+    def op_add_member(self, mobile, name):
+        added = self.members.add(mobile, name)
+        if added:
+            # Tills may have cached "not a member" for this number
+            self.broadcast({"event": "invalidate", "scope": "member", "key": normalize_mobile(mobile)})
+        return added
+
+    async def op_submit_bill(self, sale):
+        # Answered once the journal has committed the sale
+        bill_id = await asyncio.wrap_future(self.journal.record(sale))
+        self.stats["bills"] += 1
+        return bill_id
+
+    def op_stats(self):
+        return dict(self.stats, open_connections=len(self.writers))
+
+    # -- plumbing --
+
+    def catalog_changed(self):
+        self.index.refresh()
+        self.searches.clear()
+        self.broadcast({"event": "invalidate", "scope": "catalog"})
+
+    def broadcast(self, message):
+        self.stats["invalidations"] += 1
+        data = encode(message)
+        for writer in self.writers:
+            writer.write(data)
+
+    async def handle(self, reader, writer):
+        self.writers.add(writer)
+        self.stats["connections"] += 1
+        pending = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.stats["requests"] += 1
+                reply = self.answer(line, writer, pending)
+                if reply is not None:
+                    writer.write(encode(reply))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.writers.discard(writer)
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            writer.close()
+
+    def answer(self, line, writer, pending):
+        # The reply to one request line, or None when a slow operation answers it later
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return {"id": None, "error": f"malformed request: {e}"}
+        if not isinstance(request, dict) or "id" not in request:
+            return {"id": None, "error": "malformed request: expected an object with an id"}
+        name, args = request.get("op"), request.get("args", {})
+        op = self.ops.get(name) if isinstance(name, str) else None
+        if op is None:
+            return {"id": request["id"], "error": f"unknown op {name!r}"}
+        if not isinstance(args, dict):
+            return {"id": request["id"], "error": "malformed request: args must be an object"}
+        try:
+            result = op(**args)
+        except ValueError as e:
+            return {"id": request["id"], "error": str(e), "invalid": True}
+        except (TypeError, KeyError, sqlite3.Error) as e:
+            return {"id": request["id"], "error": str(e)}
+        if asyncio.iscoroutine(result):
+            # Slow operations (bill commits) do not hold up the lookups queued behind them
+            task = asyncio.ensure_future(self.answer_later(writer, request["id"], result))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            return None
+        return {"id": request["id"], "result": result}
+
+    async def answer_later(self, writer, request_id, coroutine):
+        try:
+            message = {"id": request_id, "result": await coroutine}
+        except Exception as e:
+            message = {"id": request_id, "error": str(e)}
+        if not writer.is_closing():
+            writer.write(encode(message))
+
+    def poll_catalog(self):
+        # On the watcher thread: import an edited items.txt, then report any commit since the last poll
+        if self.watch_store is None:
+            self.watch_store = CatalogStore(self.catalog.path)
+        synced = self.watch_store.sync_text(self.items_txt)
+        return bool(synced) | self.watch_store.changed()
+
+    def close_watch_store(self):
+        if self.watch_store is not None:
+            self.watch_store.close()
+
+    async def watch_catalog(self):
+        # Picks up items.txt edits and changes made outside the server, then tells the tills.
+        # A bad poll (unreadable items.txt, a locked database) is logged and tried again.
+        loop = asyncio.get_running_loop()
+        failure = None
+        while True:
+            await asyncio.sleep(CATALOG_POLL_S)
+            try:
+                if await loop.run_in_executor(self.watch_pool, self.poll_catalog):
+                    self.catalog_changed()
+            except (OSError, ValueError, sqlite3.Error) as e:
+                # Logged once per distinct error rather than on every poll
+                if str(e) != failure:
+                    log.warning("catalog check failed, retrying every %gs: %s", CATALOG_POLL_S, e)
+                failure = str(e)
+            else:
+                failure = None
+
+    async def serve(self, address=DEFAULT_ADDRESS, ready=None):
+        target = parse_address(address)
+        if "path" in target:
+            if os.path.exists(target["path"]):
+                os.remove(target["path"])
+            server = await asyncio.start_unix_server(self.handle, target["path"])
+        else:
+            server = await asyncio.start_server(self.handle, target["host"], target["port"])
+        watcher = asyncio.ensure_future(self.watch_catalog())
+        if ready is not None:
+            ready.set()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+            self.watch_pool.submit(self.close_watch_store)
+            self.watch_pool.shutdown()
+            self.journal.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the catalog, loyalty members and bill journal to POS lanes.")
+    parser.add_argument("--address", default=os.environ.get("POS_STORE_SERVER", DEFAULT_ADDRESS),
+                        help="host:port or unix:/path/to/socket")
+    parser.add_argument("--items-db", default="items.db")
+    parser.add_argument("--loyalty-db", default="loyalty.db")
+    parser.add_argument("--sales-db", default="sales.db")
+    args = parser.parse_args()
+
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(message)s")
+    server = StoreServer(args.items_db, args.loyalty_db, args.sales_db)
+    print(f"Serving POS lanes on {args.address}")
+    try:
+        asyncio.run(server.serve(args.address))
+    except KeyboardInterrupt:
+        pass
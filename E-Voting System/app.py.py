@@ -1,24 +1,70 @@
 from flask import Flask, render_template, request, redirect, url_for, flash, session
-from werkzeug.security import generate_password_hash, check_password_hash
 from functools import wraps
+import json
+import os
+import threading
+from store import VoteStore, DuplicateVoter, DB_FILE
+from counters import MemoryVoteStore
+from hashing import HashPool, HashPoolBusy
+from broadcaster import TallyBroadcaster
 
 app = Flask(__name__)
 app.secret_key = 'your_secret_key_here'  # Set this to something secure
 
-# In-memory storage (resets on app restart)
-users = {}
+# Voters, candidates and the tally live in SQLite so they survive restarts
+# and are shared by every worker process. EVOTING_STORE=memory keeps them in
+# a thread-safe in-process store instead (single process, lost on restart).
+if os.environ.get('EVOTING_STORE') == 'memory':
+    store = MemoryVoteStore()
+else:
+    store = VoteStore(os.environ.get('EVOTING_DB', DB_FILE),
+                      synchronous=os.environ.get('EVOTING_SYNCHRONOUS', 'FULL'))
 
-# Candidate info
+# Candidate info (seeded into the database on startup)
 candidates = {
-    "56": {"name": "Mr. Steve Jobs", "party": "United National Party", "image": "candidate1.png", "votes": 0},
-    "73": {"name": "Mr. Albert Einstein", "party": "Freedom Liberation Front", "image": "candidate2.jpg", "votes": 0},
-    "88": {"name": "Mr. Barack Obama", "party": "Democratic Alliance", "image": "candidate3.jpg", "votes": 0},
-    "95": {"name": "Mr. Rowan Atkinson", "party": "People's Voice", "image": "candidate4.jpg", "votes": 0},
-    "42": {"name": "Mrs. Marilyn Monroe", "party": "Progressive Movement", "image": "candidate5.jpg", "votes": 0},
-    "62": {"name": "Mr. Mahinda Rajapaksha", "party": "People's Party", "image": "candidate6.jpg", "votes": 0},
-    "76": {"name": "Mr. Che Guevara", "party": "Communist Freedom Society", "image": "candidate7.jpg", "votes": 0},
-    "99": {"name": "Mr. Will Smith", "party": "Sunflower Unity", "image": "candidate8.jpg", "votes": 0}
+    "56": {"name": "Mr. Steve Jobs", "party": "United National Party", "image": "candidate1.png"},
+    "73": {"name": "Mr. Albert Einstein", "party": "Freedom Liberation Front", "image": "candidate2.jpg"},
+    "88": {"name": "Mr. Barack Obama", "party": "Democratic Alliance", "image": "candidate3.jpg"},
+    "95": {"name": "Mr. Rowan Atkinson", "party": "People's Voice", "image": "candidate4.jpg"},
+    "42": {"name": "Mrs. Marilyn Monroe", "party": "Progressive Movement", "image": "candidate5.jpg"},
+    "62": {"name": "Mr. Mahinda Rajapaksha", "party": "People's Party", "image": "candidate6.jpg"},
+    "76": {"name": "Mr. Che Guevara", "party": "Communist Freedom Society", "image": "candidate7.jpg"},
+    "99": {"name": "Mr. Will Smith", "party": "Sunflower Unity", "image": "candidate8.jpg"}
 }
+store.seed_candidates(candidates)
+
+# Password hashing runs in its own bounded process pool, off the request threads
+hasher = HashPool(workers=int(os.environ.get('EVOTING_HASH_WORKERS', os.cpu_count())),
+                  max_queue=int(os.environ.get('EVOTING_HASH_QUEUE', 0)) or None)
+
+# Live results: tally deltas pushed to /results/stream at most once per interval
+broadcaster = TallyBroadcaster(store, min_interval=float(os.environ.get('EVOTING_STREAM_INTERVAL', 1.0)))
+
+# Resized, content-hashed candidate photos written by build_images.py
+IMAGE_MANIFEST = os.path.join(app.static_folder, 'build', 'manifest.json')
+image_manifest = {}
+if os.path.exists(IMAGE_MANIFEST):
+    with open(IMAGE_MANIFEST) as f:
+        image_manifest = json.load(f)
+
+@app.context_processor
+def candidate_images():
+    def candidate_image(image, fmt='jpg'):
+        # Falls back to the original photo when the thumbnails have not been built
+        entry = image_manifest.get(image)
+        return url_for('static', filename=entry[fmt] if entry else 'images/' + image)
+    return {'candidate_image': candidate_image, 'image_manifest': image_manifest}
+
+@app.after_request
+def cache_built_assets(response):
+    # Built file names change with their content, so they never need revalidating
+    if request.path.startswith('/static/build/') and response.status_code == 200:
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+def busy_response(template):
+    flash("The server is busy, please try again in a moment.")
+    return render_template(template), 503, {'Retry-After': '1'}
 
 # Protect routes with login required
 def login_required(f):
@@ -45,22 +91,19 @@ def register():
             flash('Please fill in all fields.')
             return redirect(url_for('register'))
 
-        if username in users:
-            flash('Username already taken.')
-            return redirect(url_for('register'))
+        try:
+            password_hash = hasher.hash(password)
+        except HashPoolBusy:
+            return busy_response('register.html')
 
-        for user in users.values():
-            if user['id_number'] == id_number:
+        try:
+            store.add_voter(username, id_number, password_hash)
+        except DuplicateVoter as e:
+            if e.field == 'id_number':
                 flash('ID number already registered.')
-                return redirect(url_for('register'))
-
-        password_hash = generate_password_hash(password)
-
-        users[username] = {
-            'id_number': id_number,
-            'password_hash': password_hash,
-            'has_voted': False
-        }
+            else:
+                flash('Username already taken.')
+            return redirect(url_for('register'))
 
         flash('Registration successful! Please login.')
         return redirect(url_for('login'))
@@ -74,8 +117,12 @@ def login():
         id_number = request.form['id_number']
         password = request.form['password']
 
-        user = users.get(username)
-        if user and user['id_number'] == id_number and check_password_hash(user['password_hash'], password):
+        user = store.get_voter(username)
+        try:
+            valid = user and user['id_number'] == id_number and hasher.verify(user['password_hash'], password)
+        except HashPoolBusy:
+            return busy_response('login.html')
+        if valid:
             if user['has_voted']:
                 flash("You have already voted.")
                 return redirect(url_for('results'))
@@ -93,9 +140,12 @@ def vote():
     if request.method == 'POST':
         candidate_number = request.form.get('candidate')
         if candidate_number and candidate_number in candidates:
-            candidates[candidate_number]['votes'] += 1
-            users[session['username']]['has_voted'] = True
+            accepted = store.cast_vote(session['username'], candidate_number)
+            broadcaster.notify()
             session.pop('username', None)
+            if not accepted:
+                flash("You have already voted.")
+                return redirect(url_for('results'))
             return render_template('success.html', candidate=candidates[candidate_number])
         else:
             flash("Invalid selection.")
@@ -103,9 +153,49 @@ def vote():
 
     return render_template('vote.html', candidates=candidates)
 
+# Rendered results for the current tally version; rebuilt only after new votes
+results_cache = {'version': None}
+results_cache_lock = threading.Lock()
+
+def current_results():
+    global results_cache
+    cache = results_cache
+    if cache['version'] == store.tally_version():
+        return cache
+    with results_cache_lock:
+        version, tally = store.snapshot()
+        if results_cache['version'] != version:
+            payload = {
+                'version': version,
+                'total_votes': sum(c['votes'] for c in tally.values()),
+                'candidates': [{'number': number, 'name': c['name'], 'party': c['party'], 'votes': c['votes']}
+                               for number, c in tally.items()]
+            }
+            results_cache = {'version': version,
+                             'html': render_template('results.html', candidates=tally),
+                             'json': json.dumps(payload, separators=(',', ':'))}
+        return results_cache
+
+def tally_response(body, etag, mimetype):
+    response = app.response_class(body, mimetype=mimetype)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
 @app.route('/results')
 def results():
-    return render_template('results.html', candidates=candidates)
+    cache = current_results()
+    return tally_response(cache['html'], f"results-{cache['version']}", 'text/html')
+
+@app.route('/api/results')
+def api_results():
+    cache = current_results()
+    return tally_response(cache['json'], f"api-results-{cache['version']}", 'application/json')
+
+@app.route('/results/stream')
+def results_stream():
+    return app.response_class(broadcaster.stream(), mimetype='text/event-stream',
+                              headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/logout')
 def logout():
@@ -0,0 +1,68 @@
+import argparse
+import os
+import re
+import tempfile
+
+from benchutil import load_app
+
+ASSET_RE = re.compile(r'(?:src|srcset)="(/static/[^"]+)"')
+
+
+def page_load(client, prefer_webp, cache):
+    # One vote-page view by a browser: the HTML plus one image per candidate
+    # (the WebP <source> when supported, else the <img>), honouring the cache
+    # the browser already holds from earlier views.
+    html = client.get('/vote').data
+    transferred, requests = len(html), 1
+    urls = ASSET_RE.findall(html.decode())
+    chosen = {}
+    for url in urls:
+        stem = os.path.basename(url).split('.')[0]
+        if url.endswith('.webp') and not prefer_webp:
+            continue
+        if stem not in chosen or url.endswith('.webp'):
+            chosen[stem] = url
+    for url in chosen.values():
+        cached = cache.get(url)
+        if cached and 'immutable' in cached.headers.get('Cache-Control', ''):
+            continue
+        # Anything else is revalidated: a round trip, but no body on 304
+        headers = {'If-None-Match': cached.headers['ETag']} if cached and 'ETag' in cached.headers else {}
+        response = client.get(url, headers=headers)
+        transferred += len(response.data)
+        requests += 1
+        if response.status_code == 200:
+            cache[url] = response
+    return transferred, requests
+
+
+def measure(module, prefer_webp):
+    client = module.app.test_client()
+    with client.session_transaction() as session:
+        session['username'] = 'bench'
+    cache = {}
+    first = page_load(client, prefer_webp, cache)
+    repeat = page_load(client, prefer_webp, cache)
+    return first + repeat
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Bytes transferred per vote-page load, before and after thumbnails.")
+    parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        module = load_app(os.path.join(tmp, 'bench.db'), EVOTING_HASH_WORKERS=0)
+        built = dict(module.image_manifest)
+        if not built:
+            raise SystemExit("no thumbnails found: run build_images.py first")
+
+        rows = []
+        module.image_manifest.clear()
+        rows.append(("original photos", *measure(module, prefer_webp=True)))
+        module.image_manifest.update(built)
+        rows.append(("thumbnails (jpg)", *measure(module, prefer_webp=False)))
+        rows.append(("thumbnails (webp)", *measure(module, prefer_webp=True)))
+
+    print(f"{'images':>18} {'first view B':>14} {'requests':>9} {'repeat view B':>14} {'requests':>9}")
+    for label, first, first_requests, repeat, repeat_requests in rows:
+        print(f"{label:>18} {first:>14,} {first_requests:>9} {repeat:>14,} {repeat_requests:>9}")
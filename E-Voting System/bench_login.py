@@ -0,0 +1,77 @@
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from werkzeug.security import generate_password_hash
+
+from benchutil import load_app, latency_summary
+from store import VoteStore
+
+PASSWORD = 'election-day'
+
+
+def prepare_db(path, voters, kdf):
+    store = VoteStore(path)
+    password_hash = generate_password_hash(PASSWORD, kdf)
+    for i in range(voters):
+        store.add_voter(f"voter{i}", str(i), password_hash)
+
+
+def storm(module, voters, clients, logins_per_client):
+    latencies = []
+    busy = [0]
+    lock = threading.Lock()
+
+    def client_loop():
+        client = module.app.test_client()
+        local, rejected = [], 0
+        for _ in range(logins_per_client):
+            i = random.randrange(voters)
+            start = time.perf_counter()
+            response = client.post('/login', data={'username': f"voter{i}", 'id_number': str(i),
+                                                   'password': PASSWORD})
+            elapsed = time.perf_counter() - start
+            if response.status_code == 503:
+                rejected += 1
+            else:
+                local.append(elapsed)
+        with lock:
+            latencies.extend(local)
+            busy[0] += rejected
+
+    threads = [threading.Thread(target=client_loop) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, busy[0], time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Login storm against the E-Voting app.")
+    parser.add_argument('--voters', type=int, default=500)
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--logins-per-client', type=int, default=10)
+    parser.add_argument('--kdf', default='scrypt:32768:8:1')
+    parser.add_argument('--hash-workers', type=int, default=os.cpu_count())
+    parser.add_argument('--hash-queue', type=int, default=0, help="0 uses the pool default")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        prepare_db(db_path, args.voters, args.kdf)
+
+        print(f"{'mode':>10} {'logins/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'busy':>6}")
+        for mode, workers in (("inline", 0), ("pool", args.hash_workers)):
+            module = load_app(db_path, EVOTING_KDF=args.kdf, EVOTING_HASH_WORKERS=workers,
+                              EVOTING_HASH_QUEUE=args.hash_queue)
+            module.hasher.verify(module.hasher.hash('warm-up'), 'warm-up')
+            latencies, busy, elapsed = storm(module, args.voters, args.clients, args.logins_per_client)
+            module.hasher.shutdown()
+            summary = latency_summary(latencies)
+            print(f"{mode:>10} {len(latencies) / elapsed:>10,.1f} {summary['p50']:>9.1f} "
+                  f"{summary['p95']:>9.1f} {summary['p99']:>9.1f} {busy:>6}")
@@ -0,0 +1,67 @@
+import argparse
+import os
+import tempfile
+import time
+
+from store import VoteStore, DuplicateVoter
+
+
+def legacy_register(users, username, id_number):
+    # The original in-memory registry: a dict keyed by username plus a linear
+    # scan over every voter for the ID number.
+    if username in users:
+        return False
+    for user in users.values():
+        if user['id_number'] == id_number:
+            return False
+    users[username] = {'id_number': id_number, 'password_hash': 'x', 'has_voted': False}
+    return True
+
+
+def bench_legacy(total, report_every):
+    users = {}
+    start = window = time.perf_counter()
+    for i in range(1, total + 1):
+        legacy_register(users, f"voter{i}", f"{i:012d}")
+        if i % report_every == 0:
+            now = time.perf_counter()
+            print(f"{'legacy scan':>14} {i:>10,} {report_every / (now - window):>14,.0f}")
+            window = now
+    return time.perf_counter() - start
+
+
+def bench_store(total, report_every, duplicate_every, synchronous):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VoteStore(os.path.join(tmp, 'bench.db'), synchronous=synchronous)
+        duplicates = 0
+        start = window = time.perf_counter()
+        for i in range(1, total + 1):
+            # Every Nth registration reuses an earlier ID number to exercise the conflict path
+            id_number = f"{i // 2:012d}" if duplicate_every and i % duplicate_every == 0 else f"{i:012d}"
+            try:
+                store.add_voter(f"voter{i}", id_number, 'x')
+            except DuplicateVoter:
+                duplicates += 1
+            if i % report_every == 0:
+                now = time.perf_counter()
+                print(f"{'indexed store':>14} {i:>10,} {report_every / (now - window):>14,.0f}")
+                window = now
+        return time.perf_counter() - start, duplicates
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Registration throughput as the voter roll grows.")
+    parser.add_argument('--voters', type=int, default=1_000_000)
+    parser.add_argument('--report-every', type=int, default=100_000)
+    parser.add_argument('--legacy-voters', type=int, default=20_000,
+                        help="the O(n) scan is quadratic overall, so it is measured on a smaller roll")
+    parser.add_argument('--duplicate-every', type=int, default=10)
+    parser.add_argument('--synchronous', default='NORMAL')
+    args = parser.parse_args()
+
+    print(f"{'registry':>14} {'voters':>10} {'registrations/s':>14}")
+    legacy_elapsed = bench_legacy(args.legacy_voters, max(args.legacy_voters // 5, 1))
+    elapsed, duplicates = bench_store(args.voters, args.report_every, args.duplicate_every, args.synchronous)
+    print(f"legacy scan: {args.legacy_voters:,} voters in {legacy_elapsed:.1f}s")
+    print(f"indexed store: {args.voters:,} registrations in {elapsed:.1f}s "
+          f"({duplicates:,} duplicate ID numbers rejected)")
@@ -0,0 +1,46 @@
+import argparse
+import os
+import tempfile
+import time
+
+from flask import render_template
+
+from benchutil import load_app
+
+
+def measure(client, path, requests, headers=None):
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get(path, headers=headers)
+    return requests / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Requests/sec for cached and uncached election results.")
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--votes', type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        module = load_app(os.path.join(tmp, 'bench.db'), EVOTING_HASH_WORKERS=0)
+        numbers = list(module.candidates)
+        for i in range(args.votes):
+            module.store.add_voter(f"voter{i}", str(i), 'x')
+            module.store.cast_vote(f"voter{i}", numbers[i % len(numbers)])
+
+        # The pre-cache view: read the tally and render the template on every hit
+        @module.app.route('/results-uncached')
+        def results_uncached():
+            return render_template('results.html', candidates=module.store.get_candidates())
+
+        client = module.app.test_client()
+        etag = client.get('/results').headers['ETag']
+        rows = (
+            ("uncached /results", measure(client, '/results-uncached', args.requests)),
+            ("cached /results", measure(client, '/results', args.requests)),
+            ("/results 304", measure(client, '/results', args.requests, {'If-None-Match': etag})),
+            ("/api/results", measure(client, '/api/results', args.requests)),
+        )
+        print(f"{'endpoint':>20} {'requests/s':>12}")
+        for label, rate in rows:
+            print(f"{label:>20} {rate:>12,.0f}")
@@ -0,0 +1,110 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+from benchutil import latency_summary, load_app
+from store import VoteStore
+
+
+def serve(db_path, port, interval, ready):
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    module = load_app(db_path, EVOTING_HASH_WORKERS=0, EVOTING_STREAM_INTERVAL=interval)
+    server = make_server('127.0.0.1', port, module.app, threaded=True)
+    server.socket.listen(8192)
+    ready.set()
+    server.serve_forever()
+
+
+async def subscriber(port, arrivals, connected, stop):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"GET /results/stream HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n\r\n".encode())
+    await writer.drain()
+    connected.append(1)
+    try:
+        while not stop.is_set():
+            line = await reader.readline()
+            if not line:
+                break
+            if line.startswith(b"id: "):
+                arrivals.setdefault(int(line[4:]), []).append(time.perf_counter())
+    finally:
+        writer.close()
+
+
+async def run(port, subscribers, votes, duration, db_path):
+    arrivals, connected = {}, []
+    stop = asyncio.Event()
+    tasks = []
+    for _ in range(subscribers):
+        tasks.append(asyncio.create_task(subscriber(port, arrivals, connected, stop)))
+        if len(tasks) % 200 == 0:
+            await asyncio.sleep(0.05)
+    while len(connected) < subscribers:
+        await asyncio.sleep(0.1)
+    print(f"{len(connected):,} subscribers connected")
+
+    store = VoteStore(db_path)
+    candidates = list(store.get_candidates())
+    start = time.perf_counter()
+    for i in range(votes):
+        await asyncio.to_thread(store.cast_vote, f"voter{i}", candidates[i % len(candidates)])
+        target = start + duration * (i + 1) / votes
+        delay = target - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    await asyncio.sleep(3)
+    stop.set()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return arrivals
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Hold many /results/stream subscribers open while votes arrive.")
+    parser.add_argument('--subscribers', type=int, default=5000)
+    parser.add_argument('--votes', type=int, default=2000)
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds over which votes are cast")
+    parser.add_argument('--interval', type=float, default=1.0, help="maximum push rate (seconds per event)")
+    parser.add_argument('--port', type=int, default=5055)
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        module = load_app(db_path, EVOTING_HASH_WORKERS=0)
+        conn = module.store._connect()
+        with conn:
+            conn.execute('BEGIN')
+            conn.executemany("INSERT INTO voters (username, id_number, password_hash) VALUES (?, ?, 'x')",
+                             ((f"voter{i}", str(i)) for i in range(args.votes)))
+        conn.close()
+
+        ready = multiprocessing.Event()
+        server = multiprocessing.Process(target=serve, args=(db_path, args.port, args.interval, ready))
+        server.start()
+        ready.wait()
+        try:
+            arrivals = asyncio.run(run(args.port, args.subscribers, args.votes, args.duration, db_path))
+        finally:
+            server.terminate()
+            server.join()
+
+    server_cpu = os.times().children_user + os.times().children_system
+    events = {version: times for version, times in arrivals.items() if version > 0}
+    delivered = sum(len(times) for times in events.values())
+    spread = latency_summary([max(times) - min(times) for times in events.values()])
+    print(f"votes cast: {args.votes:,} over {args.duration:.0f}s")
+    print(f"events published: {len(events):,} (max one per {args.interval}s)")
+    print(f"events delivered: {delivered:,}")
+    print(f"fan-out spread per event: p50 {spread['p50']:.1f} ms, p99 {spread['p99']:.1f} ms")
+    print(f"server CPU: {server_cpu:.2f}s ({server_cpu / max(delivered, 1) * 1e6:.1f} us per delivered event)")
@@ -0,0 +1,80 @@
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+from store import VoteStore
+
+CANDIDATES = {str(n): {"name": f"Candidate {n}", "party": "Bench Party", "image": "candidate1.png"}
+              for n in range(8)}
+
+
+def prepare_db(path, voters):
+    store = VoteStore(path)
+    store.seed_candidates(CANDIDATES)
+    conn = store._connect()
+    with conn:
+        conn.execute('BEGIN')
+        conn.executemany("INSERT INTO voters (username, id_number, password_hash) VALUES (?, ?, 'x')",
+                         ((f"voter{i}", str(i)) for i in range(voters)))
+    conn.close()
+
+
+def run_worker(path, usernames, threads, max_batch, synchronous, start_event):
+    store = VoteStore(path, max_batch=max_batch, synchronous=synchronous)
+    candidates = list(CANDIDATES)
+
+    def cast(names):
+        for i, username in enumerate(names):
+            store.cast_vote(username, candidates[i % len(candidates)])
+
+    chunks = [usernames[i::threads] for i in range(threads)]
+    pool = [threading.Thread(target=cast, args=(chunk,)) for chunk in chunks]
+    store.get_candidates()  # open the process's connections before the clock starts
+    start_event.wait()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+
+
+def bench(workers, votes, threads, max_batch, synchronous):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        prepare_db(path, votes)
+        usernames = [f"voter{i}" for i in range(votes)]
+        start_event = multiprocessing.Event()
+        procs = [multiprocessing.Process(target=run_worker,
+                                         args=(path, usernames[w::workers], threads, max_batch,
+                                               synchronous, start_event))
+                 for w in range(workers)]
+        for p in procs:
+            p.start()
+        time.sleep(0.5)
+        start = time.perf_counter()
+        start_event.set()
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - start
+
+        total = sum(c['votes'] for c in VoteStore(path).get_candidates().values())
+        if total != votes:
+            raise SystemExit(f"tally mismatch: {total} != {votes}")
+        return votes / elapsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Vote throughput of the SQLite vote store.")
+    parser.add_argument('--votes', type=int, default=20000)
+    parser.add_argument('--threads', type=int, default=32, help="concurrent requests per worker")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--synchronous', default='FULL')
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'commit mode':>16} {'votes/sec':>12}")
+    for workers in args.workers:
+        for label, max_batch in (("per-vote", 1), ("group commit", 1024)):
+            rate = bench(workers, args.votes, args.threads, max_batch, args.synchronous)
+            print(f"{workers:>8} {label:>16} {rate:>12,.0f}")
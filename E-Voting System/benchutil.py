@@ -0,0 +1,26 @@
+import importlib.util
+import os
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py.py')
+
+
+def load_app(db_path, **env):
+    # app.py.py cannot be imported by name, so load it from its path. The app
+    # reads its configuration from the environment at import time.
+    os.environ['EVOTING_DB'] = db_path
+    os.environ.update({key: str(value) for key, value in env.items()})
+    spec = importlib.util.spec_from_file_location('evoting_app', APP_FILE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def latency_summary(latencies):
+    ordered = sorted(latencies)
+    if not ordered:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+
+    def pick(p):
+        return ordered[min(int(len(ordered) * p), len(ordered) - 1)] * 1000
+
+    return {'p50': pick(0.50), 'p95': pick(0.95), 'p99': pick(0.99), 'max': ordered[-1] * 1000}
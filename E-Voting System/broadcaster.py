@@ -0,0 +1,106 @@
+import json
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+def sse_event(event, version, data):
+    payload = json.dumps(data, separators=(',', ':'))
+    return f"id: {version}\nevent: {event}\ndata: {payload}\n\n".encode()
+
+
+class TallyBroadcaster:
+    """Pushes tally changes to Server-Sent Events subscribers.
+
+    One background thread per process watches the store's tally version and,
+    at most once every ``min_interval`` seconds, encodes a single delta event
+    that every subscriber then writes out as-is. Nothing is published while
+    no votes arrive, so the cost follows the vote rate rather than the number
+    of viewers. Subscribers that fall more than one event behind are sent a
+    full tally instead of the deltas they missed.
+    """
+
+    def __init__(self, store, min_interval=1.0, poll_interval=0.5, keepalive=15.0):
+        self.store = store
+        self.min_interval = min_interval
+        self.poll_interval = poll_interval
+        self.keepalive = keepalive
+        self.subscribers = 0
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._seq = 0
+        self._delta = None
+        self._full = None
+        self._tally = None
+        self._version = None
+        self._pid = None
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            self._publish()
+            threading.Thread(target=self._run, name='tally-broadcaster', daemon=True).start()
+            self._pid = os.getpid()
+
+    def notify(self):
+        # Called after a local vote so the next publish does not wait for a poll
+        self._wake.set()
+
+    def _run(self):
+        last_publish = time.monotonic()
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            # A failed poll (e.g. "database is locked" under heavy voting) is retried on the
+            # next one; letting it escape would end the thread and freeze every stream
+            try:
+                if self.store.tally_version() == self._version:
+                    continue
+                delay = last_publish + self.min_interval - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                last_publish = time.monotonic()
+                self._publish()
+            except Exception as e:
+                log.warning("tally broadcast failed, retrying: %s", e)
+
+    def _publish(self):
+        version, tally = self.store.snapshot()
+        votes = {number: c['votes'] for number, c in tally.items()}
+        changed = {number: count for number, count in votes.items()
+                   if self._tally is None or self._tally.get(number) != count}
+        full = sse_event('tally', version, {'version': version, 'votes': votes})
+        delta = sse_event('delta', version, {'version': version, 'votes': changed})
+        with self._cond:
+            self._version = version
+            self._tally = votes
+            self._full = full
+            self._delta = delta
+            self._seq += 1
+            self._cond.notify_all()
+
+    def stream(self):
+        self._ensure_started()
+        with self._cond:
+            self.subscribers += 1
+            seen = self._seq
+            first = self._full
+        try:
+            yield b"retry: 3000\n\n" + first
+            while True:
+                with self._cond:
+                    if not self._cond.wait_for(lambda: self._seq != seen, timeout=self.keepalive):
+                        message = b": keepalive\n\n"
+                    else:
+                        message = self._delta if self._seq == seen + 1 else self._full
+                        seen = self._seq
+                yield message
+        finally:
+            with self._cond:
+                self.subscribers -= 1
@@ -0,0 +1,81 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+
+from PIL import Image, ImageOps
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.join(HERE, 'static', 'images')
+BUILD_DIR = os.path.join(HERE, 'static', 'build')
+MANIFEST_FILE = os.path.join(BUILD_DIR, 'manifest.json')
+
+# vote.html shows the photos as 150px circles; 300px covers 2x displays
+THUMB_SIZE = 300
+
+
+def encode(image, fmt, quality):
+    buffer = io.BytesIO()
+    if fmt == 'JPEG':
+        image.save(buffer, fmt, quality=quality, optimize=True, progressive=True)
+    else:
+        image.save(buffer, fmt, quality=quality, method=6)
+    return buffer.getvalue()
+
+
+def write_hashed(stem, ext, data):
+    # The content hash in the name lets the files be cached forever
+    name = f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}.{ext}"
+    path = os.path.join(BUILD_DIR, name)
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            f.write(data)
+    return f"build/{name}"
+
+
+def build(size, jpeg_quality, webp_quality):
+    os.makedirs(BUILD_DIR, exist_ok=True)
+    manifest = {}
+    for filename in sorted(os.listdir(SOURCE_DIR)):
+        stem, ext = os.path.splitext(filename)
+        if ext.lower() not in ('.jpg', '.jpeg', '.png', '.webp'):
+            continue
+        with Image.open(os.path.join(SOURCE_DIR, filename)) as source:
+            rgba = ImageOps.exif_transpose(source).convert('RGBA')
+        # Flatten any transparency onto white, since JPEG has no alpha
+        flat = Image.new('RGB', rgba.size, 'white')
+        flat.paste(rgba, mask=rgba.getchannel('A'))
+        image = ImageOps.fit(flat, (size, size), Image.LANCZOS)
+        manifest[filename] = {
+            'jpg': write_hashed(stem, 'jpg', encode(image, 'JPEG', jpeg_quality)),
+            'webp': write_hashed(stem, 'webp', encode(image, 'WEBP', webp_quality)),
+            'width': size,
+            'height': size,
+        }
+
+    # Drop outputs from earlier builds that the new manifest no longer references
+    current = {os.path.basename(entry[fmt]) for entry in manifest.values() for fmt in ('jpg', 'webp')}
+    for name in os.listdir(BUILD_DIR):
+        if name != 'manifest.json' and name not in current:
+            os.remove(os.path.join(BUILD_DIR, name))
+
+    with open(MANIFEST_FILE, 'w') as f:
+        json.dump(manifest, f, indent=4)
+    return manifest
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build resized, content-hashed candidate thumbnails.")
+    parser.add_argument('--size', type=int, default=THUMB_SIZE)
+    parser.add_argument('--jpeg-quality', type=int, default=80)
+    parser.add_argument('--webp-quality', type=int, default=75)
+    args = parser.parse_args()
+
+    manifest = build(args.size, args.jpeg_quality, args.webp_quality)
+    for filename, entry in manifest.items():
+        original = os.path.getsize(os.path.join(SOURCE_DIR, filename))
+        jpg = os.path.getsize(os.path.join(HERE, 'static', entry['jpg']))
+        webp = os.path.getsize(os.path.join(HERE, 'static', entry['webp']))
+        print(f"{filename:>16} {original:>9,} B -> jpg {jpg:>7,} B, webp {webp:>7,} B")
+    print(f"wrote {MANIFEST_FILE}")
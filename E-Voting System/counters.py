@@ -0,0 +1,125 @@
+import itertools
+import threading
+
+from store import DuplicateVoter
+
+
+class ShardedCounter:
+    """Per-key counters split into lock-striped shards.
+
+    Each thread is pinned to one shard, so concurrent increments from
+    different threads rarely touch the same lock. Totals are aggregated on
+    read by summing the shards.
+    """
+
+    def __init__(self, keys, shards=16):
+        self._shards = [({key: 0 for key in keys}, threading.Lock()) for _ in range(shards)]
+        self._next_shard = itertools.count()
+        self._local = threading.local()
+
+    def _shard(self):
+        index = getattr(self._local, 'index', None)
+        if index is None:
+            index = self._local.index = next(self._next_shard) % len(self._shards)
+        return self._shards[index]
+
+    def add(self, key, amount=1):
+        counts, lock = self._shard()
+        with lock:
+            counts[key] += amount
+
+    def totals(self):
+        totals = {}
+        for counts, lock in self._shards:
+            with lock:
+                for key, value in counts.items():
+                    totals[key] = totals.get(key, 0) + value
+        return totals
+
+
+class _Stripe:
+    __slots__ = ('lock', 'entries')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+
+
+class MemoryVoteStore:
+    """Thread-safe in-process vote store with the same interface as VoteStore.
+
+    Voters live in lock-striped dicts keyed by username (and a second set of
+    stripes for id_number uniqueness); the tally is a ShardedCounter. Casting
+    a vote marks the voter and increments the tally under the voter's stripe
+    lock only, so votes for different voters proceed in parallel and a voter
+    can never be counted twice. Nothing survives a restart: use it for
+    single-process development and tests.
+    """
+
+    def __init__(self, stripes=64, shards=16):
+        self._voters = [_Stripe() for _ in range(stripes)]
+        self._id_numbers = [_Stripe() for _ in range(stripes)]
+        self._shards = shards
+        self._candidates = {}
+        self._tally = ShardedCounter([], shards)
+
+    def _stripe(self, stripes, key):
+        return stripes[hash(key) % len(stripes)]
+
+    # --- Candidates ---
+
+    def seed_candidates(self, candidates):
+        self._candidates = {number: {'name': c['name'], 'party': c['party'], 'image': c['image']}
+                            for number, c in candidates.items()}
+        self._tally = ShardedCounter(self._candidates, self._shards)
+
+    def get_candidates(self):
+        return self.snapshot()[1]
+
+    def tally_version(self):
+        return sum(self._tally.totals().values())
+
+    def snapshot(self):
+        totals = self._tally.totals()
+        return sum(totals.values()), {number: dict(c, votes=totals[number])
+                                      for number, c in self._candidates.items()}
+
+    # --- Voters ---
+
+    def get_voter(self, username):
+        stripe = self._stripe(self._voters, username)
+        with stripe.lock:
+            voter = stripe.entries.get(username)
+            return dict(voter) if voter else None
+
+    def id_number_registered(self, id_number):
+        stripe = self._stripe(self._id_numbers, id_number)
+        with stripe.lock:
+            return id_number in stripe.entries
+
+    def add_voter(self, username, id_number, password_hash):
+        # Lock order is always username stripe, then id_number stripe
+        voters = self._stripe(self._voters, username)
+        ids = self._stripe(self._id_numbers, id_number)
+        with voters.lock, ids.lock:
+            if username in voters.entries:
+                raise DuplicateVoter('username')
+            if id_number in ids.entries:
+                raise DuplicateVoter('id_number')
+            ids.entries[id_number] = username
+            voters.entries[username] = {'id_number': id_number, 'password_hash': password_hash,
+                                        'has_voted': False}
+
+    # --- Votes ---
+
+    def cast_vote(self, username, candidate_number):
+        if candidate_number not in self._candidates:
+            return False
+        stripe = self._stripe(self._voters, username)
+        with stripe.lock:
+            voter = stripe.entries.get(username)
+            if voter is None or voter['has_voted']:
+                return False
+            voter['has_voted'] = True
+            self._tally.add(candidate_number)
+        return True
@@ -0,0 +1,64 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# werkzeug method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000"
+KDF_METHOD = os.environ.get('EVOTING_KDF', 'scrypt:32768:8:1')
+
+
+class HashPoolBusy(Exception):
+    pass
+
+
+class HashPool:
+    """Runs the password KDF in a bounded pool of worker processes.
+
+    At most ``max_queue`` hash/verify calls may be queued or running at once;
+    a caller that cannot get a slot within ``wait`` seconds gets HashPoolBusy
+    so the view can answer "try again" instead of piling up request threads.
+    ``workers=0`` runs the KDF inline, which is handy for development.
+    """
+
+    def __init__(self, workers=None, max_queue=None, method=KDF_METHOD, wait=0.5):
+        self.workers = os.cpu_count() if workers is None else workers
+        self.max_queue = max_queue or max(self.workers, 1) * 4
+        self.method = method
+        self.wait = wait
+        self._slots = threading.BoundedSemaphore(self.max_queue)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # spawn rather than fork: the web worker is multi-threaded
+                    self._executor = ProcessPoolExecutor(self.workers,
+                                                         mp_context=multiprocessing.get_context('spawn'))
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.wait):
+            raise HashPoolBusy("password hashing queue is full")
+        try:
+            if self.workers == 0:
+                return fn(*args)
+            return self._get_executor().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown()
+            self._executor = None
+            self._pid = None
@@ -0,0 +1,96 @@
+import argparse
+import csv
+import functools
+import multiprocessing
+import os
+import sys
+import time
+
+from werkzeug.security import generate_password_hash
+
+from hashing import KDF_METHOD
+from store import VoteStore, DB_FILE
+
+
+def read_batches(path, batch_size, counts):
+    # Streams the CSV so memory stays flat however large the roll is
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        missing = {'username', 'id_number', 'password'} - set(reader.fieldnames or [])
+        if missing:
+            raise SystemExit(f"{path}: missing column(s) {', '.join(sorted(missing))}")
+        batch = []
+        for row in reader:
+            counts['read'] += 1
+            username = (row['username'] or '').strip()
+            id_number = (row['id_number'] or '').strip()
+            password = (row['password'] or '').strip()
+            if not username or not id_number or not password:
+                counts['invalid'] += 1
+                continue
+            batch.append((username, id_number, password))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def dedupe(store, batch, counts, queued=()):
+    # Keep the first row per ID number within the batch and drop IDs that are already registered
+    # or queued in the batch not yet written, so no duplicate row costs a password hash
+    unique = {}
+    for row in batch:
+        if row[1] in unique or row[1] in queued:
+            counts['duplicates'] += 1
+        else:
+            unique[row[1]] = row
+    registered = store.registered_id_numbers(unique)
+    counts['duplicates'] += len(registered)
+    return [row for id_number, row in unique.items() if id_number not in registered]
+
+
+def import_voters(path, store, batch_size, workers, kdf):
+    counts = {'read': 0, 'inserted': 0, 'duplicates': 0, 'invalid': 0}
+    hash_password = functools.partial(generate_password_hash, method=kdf)
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        # Hash batch N+1 in the pool while batch N is written
+        pending = None
+        for batch in read_batches(path, batch_size, counts):
+            rows = dedupe(store, batch, counts, {row[1] for row in pending[0]} if pending else ())
+            hashing = pool.map_async(hash_password, [row[2] for row in rows], chunksize=64)
+            if pending:
+                write(store, *pending, counts, start)
+            pending = (rows, hashing)
+        if pending:
+            write(store, *pending, counts, start)
+    return counts, time.perf_counter() - start
+
+
+def write(store, rows, hashing, counts, start):
+    hashes = hashing.get()
+    inserted = store.add_voters((username, id_number, password_hash)
+                                for (username, id_number, _), password_hash in zip(rows, hashes))
+    # Rows that lost a username (or a concurrent ID number) race are skipped by the insert
+    counts['duplicates'] += len(rows) - inserted
+    counts['inserted'] += inserted
+    elapsed = time.perf_counter() - start
+    print(f"read {counts['read']:,}  inserted {counts['inserted']:,}  duplicates {counts['duplicates']:,}  "
+          f"invalid {counts['invalid']:,}  {counts['read'] / elapsed:,.0f} rows/s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Import an electoral roll CSV (username,id_number,password).")
+    parser.add_argument('csv_file')
+    parser.add_argument('--db', default=os.environ.get('EVOTING_DB', DB_FILE))
+    parser.add_argument('--batch-size', type=int, default=20000, help="rows per transaction")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="hashing processes")
+    parser.add_argument('--kdf', default=KDF_METHOD)
+    args = parser.parse_args()
+
+    store = VoteStore(args.db)
+    counts, elapsed = import_voters(args.csv_file, store, args.batch_size, args.workers, args.kdf)
+    print(f"Imported {counts['inserted']:,} of {counts['read']:,} rows in {elapsed:.1f}s "
+          f"({counts['read'] / elapsed:,.0f} rows/s); {counts['duplicates']:,} duplicates, "
+          f"{counts['invalid']:,} invalid")
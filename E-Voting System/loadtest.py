@@ -0,0 +1,232 @@
+import argparse
+import http.cookiejar
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from benchutil import latency_summary, load_app
+
+STEPS = ['register_form', 'register', 'login', 'vote_form', 'vote', 'results']
+
+
+class PhaseTimer:
+    # Accumulates wall time spent inside instrumented calls, across threads
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.totals = {}
+        self.counts = {}
+
+    def wrap(self, phase, fn):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self.lock:
+                    self.totals[phase] = self.totals.get(phase, 0.0) + elapsed
+                    self.counts[phase] = self.counts.get(phase, 0) + 1
+        return timed
+
+
+def instrument(module, timer):
+    module.hasher.hash = timer.wrap('hashing', module.hasher.hash)
+    module.hasher.verify = timer.wrap('hashing', module.hasher.verify)
+    module.render_template = timer.wrap('templates', module.render_template)
+
+    base = type(module.app.session_interface)
+
+    class TimedSessionInterface(base):
+        open_session = timer.wrap('session', base.open_session)
+        save_session = timer.wrap('session', base.save_session)
+
+    module.app.session_interface = TimedSessionInterface()
+
+
+class TestClientSession:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def get(self, path):
+        return self.client.get(path).status_code
+
+    def post(self, path, data):
+        return self.client.post(path, data=data).status_code
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpSession:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+
+    def _open(self, request):
+        try:
+            with self.opener.open(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    def get(self, path):
+        return self._open(urllib.request.Request(self.base_url + path))
+
+    def post(self, path, data):
+        return self._open(urllib.request.Request(self.base_url + path,
+                                                 data=urllib.parse.urlencode(data).encode()))
+
+
+def voter_flow(session, i, candidates, record):
+    form = {'username': f"lt{i}", 'id_number': f"LT{i:09d}", 'password': f"pw-{i}"}
+    plan = [
+        ('register_form', lambda: session.get('/register'), (200,)),
+        ('register', lambda: session.post('/register', form), (302,)),
+        ('login', lambda: session.post('/login', form), (302,)),
+        ('vote_form', lambda: session.get('/vote'), (200,)),
+        ('vote', lambda: session.post('/vote', {'candidate': candidates[i % len(candidates)]}), (200,)),
+        ('results', lambda: session.get('/results'), (200,)),
+    ]
+    for step, call, expected in plan:
+        start = time.perf_counter()
+        status = call()
+        record(step, time.perf_counter() - start, status, status in expected)
+        if status not in expected:
+            return False
+    return True
+
+
+def run(make_session, voters, concurrency, candidates):
+    latencies = {step: [] for step in STEPS}
+    statuses = {}
+    flows = {'ok': 0, 'failed': 0}
+    lock = threading.Lock()
+    next_voter = itertools.count()
+
+    def record(step, elapsed, status, ok):
+        with lock:
+            latencies[step].append(elapsed)
+            if not ok:
+                key = f"{step}:{status}"
+                statuses[key] = statuses.get(key, 0) + 1
+
+    def virtual_voter():
+        while True:
+            with lock:
+                i = next(next_voter)
+            if i >= voters:
+                return
+            ok = voter_flow(make_session(), i, candidates, record)
+            with lock:
+                flows['ok' if ok else 'failed'] += 1
+
+    threads = [threading.Thread(target=virtual_voter) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    requests = sum(len(values) for values in latencies.values())
+    return {
+        'elapsed_s': elapsed,
+        'flows_ok': flows['ok'],
+        'flows_failed': flows['failed'],
+        'flows_per_s': flows['ok'] / elapsed,
+        'requests_per_s': requests / elapsed,
+        'unexpected_statuses': statuses,
+        'latency_ms': {step: latency_summary(values) for step, values in latencies.items()},
+        'all_requests_ms': latency_summary([v for values in latencies.values() for v in values]),
+        'request_time_s': sum(sum(values) for values in latencies.values()),
+    }
+
+
+def print_report(report):
+    results = report['results']
+    print(f"{results['flows_ok']:,} voter flows in {results['elapsed_s']:.1f}s: "
+          f"{results['flows_per_s']:,.1f} flows/s, {results['requests_per_s']:,.1f} requests/s")
+    if results['flows_failed']:
+        print(f"{results['flows_failed']:,} flows failed: {results['unexpected_statuses']}")
+    print(f"{'step':>14} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for step, summary in list(results['latency_ms'].items()) + [('all', results['all_requests_ms'])]:
+        print(f"{step:>14} {summary['p50']:>9.1f} {summary['p95']:>9.1f} {summary['p99']:>9.1f} "
+              f"{summary['max']:>9.1f}")
+    if report['phases']:
+        print(f"{'phase':>14} {'calls':>9} {'total s':>9} {'% of req':>9}")
+        for phase, phase_stats in report['phases'].items():
+            print(f"{phase:>14} {phase_stats['calls']:>9,} {phase_stats['total_s']:>9.2f} "
+                  f"{phase_stats['share_of_request_time'] * 100:>8.1f}%")
+
+
+def compare(report, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"compared with {baseline.get('label') or baseline_path}:")
+    rows = [('flows/s', 'flows_per_s', None), ('requests/s', 'requests_per_s', None)]
+    rows += [(f"{step} p95 ms", 'latency_ms', step) for step in STEPS]
+    for label, key, step in rows:
+        old = baseline['results'][key]
+        new = report['results'][key]
+        if step:
+            old, new = old[step]['p95'], new[step]['p95']
+        change = (new - old) / old * 100 if old else 0.0
+        print(f"{label:>20} {old:>10.1f} -> {new:>10.1f} ({change:+.1f}%)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Election-day load test: register -> login -> vote -> results.")
+    parser.add_argument('--voters', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--url', help="run against a local server instead of Flask's test client")
+    parser.add_argument('--store', choices=['sqlite', 'memory'], default='sqlite')
+    parser.add_argument('--kdf', default='scrypt:32768:8:1')
+    parser.add_argument('--hash-workers', type=int, default=os.cpu_count())
+    parser.add_argument('--label', default='')
+    parser.add_argument('--output', help="write the report as JSON")
+    parser.add_argument('--compare', help="JSON report from a previous run to compare against")
+    args = parser.parse_args()
+
+    timer = PhaseTimer()
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.url:
+            make_session = lambda: HttpSession(args.url)
+            candidates = [c['number'] for c in json.load(urllib.request.urlopen(args.url.rstrip('/') +
+                                                                                '/api/results'))['candidates']]
+        else:
+            module = load_app(os.path.join(tmp, 'loadtest.db'), EVOTING_STORE=args.store,
+                              EVOTING_KDF=args.kdf, EVOTING_HASH_WORKERS=args.hash_workers)
+            instrument(module, timer)
+            make_session = lambda: TestClientSession(module.app)
+            candidates = list(module.candidates)
+
+        results = run(make_session, args.voters, args.concurrency, candidates)
+        if not args.url:
+            module.hasher.shutdown()
+
+    report = {
+        'label': args.label,
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'config': {'voters': args.voters, 'concurrency': args.concurrency, 'target': args.url or 'test-client',
+                   'store': args.store, 'kdf': args.kdf, 'hash_workers': args.hash_workers},
+        'results': results,
+        'phases': {phase: {'calls': timer.counts[phase], 'total_s': total,
+                           'share_of_request_time': total / results['request_time_s']}
+                   for phase, total in timer.totals.items()},
+    }
+    print_report(report)
+    if args.compare:
+        compare(report, args.compare)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
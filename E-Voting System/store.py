@@ -0,0 +1,298 @@
+import logging
+import os
+import queue
+import sqlite3
+import threading
+
+log = logging.getLogger(__name__)
+
+DB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'evoting.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS voters (
+    username TEXT PRIMARY KEY,
+    id_number TEXT NOT NULL,
+    password_hash TEXT NOT NULL,
+    has_voted INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS candidates (
+    number TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    party TEXT NOT NULL,
+    image TEXT NOT NULL,
+    votes INTEGER NOT NULL DEFAULT 0
+);
+CREATE UNIQUE INDEX IF NOT EXISTS voters_id_number ON voters (id_number);
+CREATE TABLE IF NOT EXISTS tally (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO tally (id, version) VALUES (1, 0);
+"""
+# Stored in PRAGMA user_version; 0 is a file from before it was set
+SCHEMA_VERSION = 1
+
+# Marks the voter and bumps the tally in one statement pair inside the batch
+# transaction, so a voter who already voted (or an unknown candidate) changes nothing.
+CAST_VOTE_SQL = """
+UPDATE candidates SET votes = votes + 1
+WHERE number = ? AND EXISTS (SELECT 1 FROM voters WHERE username = ? AND has_voted = 0)
+"""
+MARK_VOTED_SQL = "UPDATE voters SET has_voted = 1 WHERE username = ?"
+
+
+class DuplicateVoter(Exception):
+    def __init__(self, field):
+        super().__init__(f"{field} already registered")
+        self.field = field
+
+
+class IncompatibleDatabase(Exception):
+    pass
+
+
+class _Ballot:
+    __slots__ = ('username', 'candidate_number', 'accepted', 'error', 'done')
+
+    def __init__(self, username, candidate_number):
+        self.username = username
+        self.candidate_number = candidate_number
+        self.accepted = False
+        self.error = None
+        self.done = threading.Event()
+
+
+class VoteStore:
+    """SQLite (WAL) storage for voters, candidates and the vote tally.
+
+    Votes are handed to a single writer thread per process which commits
+    whatever has queued up while the previous commit was being flushed
+    (group commit), so a burst of votes costs one fsync per batch rather
+    than one per vote. A vote is only acknowledged after its batch commits.
+    Several worker processes can share the same database file; SQLite's
+    write lock serialises their batches.
+
+    A database from the first release (``voters(id, voter_id)``,
+    ``candidates(id, name, votes)``) is cut over when opened. Its voters
+    have no username or password and its candidates no number or party,
+    so neither can join the new tables. They are renamed to
+    ``legacy_voters`` and ``legacy_candidates``, and the cutover is logged
+    with their counts. If the old candidates hold any votes, the file is
+    refused with IncompatibleDatabase instead, so an election in progress
+    is never dropped from the tally.
+    """
+
+    def __init__(self, path=DB_FILE, max_batch=1024, synchronous='FULL', busy_timeout=30000):
+        self.path = path
+        self.max_batch = max_batch
+        self.synchronous = synchronous
+        self.busy_timeout = busy_timeout
+        self._start_lock = threading.Lock()
+        self._pid = None
+        conn = self._connect()
+        try:
+            self._upgrade(conn)
+        finally:
+            conn.close()
+
+    def _upgrade(self, conn):
+        # Under the write lock, so worker processes starting together upgrade the file once
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            if version > SCHEMA_VERSION:
+                raise IncompatibleDatabase(f"{self.path} has schema version {version}, newer than this "
+                                           f"application's {SCHEMA_VERSION}; upgrade the application")
+            if version < SCHEMA_VERSION:
+                self._retire_legacy_tables(conn)
+                for statement in SCHEMA.split(';'):
+                    if statement.strip():
+                        conn.execute(statement)
+                conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _retire_legacy_tables(self, conn):
+        # The first release's tables, if any: see the class docstring
+        legacy = []
+        for table, key in (('voters', 'username'), ('candidates', 'number')):
+            columns = {row['name'] for row in conn.execute(f'PRAGMA table_info({table})')}
+            if columns and key not in columns:
+                legacy.append(table)
+        if not legacy:
+            return
+        counts = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] for table in legacy}
+        votes = 0
+        if 'candidates' in legacy:
+            votes = conn.execute('SELECT COALESCE(SUM(votes), 0) FROM candidates').fetchone()[0]
+        if votes:
+            raise IncompatibleDatabase(
+                f"{self.path} is from the first release and holds {votes} vote(s) for candidates "
+                f"without numbers, which cannot be carried into the new tally; finish that election "
+                f"with the old release or move the file aside")
+        for table in legacy:
+            conn.execute(f'ALTER TABLE {table} RENAME TO legacy_{table}')
+        log.warning("%s: moved %s from the first release to %s; they have no accounts or candidate "
+                    "numbers, so voters must register again", self.path,
+                    ", ".join(f"{counts[table]} {table}" for table in legacy),
+                    ", ".join(f"legacy_{table}" for table in legacy))
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout / 1000, isolation_level=None,
+                               check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        conn.execute(f'PRAGMA busy_timeout={self.busy_timeout}')
+        return conn
+
+    def _ensure_started(self):
+        # Threads and connections do not survive fork(), so a store created
+        # before gunicorn forks its workers is lazily re-initialised per process.
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._local = threading.local()
+            self._pending = queue.Queue()
+            self._writer = None
+            self._pid = os.getpid()
+
+    def _ensure_writer(self):
+        self._ensure_started()
+        if self._writer is None:
+            with self._start_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name='vote-writer', daemon=True)
+                    self._writer.start()
+
+    def _conn(self):
+        self._ensure_started()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # --- Candidates ---
+
+    def seed_candidates(self, candidates):
+        conn = self._conn()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany(
+                "INSERT OR IGNORE INTO candidates (number, name, party, image) VALUES (?, ?, ?, ?)",
+                [(number, c['name'], c['party'], c['image']) for number, c in candidates.items()])
+
+    def get_candidates(self):
+        return self.snapshot()[1]
+
+    def tally_version(self):
+        # Bumped once per accepted vote in the same transaction as the tally,
+        # so it identifies the tally exactly across all worker processes.
+        return self._conn().execute("SELECT version FROM tally WHERE id = 1").fetchone()[0]
+
+    def snapshot(self):
+        """Return (version, candidates) read from one consistent snapshot."""
+        conn = self._conn()
+        conn.execute('BEGIN')
+        try:
+            version = conn.execute("SELECT version FROM tally WHERE id = 1").fetchone()[0]
+            rows = conn.execute(
+                "SELECT number, name, party, image, votes FROM candidates ORDER BY rowid").fetchall()
+        finally:
+            conn.execute('COMMIT')
+        return version, {row['number']: {'name': row['name'], 'party': row['party'],
+                                          'image': row['image'], 'votes': row['votes']} for row in rows}
+
+    # --- Voters ---
+
+    def get_voter(self, username):
+        row = self._conn().execute(
+            "SELECT id_number, password_hash, has_voted FROM voters WHERE username = ?",
+            (username,)).fetchone()
+        if row is None:
+            return None
+        return {'id_number': row['id_number'], 'password_hash': row['password_hash'],
+                'has_voted': bool(row['has_voted'])}
+
+    def id_number_registered(self, id_number):
+        row = self._conn().execute(
+            "SELECT 1 FROM voters WHERE id_number = ? LIMIT 1", (id_number,)).fetchone()
+        return row is not None
+
+    def add_voter(self, username, id_number, password_hash):
+        # The primary key and the unique index on id_number make the insert
+        # itself the uniqueness check, so concurrent registrations cannot race.
+        conn = self._conn()
+        try:
+            conn.execute("INSERT INTO voters (username, id_number, password_hash) VALUES (?, ?, ?)",
+                         (username, id_number, password_hash))
+        except sqlite3.IntegrityError as e:
+            field = 'id_number' if 'voters.id_number' in str(e) else 'username'
+            raise DuplicateVoter(field) from None
+
+    def add_voters(self, voters):
+        """Insert (username, id_number, password_hash) rows in one transaction, skipping duplicates."""
+        conn = self._conn()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO voters (username, id_number, password_hash) VALUES (?, ?, ?)", voters)
+            return conn.total_changes - before
+
+    def registered_id_numbers(self, id_numbers):
+        conn = self._conn()
+        found = set()
+        id_numbers = list(id_numbers)
+        for start in range(0, len(id_numbers), 500):
+            chunk = id_numbers[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            found.update(row[0] for row in conn.execute(
+                f"SELECT id_number FROM voters WHERE id_number IN ({placeholders})", chunk))
+        return found
+
+    # --- Votes ---
+
+    def cast_vote(self, username, candidate_number):
+        """Record a vote; returns False if the voter had already voted or the candidate is unknown."""
+        self._ensure_writer()
+        ballot = _Ballot(username, candidate_number)
+        self._pending.put(ballot)
+        ballot.done.wait()
+        if ballot.error is not None:
+            raise ballot.error
+        return ballot.accepted
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            batch = [self._pending.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                accepted = 0
+                for ballot in batch:
+                    ballot.accepted = conn.execute(
+                        CAST_VOTE_SQL, (ballot.candidate_number, ballot.username)).rowcount == 1
+                    if ballot.accepted:
+                        conn.execute(MARK_VOTED_SQL, (ballot.username,))
+                        accepted += 1
+                if accepted:
+                    conn.execute("UPDATE tally SET version = version + ? WHERE id = 1", (accepted,))
+                conn.execute('COMMIT')
+            except sqlite3.Error as e:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                for ballot in batch:
+                    ballot.accepted = False
+                    ballot.error = e
+            for ballot in batch:
+                ballot.done.set()
@@ -0,0 +1,62 @@
+import argparse
+import sys
+import threading
+import time
+
+from counters import MemoryVoteStore
+
+CANDIDATES = {str(n): {"name": f"Candidate {n}", "party": "Stress Party", "image": "candidate1.png"}
+              for n in range(8)}
+
+
+def stress(votes, threads, attempts):
+    store = MemoryVoteStore()
+    store.seed_candidates(CANDIDATES)
+    numbers = list(CANDIDATES)
+    for i in range(votes):
+        store.add_voter(f"voter{i}", str(i), 'x')
+
+    accepted = [0] * threads
+    barrier = threading.Barrier(threads)
+
+    def worker(index):
+        # Every voter is tried `attempts` times from different threads, always
+        # for the same candidate, so exactly one attempt per voter must count.
+        barrier.wait()
+        count = 0
+        for i in range(index, votes * attempts, threads):
+            voter = i % votes
+            if store.cast_vote(f"voter{voter}", numbers[voter % len(numbers)]):
+                count += 1
+        accepted[index] = count
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    expected = {number: 0 for number in numbers}
+    for voter in range(votes):
+        expected[numbers[voter % len(numbers)]] += 1
+    totals = {number: c['votes'] for number, c in store.get_candidates().items()}
+    return elapsed, sum(accepted), totals, expected
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Fire concurrent votes at MemoryVoteStore and check exact totals.")
+    parser.add_argument('--votes', type=int, default=1_000_000)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--attempts', type=int, default=2, help="times each voter tries to vote")
+    args = parser.parse_args()
+
+    elapsed, accepted, totals, expected = stress(args.votes, args.threads, args.attempts)
+    attempts = args.votes * args.attempts
+    print(f"{attempts:,} vote attempts from {args.threads} threads in {elapsed:.1f}s "
+          f"({attempts / elapsed:,.0f}/s), {accepted:,} accepted")
+    if accepted != args.votes or totals != expected:
+        print(f"FAILED: expected {expected}, got {totals}")
+        sys.exit(1)
+    print("OK: every voter counted exactly once and per-candidate totals match")
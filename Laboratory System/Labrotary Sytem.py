@@ -1,102 +1,23 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
-import json
+from tkinter import ttk, messagebox, scrolledtext, simpledialog, filedialog
+import datetime
 import os
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle, Image
-import random
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
 import tempfile
+import threading
+import time
 import webbrowser
 import re
 
-DATA_FILE = 'reports_data.json'
+from analyzer_import import ImportWorker, summary as import_summary
+from lab_tests import LAB_TESTS
+from migrate_reports import coerce_value
+from reference_ranges import default_table
+from report_pdf import ReportRenderer, default_renderer
+from report_store import PAGE_SIZE, open_store
+from trends import SLOPE_DAYS, TrendCache, sparkline
 
 USERS = {'admin': 'password123'}
 
-LAB_TESTS = {
-    "Dengue Test": ["NS1", "IgM", "IgG"],
-    "Diabetes Test": ["Fasting Glucose", "HbA1c"],
-    "Blood Pressure Test": ["Systolic", "Diastolic"],
-    "HIV Test": ["RMD", "MDD", "SSI"],
-    "Thalassemia Test": ["Hemoglobin", "MCV", "MCH"],
-    "Chikungunya Test": ["IgM", "IgG"],
-    "Gonorrhea Test": ["NAAT", "Culture"],
-    "CBC": ["WBC", "RBC", "Hemoglobin", "Hematocrit", "MCV", "MCH", "MCHC", "Platelets"],
-    "Liver Function Test": ["ALT", "AST", "ALP", "Bilirubin", "Albumin"],
-    "Kidney Function Test": ["Creatinine", "BUN", "Uric Acid"],
-    "Lipid Profile": ["Total Cholesterol", "HDL", "LDL", "Triglycerides"],
-    "Thyroid Function Test": ["TSH", "T3", "T4"],
-    "Vitamin D Test": ["Vitamin D25"],
-    "Iron Panel": ["Iron", "TIBC", "Ferritin"],
-    "CRP": ["C-Reactive Protein"],
-    "ESR": ["Erythrocyte Sedimentation Rate"],
-    "Urinalysis": ["pH", "Protein", "Glucose", "Ketones", "RBC", "WBC"],
-    "Stool Test": ["Occult Blood", "Parasites", "Consistency", "Color"],
-    "Electrolyte Panel": ["Sodium", "Potassium", "Chloride", "Bicarbonate"],
-    "Prostate Specific Antigen": ["PSA"],
-    "Beta hCG": ["hCG Level"],
-    "Coagulation Profile": ["PT", "aPTT", "INR"],
-    "COVID-19 RT-PCR": ["Cycle Threshold"],
-    "HbA1c": ["HbA1c%"],
-    "Serum Calcium": ["Calcium Level"],
-    "Magnesium Test": ["Serum Magnesium"],
-    "Amylase": ["Amylase Level"],
-    "Lipase": ["Lipase Level"],
-    "Cortisol": ["Morning Cortisol"],
-    "Insulin": ["Fasting Insulin"],
-    "Troponin I": ["Troponin I Level"],
-    "D-Dimer": ["D-Dimer Level"],
-    "Hepatitis B": ["HBsAg", "Anti-HBs", "HBV DNA"],
-    "Hepatitis C": ["Anti-HCV", "HCV RNA"]
-    # Add more if needed...
-}
-
-def load_data():
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, 'r') as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return {}
-    return {}
-
-def save_data(data):
-    with open(DATA_FILE, 'w') as f:
-        json.dump(data, f, indent=4)
-
-def calculate_result(test_name, values):
-    try:
-        if test_name == "HIV Test":
-            score = sum(float(values[k]) for k in values)
-            return "Positive" if score > 100000 else "Negative"
-        elif test_name == "Diabetes Test":
-            fbg = float(values.get("Fasting Glucose", 0))
-            hb = float(values.get("HbA1c", 0))
-            if fbg > 126 or hb > 6.5:
-                return "Positive"
-            elif fbg > 100 or hb > 5.7:
-                return "Midrange"
-            else:
-                return "Negative"
-        elif test_name == "Blood Pressure Test":
-            sys = float(values.get("Systolic", 0))
-            dia = float(values.get("Diastolic", 0))
-            if sys >= 140 or dia >= 90:
-                return "Positive"
-            elif sys >= 120 or dia >= 80:
-                return "Midrange"
-            else:
-                return "Negative"
-        elif test_name in ["Dengue Test", "Thalassemia Test", "Chikungunya Test", "Gonorrhea Test"]:
-            return "Positive"  # Placeholder logic
-        else:
-            return "-"  # No final diagnosis needed
-    except:
-        return "Error"
 
 class LoginWindow:
     def __init__(self, root):
@@ -122,34 +43,82 @@ class LoginWindow:
 
 class MainApp:
     def __init__(self):
-        self.data = load_data()
+        self.store = open_store()
+        self.trends = TrendCache(self.store)
         self.root = tk.Tk()
         self.root.title("Patient Lab Report System")
-        self.root.geometry("500x400")
+        self.root.geometry("500x480")
         self.main_frame = tk.Frame(self.root)
         self.main_frame.pack(pady=20)
         tk.Label(self.main_frame, text="Patient Lab Report System", font=("Arial", 16)).pack(pady=10)
         tk.Button(self.main_frame, text="Add New Report", width=25, command=self.open_add_report).pack(pady=10)
         tk.Button(self.main_frame, text="View Reports", width=25, command=self.open_view_reports).pack(pady=10)
+        self.print_button = tk.Button(self.main_frame, text="Print Day's Reports", width=25, command=self.print_day_reports)
+        self.print_button.pack(pady=10)
+        tk.Button(self.main_frame, text="Import Analyzer Results", width=25, command=self.open_import).pack(pady=10)
         tk.Button(self.main_frame, text="Exit", width=25, command=self.root.quit).pack(pady=10)
         self.root.mainloop()
+        self.store.compact()
+        self.store.close()
 
     def open_add_report(self):
-        AddReportWindow(self.root, self.data, self.refresh_data)
+        AddReportWindow(self.root, self.store, self.trends)
 
     def open_view_reports(self):
-        ViewReportsWindow(self.root, self.data)
+        ViewReportsWindow(self.root, self.store, self.trends)
+
+    def open_import(self):
+        path = filedialog.askopenfilename(parent=self.root, title="Analyzer CSV export",
+                                          filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if path:
+            ImportWindow(self.root, self.store, path)
+
+    def print_day_reports(self):
+        day = simpledialog.askstring("Print Reports", "Print every report saved on (YYYY-MM-DD):",
+                                     initialvalue=datetime.date.today().isoformat(), parent=self.root)
+        if not day:
+            return
+        try:
+            reports = list(self.store.iter_search(since=day.strip(), until=day.strip()))
+        except ValueError:
+            messagebox.showerror("Error", "Dates must be in YYYY-MM-DD format.")
+            return
+        if not reports:
+            messagebox.showinfo("Print Reports", f"No reports were saved on {day.strip()}.")
+            return
+        # Rendering hundreds of pages takes a while, so it runs off the Tk thread
+        temp_pdf = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
+        temp_pdf.close()
+        outcome = {}
 
-    def refresh_data(self):
-        self.data = load_data()
+        def render():
+            try:
+                ReportRenderer().render_combined(temp_pdf.name, reports)
+            except Exception as e:
+                outcome['error'] = e
+            outcome['done'] = True
+
+        self.print_button.config(state='disabled', text=f"Printing {len(reports)} report(s)...")
+        threading.Thread(target=render, daemon=True).start()
+        self.root.after(200, self.check_printed, temp_pdf.name, outcome)
+
+    def check_printed(self, path, outcome):
+        if not outcome.get('done'):
+            self.root.after(200, self.check_printed, path, outcome)
+            return
+        self.print_button.config(state='normal', text="Print Day's Reports")
+        if 'error' in outcome:
+            messagebox.showerror("Error", f"Could not create the PDF: {outcome['error']}")
+        else:
+            webbrowser.open_new(path)
 
 class AddReportWindow:
-    def __init__(self, parent, data, refresh_callback):
+    def __init__(self, parent, store, trends):
         self.top = tk.Toplevel(parent)
         self.top.title("Add Report")
         self.top.geometry("500x600")
-        self.data = data
-        self.refresh_callback = refresh_callback
+        self.store = store
+        self.trends = trends
 
         tk.Label(self.top, text="Patient Name:").pack()
         self.name_entry = tk.Entry(self.top, width=40)
@@ -187,8 +156,12 @@ class AddReportWindow:
         name = self.name_entry.get().strip()
         phone = self.phone_entry.get().strip()
         test_name = self.test_var.get()
-        values = {param: self.param_entries[param].get().strip() for param in self.param_entries}
-        result = calculate_result(test_name, values)
+        values = {param: coerce_value(self.param_entries[param].get().strip()) for param in self.param_entries}
+        try:
+            result, _ = default_table().evaluate(test_name, values)
+        except ValueError as e:
+            messagebox.showerror("Invalid Value", str(e))
+            return
         report = {
             'name': name,
             'test': test_name,
@@ -196,23 +169,39 @@ class AddReportWindow:
             'result': result,
             'timestamp': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
-        self.data.setdefault(phone, []).append(report)
-        save_data(self.data)
+        report_id = self.store.add(phone, report)
+        self.trends.add(phone, report_id, report)
         messagebox.showinfo("Saved", f"Report saved")
-        self.refresh_callback()
         self.top.destroy()
         
 
 class ViewReportsWindow:
-    def __init__(self, parent, data):
+    def __init__(self, parent, store, trends):
         self.top = tk.Toplevel(parent)
         self.top.title("View Reports")
-        self.top.geometry("700x600")
-        self.data = data
-
-        tk.Label(self.top, text="Enter Phone Number:").pack(pady=5)
-        self.phone_entry = tk.Entry(self.top, width=40)
-        self.phone_entry.pack()
+        self.top.geometry("700x640")
+        self.store = store
+        self.trends = trends
+
+        filters = tk.Frame(self.top)
+        filters.pack(pady=5)
+        tk.Label(filters, text="Phone Number:").grid(row=0, column=0, sticky='e')
+        self.phone_entry = tk.Entry(filters, width=25)
+        self.phone_entry.grid(row=0, column=1)
+        tk.Label(filters, text="Name starts with:").grid(row=0, column=2, sticky='e')
+        self.name_entry = tk.Entry(filters, width=25)
+        self.name_entry.grid(row=0, column=3)
+        tk.Label(filters, text="Test:").grid(row=1, column=0, sticky='e')
+        self.test_var = tk.StringVar()
+        ttk.Combobox(filters, textvariable=self.test_var, values=[""] + list(LAB_TESTS.keys()),
+                     state='readonly', width=22).grid(row=1, column=1)
+        tk.Label(filters, text="From / To (YYYY-MM-DD):").grid(row=1, column=2, sticky='e')
+        dates = tk.Frame(filters)
+        dates.grid(row=1, column=3)
+        self.since_entry = tk.Entry(dates, width=11)
+        self.since_entry.pack(side=tk.LEFT)
+        self.until_entry = tk.Entry(dates, width=11)
+        self.until_entry.pack(side=tk.LEFT)
 
         tk.Button(self.top, text="Search Reports", command=self.search_reports).pack(pady=5)
 
@@ -223,125 +212,275 @@ class ViewReportsWindow:
         self.pdf_button = tk.Button(self.top, text="Generate PDF for Selected Report", command=self.generate_pdf_for_selected, state='disabled')
         self.pdf_button.pack(pady=5)
 
+        self.trends_button = tk.Button(self.top, text="Show Trends for Selected Patient", command=self.show_trends, state='disabled')
+        self.trends_button.pack(pady=5)
+
+        pager = tk.Frame(self.top)
+        pager.pack()
+        self.prev_button = tk.Button(pager, text="< Previous", command=self.previous_page, state='disabled')
+        self.prev_button.pack(side=tk.LEFT)
+        self.page_label = tk.Label(pager, text="", width=20)
+        self.page_label.pack(side=tk.LEFT)
+        self.next_button = tk.Button(pager, text="Next >", command=self.next_page, state='disabled')
+        self.next_button.pack(side=tk.LEFT)
+
         self.result_text = scrolledtext.ScrolledText(self.top, width=80, height=20)
         self.result_text.pack(pady=10)
 
-        self.reports_for_phone = []
+        # page_starts[i] is the cursor that fetches page i; only one page of reports is held at a time
+        self.filters = {}
+        self.page_starts = [None]
+        self.page = 0
+        self.page_rows = []
+        self.next_cursor = None
 
     def search_reports(self):
-        phone = self.phone_entry.get().strip()
+        self.filters = {
+            'phone': self.phone_entry.get().strip(),
+            'name': self.name_entry.get().strip(),
+            'test': self.test_var.get(),
+            'since': self.since_entry.get().strip(),
+            'until': self.until_entry.get().strip(),
+        }
+        if not any(self.filters.values()):
+            messagebox.showwarning("Warning", "Enter a phone number, name, test or date range.")
+            return
+        self.page_starts = [None]
+        self.show_page(0)
+
+    def next_page(self):
+        if self.next_cursor is not None:
+            del self.page_starts[self.page + 1:]
+            self.page_starts.append(self.next_cursor)
+            self.show_page(self.page + 1)
+
+    def previous_page(self):
+        if self.page > 0:
+            self.show_page(self.page - 1)
+
+    def show_page(self, page):
         self.result_text.delete('1.0', tk.END)
         self.report_dropdown['values'] = []
         self.report_select_var.set('')
         self.pdf_button.config(state='disabled')
-
-        if phone in self.data:
-            self.reports_for_phone = self.data[phone]
-            report_list = [f"Report #{i+1}: {r['test']}" for i, r in enumerate(self.reports_for_phone)]
+        self.trends_button.config(state='disabled')
+        try:
+            self.page_rows, self.next_cursor = self.store.search(after=self.page_starts[page], **self.filters)
+        except ValueError:
+            messagebox.showerror("Error", "Dates must be in YYYY-MM-DD format.")
+            return
+        self.page = page
+        first = page * PAGE_SIZE + 1
+        self.prev_button.config(state='normal' if page > 0 else 'disabled')
+        self.next_button.config(state='normal' if self.next_cursor is not None else 'disabled')
+        self.page_label.config(text=f"Page {page + 1}" if self.page_rows else "")
+
+        if self.page_rows:
+            report_list = [f"Report #{first + i}: {r['test']}" for i, (_, _, r) in enumerate(self.page_rows)]
             self.report_dropdown['values'] = report_list
+            self.report_select_var.set(report_list[0])
+            self.pdf_button.config(state='normal')
+            self.trends_button.config(state='normal')
 
-            if report_list:
-                self.report_select_var.set(report_list[0])
-                self.pdf_button.config(state='normal')
-
-            for idx, report in enumerate(self.reports_for_phone, 1):
+            for idx, (_, phone, report) in enumerate(self.page_rows, first):
                 self.result_text.insert(tk.END, f"Report #{idx}\n")
-                self.result_text.insert(tk.END, f"Name: {report['name']}\n")
+                self.result_text.insert(tk.END, f"Name: {report['name']}  Phone: {phone}\n")
+                self.result_text.insert(tk.END, f"Test: {report['test']}  Time: {report['timestamp'] or '-'}\n")
+                flags = default_table().flags(report['test'], report['values'])
                 for param, val in report['values'].items():
-                    self.result_text.insert(tk.END, f"  {param}: {val}\n")
+                    flag = flags.get(param)
+                    self.result_text.insert(tk.END, f"  {param}: {val}" + (f" ({flag})" if flag and flag != "normal" else "") + "\n")
                 if report['result'] != "-":
                     self.result_text.insert(tk.END, f"Final Result: {report['result']}\n")
                 self.result_text.insert(tk.END, "-" * 50 + "\n")
         else:
-            self.result_text.insert(tk.END, "No reports found for that number.")
+            self.result_text.insert(tk.END, "No reports found.")
 
-    def generate_pdf_for_selected(self):
+    def selected_row(self):
         selected = self.report_select_var.get()
         if not selected:
             messagebox.showwarning("Warning", "Please select a report from the dropdown.")
-            return
+            return None
 
         match = re.search(r'#(\d+):', selected)
         if match:
-            idx = int(match.group(1)) - 1
+            number = int(match.group(1))
         else:
             messagebox.showerror("Error", "Invalid report format selected.")
-            return
+            return None
+        return number, self.page_rows[number - 1 - self.page * PAGE_SIZE]
 
-        report = self.reports_for_phone[idx]
-        phone = self.phone_entry.get().strip()
-        self.generate_pdf(phone, report, idx + 1)
+    def generate_pdf_for_selected(self):
+        selected = self.selected_row()
+        if selected:
+            number, (_, phone, report) = selected
+            self.generate_pdf(phone, report, number)
+
+    def show_trends(self):
+        selected = self.selected_row()
+        if selected:
+            _, (_, phone, report) = selected
+            TrendsWindow(self.top, self.trends.get(phone), report['name'])
 
     def generate_pdf(self, phone, report, report_number):
         temp_pdf = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-        doc = SimpleDocTemplate(
-            temp_pdf.name,
-            pagesize=letter,
-            rightMargin=40,
-            leftMargin=40,
-            topMargin=80,
-            bottomMargin=40
-        )
-
-        story = []
-
-        styles = getSampleStyleSheet()
-        styles.add(ParagraphStyle(name='CenterTitle', fontSize=24, alignment=1, spaceAfter=20,
-                                  textColor=colors.darkblue, fontName='Helvetica-Bold'))
-        styles.add(ParagraphStyle(name='Heading', fontSize=14, textColor=colors.darkred,
-                                  spaceAfter=10, fontName='Helvetica-Bold'))
-        styles.add(ParagraphStyle(name='NormalBold', fontSize=12, fontName='Helvetica-Bold'))
-
-        # Optional logo
-        logo_path = "asiri.jpg"
-        if os.path.exists(logo_path):
-            img = Image(logo_path, width=3.0 * inch, height=2.0 * inch)
-            img.hAlign = 'CENTER'
-            story.append(img)
-            story.append(Spacer(1, 12))
-
-        # Title
-        story.append(Paragraph("Asiri Laboratories Sri Lanka", styles['CenterTitle']))
-
-        # Receipt and Phone
-        receipt_num = random.randint(100000, 999999)
-        story.append(Paragraph(f"<b>Receipt Number:</b> {receipt_num}", styles['NormalBold']))
-        story.append(Paragraph(f"<b>Time:</b> {report['timestamp']}", styles['NormalBold']))
-        story.append(Spacer(1, 12))
-
-        # Report Info
-        story.append(Paragraph(f"Report #{report_number}: {report['test']}", styles['Heading']))
-        story.append(Paragraph(f"Patient Name: {report['name']}", styles['NormalBold']))
-        story.append(Paragraph(f"Phone Number: {phone}", styles['NormalBold']))
-        story.append(Spacer(1, 10))
-
-        # Table Data
-        data = [["Test", "Result"]]
-        for param, val in report['values'].items():
-            data.append([param, val])
-        if report['result'] != "-":
-            data.append(["Observation", report['result']])
-
-        table = Table(data, colWidths=[3 * inch, 3 * inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.steelblue),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-
-            ('BACKGROUND', (0, 1), (-1, -1), colors.whitesmoke),
-            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 11),
-        ]))
-        story.append(table)
-        story.append(Spacer(1, 20))
-
-        doc.build(story)
+        temp_pdf.close()
+        default_renderer().render(temp_pdf.name, phone, report, report_number)
         webbrowser.open_new(temp_pdf.name)
 
+class TrendsWindow:
+    ROW_HEIGHT = 64
+    SPARK_BOX = (170, 12, 400, 52)  # within each row
+
+    def __init__(self, parent, trends, name):
+        self.top = tk.Toplevel(parent)
+        self.top.title(f"Trends: {name or trends.phone}")
+        self.top.geometry("680x600")
+        self.table = default_table()
+
+        # One canvas for every chart: hundreds of points per line cost nothing next to one widget per parameter
+        frame = tk.Frame(self.top)
+        frame.pack(fill=tk.BOTH, expand=True)
+        scrollbar = tk.Scrollbar(frame, orient=tk.VERTICAL)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas = tk.Canvas(frame, background='white', yscrollcommand=scrollbar.set)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.config(command=self.canvas.yview)
+
+        y = 10
+        self.canvas.create_text(10, y, anchor='nw', font=("Arial", 12, "bold"),
+                                text=f"{name}  ({trends.phone})" if name else trends.phone)
+        y += 30
+        test = None
+        for (series_test, param), series in trends.items():
+            if series_test != test:
+                test = series_test
+                self.canvas.create_text(10, y, anchor='nw', text=test, font=("Arial", 11, "bold"), fill='darkred')
+                y += 22
+            self.draw_series(y, series_test, param, series)
+            y += self.ROW_HEIGHT
+        if test is None:
+            self.canvas.create_text(10, y, anchor='nw', text="No dated numeric results for this patient.")
+            y += 22
+        if trends.undated:
+            self.canvas.create_text(10, y, anchor='nw', fill='grey',
+                                    text=f"{trends.undated} report(s) without a date are not charted.")
+            y += 22
+        self.canvas.config(scrollregion=(0, 0, 660, y))
+
+    def draw_series(self, y, test, param, series):
+        canvas = self.canvas
+        compiled = self.table.tests[test]
+        low, high = compiled.bounds[param]
+        unit = compiled.units[param]
+        stats = series.summary()
+        days, values = series.arrays()
+        x0, y0, x1, y1 = self.SPARK_BOX
+        box = (x0, y + y0, x1, y + y1)
+
+        canvas.create_text(10, y + 32, anchor='w', text=f"{param} ({unit})" if unit else param)
+        points, y_of = sparkline(days, values, box, low, high)
+        # Reference band, clipped to the chart
+        band_top = box[1] if high is None else min(max(y_of(high), box[1]), box[3])
+        band_bottom = box[3] if low is None else min(max(y_of(low), box[1]), box[3])
+        if band_bottom > band_top:
+            canvas.create_rectangle(x0, band_top, x1, band_bottom, fill='#e3f2e1', outline='')
+        if len(points) > 2:
+            canvas.create_line(*points, fill='steelblue')
+        flag = "low" if low is not None and stats['last'] < low else "high" if high is not None and stats['last'] > high else ""
+        last_x, last_y = points[-2], points[-1]
+        canvas.create_oval(last_x - 3, last_y - 3, last_x + 3, last_y + 3, outline='',
+                           fill='red' if flag else 'steelblue')
+
+        first_day = datetime.date(1970, 1, 1) + datetime.timedelta(days=int(days[0]))
+        last_day = datetime.date(1970, 1, 1) + datetime.timedelta(days=int(days[-1]))
+        slope = "" if stats['slope'] is None else f"   {stats['slope']:+.3g} per {SLOPE_DAYS} days"
+        canvas.create_text(415, y + 32, anchor='w', font=("Arial", 9),
+                           text=f"last {stats['last']:g}" + (f" ({flag})" if flag else "") + f"   n={stats['count']}\n"
+                                f"min {stats['min']:g}   max {stats['max']:g}{slope}\n"
+                                f"{first_day} to {last_day}")
+
+
+class ImportWindow:
+    POLL_MS = 100
+
+    def __init__(self, parent, store, path):
+        self.top = tk.Toplevel(parent)
+        self.top.title("Import Analyzer Results")
+        self.top.geometry("420x260")
+        self.store = store
+        self.path = path
+        self.worker = None
+        self.poll_id = None
+
+        tk.Label(self.top, text=f"File: {os.path.basename(path)}").pack(pady=5)
+        tk.Label(self.top, text="Test (only if the file has no test column):").pack()
+        self.test_var = tk.StringVar()
+        self.test_box = ttk.Combobox(self.top, textvariable=self.test_var, values=[""] + list(LAB_TESTS.keys()),
+                                     state='readonly', width=30)
+        self.test_box.pack()
+        self.progress = ttk.Progressbar(self.top, length=360, maximum=100, mode='determinate')
+        self.progress.pack(pady=10)
+        self.status_label = tk.Label(self.top, text="")
+        self.status_label.pack()
+        self.start_button = tk.Button(self.top, text="Start Import", command=self.start)
+        self.start_button.pack(pady=5)
+        self.cancel_button = tk.Button(self.top, text="Cancel", command=self.cancel, state='disabled')
+        self.cancel_button.pack()
+        self.top.protocol("WM_DELETE_WINDOW", self.close)
+
+    def start(self):
+        # Parsing and committing run on a worker thread with its own connection; Tk only polls it.
+        # After a failure that left batches committed, the new worker carries on after their rows.
+        resume = self.worker.progress[2] if self.worker is not None and self.worker.error else None
+        self.worker = ImportWorker(self.path, self.store.path, default_test=self.test_var.get() or None,
+                                   resume=resume)
+        self.worker.start()
+        self.started = time.perf_counter()
+        self.start_button.config(state='disabled')
+        self.cancel_button.config(state='normal')
+        self.poll_id = self.top.after(self.POLL_MS, self.poll)
+
+    def poll(self):
+        done, total, stats = self.worker.progress
+        self.progress['value'] = 100 * done / max(total, 1)
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        self.status_label.config(text=f"{stats['rows']:,} rows read, {stats['imported']:,} imported "
+                                      f"({stats['rows'] / elapsed:,.0f} rows/s)")
+        if not self.worker.done:
+            self.poll_id = self.top.after(self.POLL_MS, self.poll)
+            return
+        self.poll_id = None
+        self.cancel_button.config(state='disabled')
+        if self.worker.error:
+            imported = stats['imported']
+            if imported:
+                # Starting over would store the committed rows a second time
+                self.test_box.config(state='disabled')
+                self.start_button.config(text="Resume Import")
+                messagebox.showerror("Import Failed", f"{self.worker.error}\n\n{imported:,} row(s) were imported "
+                                     f"before the error. Resume Import continues after them.", parent=self.top)
+            else:
+                messagebox.showerror("Import Failed", self.worker.error, parent=self.top)
+            self.start_button.config(state='normal')
+        else:
+            self.progress['value'] = 100
+            messagebox.showinfo("Import Finished", import_summary(self.worker.result), parent=self.top)
+            self.top.destroy()
+
+    def cancel(self):
+        if self.worker is not None:
+            self.worker.cancel.set()
+            self.status_label.config(text="Cancelling after the current batch...")
+
+    def close(self):
+        # Closing the window stops the import at the next batch boundary; committed batches stay
+        self.cancel()
+        if self.poll_id is not None:
+            self.top.after_cancel(self.poll_id)
+        self.top.destroy()
+
+
 if __name__ == "__main__":
     root = tk.Tk()
     LoginWindow(root)
@@ -0,0 +1,212 @@
+import argparse
+import collections
+import csv
+import datetime
+import io
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from lab_tests import LAB_TESTS
+from migrate_reports import coerce_value, score
+from reference_ranges import default_table
+from report_store import DB_FILE, ReportStore
+
+# Header names analyzers use for the non-parameter columns (compared lower-case)
+FIELD_ALIASES = {
+    'phone': {'phone', 'phone number', 'mobile', 'patient phone', 'contact'},
+    'name': {'name', 'patient', 'patient name'},
+    'test': {'test', 'test name', 'panel', 'assay', 'profile'},
+    'timestamp': {'timestamp', 'date', 'datetime', 'result time', 'time', 'collected'},
+}
+
+_UNITS = re.compile(r'\s*[\[(].*?[\])]\s*$')
+
+
+def _header_key(header):
+    # "Fasting Glucose (mg/dL)" and " fasting glucose " both become "fasting glucose"
+    return _UNITS.sub('', header).strip().lower()
+
+
+class ColumnMap:
+    """Where each field and LAB_TESTS parameter is in an analyzer CSV.
+
+    Parameter columns are matched to parameter names ignoring case and a
+    trailing unit such as "(mg/dL)". A parameter that several tests share
+    (MCV, IgM, ...) is one column; each row takes the parameters of its own
+    test. Without a test column every row is ``default_test``.
+    """
+
+    def __init__(self, header, lab_tests=LAB_TESTS, default_test=None):
+        keys = [_header_key(column) for column in header]
+        self.fields = {}
+        for field, aliases in FIELD_ALIASES.items():
+            for index, key in enumerate(keys):
+                if key in aliases:
+                    self.fields[field] = index
+                    break
+        if 'phone' not in self.fields:
+            raise ValueError("no phone number column")
+        if 'test' not in self.fields and default_test not in lab_tests:
+            raise ValueError("no test column; choose the test these results are for")
+        position = {key: index for index, key in enumerate(keys)}
+        # test -> [(parameter, column index)] for the parameters the file has
+        self.params = {test: [(param, position[param.lower()]) for param in params if param.lower() in position]
+                       for test, params in lab_tests.items()}
+        # Parameters the reference table measures as numbers; text there means a misread column
+        table = default_table()
+        self.numeric = {test: set(table.tests[test].params) if test in table else set() for test in lab_tests}
+        self.default_test = default_test
+        if not any(self.params.values()):
+            raise ValueError("no column matches a test parameter")
+
+    def report(self, row, imported_at):
+        """(phone, report) for a CSV row; raises ValueError saying why a row is unusable."""
+        fields = self.fields
+        phone = row[fields['phone']].strip() if fields['phone'] < len(row) else ""
+        if not phone:
+            raise ValueError("no phone number")
+        test = row[fields['test']].strip() if 'test' in fields and fields['test'] < len(row) else self.default_test
+        if test not in self.params:
+            raise ValueError("unknown test")
+        values = {param: coerce_value(row[index].strip()) for param, index in self.params[test] if index < len(row)}
+        if not any(value != "" for value in values.values()):
+            raise ValueError("no values")
+        if any(isinstance(values[param], str) and values[param] for param in self.numeric[test] & values.keys()):
+            raise ValueError("value is not a number")
+        timestamp = imported_at
+        if 'timestamp' in fields and fields['timestamp'] < len(row) and row[fields['timestamp']].strip():
+            try:
+                when = datetime.datetime.fromisoformat(row[fields['timestamp']].strip())
+            except ValueError:
+                raise ValueError("bad timestamp") from None
+            timestamp = when.replace(tzinfo=None).isoformat(sep=' ', timespec='seconds')
+        name = row[fields['name']].strip() if 'name' in fields and fields['name'] < len(row) else ""
+        return phone, {'name': name, 'test': test, 'values': values, 'result': "-", 'timestamp': timestamp}
+
+
+def import_csv(path, store, lab_tests=LAB_TESTS, default_test=None, batch_size=50000, progress=None, cancel=None,
+               resume=None):
+    """Load an analyzer CSV export into a ReportStore.
+
+    Rows are parsed and scored a batch at a time and every batch is
+    committed as one transaction, so a cancelled or failed import keeps
+    the batches already committed. ``progress(done_bytes, total_bytes,
+    stats)`` is called after each batch is committed; ``cancel`` is a
+    threading.Event. Passing the stats of the last ``progress`` call as
+    ``resume`` continues a stopped import of the same file after the rows
+    those batches covered, instead of storing them twice.
+    Returns a Counter: 'rows', 'imported' and 'skipped: <reason>' counts.
+    Raises ValueError if the header cannot be mapped.
+    """
+    table = default_table()
+    stats = collections.Counter(resume or ())
+    stats.pop('cancelled', None)
+    done_rows = stats['rows']
+    total = os.path.getsize(path)
+    imported_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with open(path, 'rb') as raw:
+        # Progress comes from the byte position of the binary file under the text reader
+        reader = csv.reader(io.TextIOWrapper(raw, encoding='utf-8-sig', newline=''))
+        header = next(reader, None)
+        if header is None:
+            raise ValueError("empty file")
+        columns = ColumnMap(header, lab_tests, default_test)
+        batch = []
+        for row in reader:
+            if not row:
+                continue
+            if done_rows:
+                done_rows -= 1
+                continue
+            stats['rows'] += 1
+            try:
+                batch.append(columns.report(row, imported_at))
+            except ValueError as e:
+                stats[f'skipped: {e}'] += 1
+            if len(batch) >= batch_size:
+                _commit(store, batch, table, stats)
+                if progress:
+                    progress(raw.tell(), total, stats)
+                if cancel is not None and cancel.is_set():
+                    stats['cancelled'] = 1
+                    return stats
+        _commit(store, batch, table, stats)
+    if progress:
+        progress(total, total, stats)
+    return stats
+
+
+def _commit(store, batch, table, stats):
+    if batch:
+        score(batch, table)
+        store.add_many(batch)
+        stats['imported'] += len(batch)
+        batch.clear()
+
+
+class ImportWorker(threading.Thread):
+    """Runs import_csv off the Tk thread, on its own database connection.
+
+    The Tk side polls ``progress`` (done bytes, total bytes, stats) and
+    ``done``; ``result`` is the stats or ``error`` the exception message.
+    After an error the stats in ``progress`` are those of the last
+    committed batch, ready to pass as ``resume`` to a new worker.
+    """
+
+    def __init__(self, path, db_path, lab_tests=LAB_TESTS, default_test=None, resume=None):
+        super().__init__(name="analyzer-import", daemon=True)
+        self.path = path
+        self.db_path = db_path
+        self.lab_tests = lab_tests
+        self.default_test = default_test
+        self.cancel = threading.Event()
+        self.resume = resume
+        self.progress = (0, 1, collections.Counter(resume or ()))
+        self.result = None
+        self.error = None
+        self.done = False
+
+    def run(self):
+        store = ReportStore(self.db_path)
+        try:
+            self.result = import_csv(self.path, store, self.lab_tests, self.default_test,
+                                     progress=self._report, cancel=self.cancel, resume=self.resume)
+        except (OSError, ValueError, UnicodeDecodeError, csv.Error, sqlite3.Error) as e:
+            self.error = str(e)
+        finally:
+            store.close()
+            self.done = True
+
+    def _report(self, done, total, stats):
+        self.progress = (done, total, collections.Counter(stats))
+
+
+def summary(stats):
+    lines = [f"Imported {stats['imported']:,} of {stats['rows']:,} row(s)."]
+    lines += [f"{key[len('skipped: '):].capitalize()}: {count:,}" for key, count in sorted(stats.items())
+              if key.startswith('skipped: ')]
+    if stats.get('cancelled'):
+        lines.append("Cancelled; the rows committed before cancelling were kept.")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import an analyzer CSV export into the report database.")
+    parser.add_argument("file")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--test", help="test for every row when the file has no test column")
+    args = parser.parse_args()
+
+    store = ReportStore(args.db)
+    start = time.perf_counter()
+    try:
+        stats = import_csv(args.file, store, default_test=args.test)
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        store.close()
+    print(summary(stats))
+    print(f"{stats['rows'] / (time.perf_counter() - start):,.0f} rows/s")
@@ -0,0 +1,72 @@
+import argparse
+import csv
+import datetime
+import os
+import random
+import tempfile
+import time
+
+from analyzer_import import ImportWorker, summary
+from bench_rules import synthetic_values
+from reference_ranges import REFERENCE_RANGES
+from report_store import ReportStore
+
+TESTS = ["CBC", "Lipid Profile", "Diabetes Test", "Kidney Function Test", "Liver Function Test", "Electrolyte Panel"]
+
+
+def write_export(path, rows, seed=1):
+    # A wide analyzer export: one row per sample, parameter columns with units, blanks for other panels
+    rng = random.Random(seed)
+    params = []
+    for test in TESTS:
+        for param, (_, _, unit) in REFERENCE_RANGES[test]["ranges"].items():
+            if param not in params:
+                params.append(param)
+    units = {param: unit for test in TESTS for param, (_, _, unit) in REFERENCE_RANGES[test]["ranges"].items()}
+    start = datetime.datetime(2025, 1, 1, 7, 0)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["Result Time", "Patient Phone", "Patient Name", "Assay"] +
+                        [f"{param} ({units[param]})" for param in params])
+        for i in range(rows):
+            test = rng.choice(TESTS)
+            values = synthetic_values(test, rng)
+            writer.writerow([(start + datetime.timedelta(seconds=i * 20)).isoformat(timespec="seconds"),
+                             f"07{rng.randrange(rows // 4 + 1):08d}", f"Patient {i % 5000}", test] +
+                            [values.get(param, "") for param in params])
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk analyzer CSV import throughput and UI responsiveness.")
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "export.csv")
+        write_export(source, args.rows)
+        print(f"{args.rows:,} rows, {os.path.getsize(source) / 2 ** 20:,.0f} MiB")
+        db_path = os.path.join(tmp, "reports.db")
+        ReportStore(db_path).close()
+
+        worker = ImportWorker(source, db_path)
+        start = time.perf_counter()
+        worker.start()
+        # Stand-in for the Tk loop: a 10 ms timer, measuring how late each tick runs
+        lateness = []
+        while not worker.done:
+            tick = time.perf_counter()
+            time.sleep(0.01)
+            lateness.append(time.perf_counter() - tick - 0.01)
+        worker.join()
+        elapsed = time.perf_counter() - start
+        if worker.error:
+            raise SystemExit(worker.error)
+        print(summary(worker.result))
+        print(f"{elapsed:.1f} s, {args.rows / elapsed:,.0f} rows/s")
+        print(f"UI timer lateness while importing: p50 {percentile(lateness, 50) * 1000:.1f} ms, "
+              f"p99 {percentile(lateness, 99) * 1000:.1f} ms, max {max(lateness) * 1000:.1f} ms")
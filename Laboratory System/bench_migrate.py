@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_rules import synthetic_values
+from migrate_reports import migrate
+from reference_ranges import REFERENCE_RANGES
+
+
+def write_legacy(path, count, seed=1):
+    # reports_data.json as save_data wrote it (indent=4), with both record shapes and some damage
+    rng = random.Random(seed)
+    tests = list(REFERENCE_RANGES)
+    patients = max(1, count // 5)
+    with open(path, 'w') as f:
+        f.write("{\n")
+        written = 0
+        for patient in range(patients):
+            reports = []
+            for _ in range(count // patients + (patient < count % patients)):
+                test = rng.choice(tests)
+                values = synthetic_values(test, rng)
+                roll = rng.random()
+                if roll < 0.1:
+                    reports.append({'name': f"Patient {patient}", 'test_name': test, 'tests': values})
+                elif roll < 0.11:
+                    reports.append({'name': f"Patient {patient}", 'values': values})  # no test: invalid
+                else:
+                    reports.append({'name': f"Patient {patient}", 'test': test, 'values': values, 'result': "-",
+                                    'timestamp': f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 09:30:00"})
+            entry = json.dumps({f"07{patient:08d}": reports}, indent=4)[2:-2]
+            f.write(("," if written else "") + entry + "\n")
+            written += len(reports)
+        f.write("}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming migration of a large reports_data.json.")
+    parser.add_argument("--reports", type=int, default=2000000)
+    parser.add_argument("--compare-load", action="store_true",
+                        help="also measure the peak memory of json.load on the same file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "reports_data.json")
+        start = time.perf_counter()
+        write_legacy(source, args.reports)
+        size = os.path.getsize(source)
+        print(f"wrote {args.reports:,} reports, {size / 2 ** 20:,.0f} MiB, in {time.perf_counter() - start:.0f} s")
+
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        with open(os.path.join(tmp, "reports.jsonl"), 'w') as out:
+            stats = migrate(source, out)
+        elapsed = time.perf_counter() - start
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        out_size = os.path.getsize(os.path.join(tmp, "reports.jsonl"))
+        print(f"migrated {stats['migrated']:,} of {stats['read']:,} in {elapsed:.1f} s "
+              f"({stats['read'] / elapsed:,.0f} reports/s, {size / 2 ** 20 / elapsed:.0f} MiB/s); "
+              f"output {out_size / 2 ** 20:,.0f} MiB ({out_size / size:.0%} of input)")
+        print(f"peak memory {peak / 1024:,.0f} MiB (grew {(peak - before) / 1024:,.0f} MiB during migration)")
+        print(", ".join(f"{key}: {value:,}" for key, value in sorted(stats.items()) if key not in ('read', 'migrated')))
+
+        if args.compare_load:
+            code = ("import json, resource, sys; json.load(open(sys.argv[1])); "
+                    "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)")
+            peak = int(subprocess.check_output([sys.executable, "-c", code, source]))
+            print(f"json.load of the same file: peak memory {peak / 1024:,.0f} MiB")
@@ -0,0 +1,72 @@
+import argparse
+import os
+import tempfile
+import time
+
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import Image
+
+from bench_queries import synthetic_reports
+from report_pdf import ReportRenderer, render_batch
+
+
+def make_logo(path):
+    # A photo-sized JPEG standing in for asiri.jpg
+    from PIL import Image as PILImage
+    PILImage.effect_noise((900, 600), 60).convert("RGB").save(path, quality=90)
+
+
+def legacy_render(directory, logo_path, reports):
+    # What generate_pdf did per report: a fresh style sheet and a fresh logo read every time
+    renderer = ReportRenderer(logo_path="")
+    rl_config.useA85 = 1
+    for number, phone, report in reports:
+        styles = getSampleStyleSheet()
+        styles.add(ParagraphStyle(name='CenterTitle', fontSize=24, alignment=1, spaceAfter=20,
+                                  textColor=colors.darkblue, fontName='Helvetica-Bold'))
+        styles.add(ParagraphStyle(name='Heading', fontSize=14, textColor=colors.darkred,
+                                  spaceAfter=10, fontName='Helvetica-Bold'))
+        styles.add(ParagraphStyle(name='NormalBold', fontSize=12, fontName='Helvetica-Bold'))
+        renderer.styles = styles
+        story = renderer.story(phone, report, number)
+        if os.path.exists(logo_path):
+            img = Image(logo_path, width=3.0 * inch, height=2.0 * inch)
+            img.hAlign = 'CENTER'
+            story.insert(0, img)
+        renderer._document(os.path.join(directory, f"legacy-{number}.pdf")).build(story)
+    rl_config.useA85 = 0
+
+
+def rate(label, count, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>34}: {count / elapsed:7.1f} reports/s ({elapsed:.2f} s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lab-report PDF rendering throughput.")
+    parser.add_argument("--reports", type=int, default=500)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    reports = [(number, phone, report) for number, (phone, report) in
+               enumerate(synthetic_reports(args.reports), 1)]
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            make_logo("asiri.jpg")
+            rate("one at a time (before)", len(reports),
+                 lambda: legacy_render(tmp, "asiri.jpg", reports))
+            for workers in args.workers:
+                rate(f"batch, {workers} process(es)", len(reports),
+                     lambda: render_batch(reports, os.path.join(tmp, f"batch{workers}"), workers))
+            rate("combined document", len(reports),
+                 lambda: ReportRenderer().render_combined(os.path.join(tmp, "combined.pdf"), reports))
+        finally:
+            os.chdir(cwd)
+        print(f"{os.cpu_count()} CPU(s)")
@@ -0,0 +1,101 @@
+import argparse
+import datetime
+import os
+import random
+import tempfile
+import time
+
+from bench_reports import PARAMETERS, percentile
+from report_store import PAGE_SIZE, ReportStore
+
+FIRST = ["Amal", "Kasun", "Nimal", "Saman", "Dilani", "Chathu", "Janith", "Ishara", "Tharindu", "Ruwan",
+         "Sachini", "Nadeesha", "Pradeep", "Kavindi", "Harsha", "Malini", "Asanka", "Dinesh", "Gayani", "Lahiru"]
+LAST = ["Perera", "Silva", "Fernando", "Jayasuriya", "Gunarathne", "Bandara", "Wickramasinghe", "Dissanayake",
+        "Rajapaksha", "Herath"]
+
+
+def synthetic_reports(count, seed=1):
+    rng = random.Random(seed)
+    start = datetime.datetime(2023, 1, 1)
+    for i in range(count):
+        test = rng.choice(list(PARAMETERS))
+        # Spread evenly over two and a half years, in saving order
+        when = start + datetime.timedelta(minutes=i * 1.3 * 10 ** 6 / count)
+        yield f"07{rng.randrange(count // 3 + 1):08d}", {
+            'name': f"{rng.choice(FIRST)} {rng.choice(LAST)} {rng.randrange(1000)}",
+            'test': test,
+            'values': {param: f"{rng.uniform(1, 200):.1f}" for param in PARAMETERS[test]},
+            'result': "-",
+            'timestamp': when.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+
+def legacy_search(data, name=None, test=None, since=None, until=None):
+    # Without indexes: walk every patient's reports loaded from reports_data.json
+    name = name.lower() if name else None
+    found = []
+    for phone, reports in data.items():
+        for report in reports:
+            if name and not report['name'].lower().startswith(name):
+                continue
+            if test and report['test'] != test:
+                continue
+            if since and report['timestamp'][:10] < since:
+                continue
+            if until and report['timestamp'][:10] > until:
+                continue
+            found.append((phone, report))
+    return found
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return percentile(timings, 50)
+
+
+def walk_pages(store, pages, **filters):
+    cursor = None
+    for _ in range(pages):
+        rows, cursor = store.search(after=cursor, **filters)
+        if cursor is None:
+            break
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report lookups by phone, name, test and date on a large history.")
+    parser.add_argument("--reports", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    queries = {
+        "phone": {'phone': "0700001234"},
+        "name prefix 'kas'": {'name': "kas"},
+        "name prefix 'nimal perera'": {'name': "nimal perera"},
+        "test": {'test': "Lipid Profile"},
+        "test + one month": {'test': "CBC", 'since': "2024-03-01", 'until': "2024-03-31"},
+        "one day": {'since': "2024-06-15", 'until': "2024-06-15"},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ReportStore(os.path.join(tmp, "reports.db"))
+        start = time.perf_counter()
+        store.add_many(synthetic_reports(args.reports))
+        print(f"stored {args.reports:,} reports with indexes in {time.perf_counter() - start:.1f} s")
+
+        data = {}
+        for phone, report in synthetic_reports(args.reports):
+            data.setdefault(phone, []).append(report)
+
+        for label, filters in queries.items():
+            first = timed(lambda: store.search(**filters), args.repeat)
+            fiftieth = timed(lambda: walk_pages(store, 50, **filters), max(1, args.repeat // 5))
+            if 'phone' in filters:
+                legacy = timed(lambda: data.get(filters['phone']), 3)
+            else:
+                legacy = timed(lambda: legacy_search(data, **filters), 3)
+            print(f"{label:>28}: first page ({PAGE_SIZE}) {first * 1000:6.2f} ms, "
+                  f"50 pages {fiftieth * 1000:7.1f} ms | in-memory JSON {legacy * 1000:8.1f} ms")
+        store.close()
@@ -0,0 +1,79 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from report_store import ReportStore
+
+PARAMETERS = {"CBC": ["WBC", "RBC", "Hemoglobin", "Hematocrit", "MCV", "MCH", "MCHC", "Platelets"],
+              "Lipid Profile": ["Total Cholesterol", "HDL", "LDL", "Triglycerides"],
+              "Diabetes Test": ["Fasting Glucose", "HbA1c"]}
+
+
+def synthetic_reports(count, seed=1):
+    rng = random.Random(seed)
+    for i in range(count):
+        test = rng.choice(list(PARAMETERS))
+        yield f"07{rng.randrange(10 ** 8):08d}", {
+            'name': f"Patient {i}",
+            'test': test,
+            'values': {param: f"{rng.uniform(1, 200):.1f}" for param in PARAMETERS[test]},
+            'result': "-",
+            'timestamp': f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 10:00:00",
+        }
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def store_saves(directory, stored, saves):
+    path = os.path.join(directory, f"reports-{stored}.db")
+    store = ReportStore(path)
+    store.add_many(synthetic_reports(stored))
+    timings = []
+    for phone, report in synthetic_reports(saves, seed=2):
+        start = time.perf_counter()
+        store.add(phone, report)
+        timings.append(time.perf_counter() - start)
+    store.compact()
+    store.close()
+    return timings
+
+
+def legacy_saves(directory, stored, saves):
+    # What save_report did before: rewrite the whole JSON file for every report
+    data = {}
+    for phone, report in synthetic_reports(stored):
+        data.setdefault(phone, []).append(report)
+    path = os.path.join(directory, "reports_data.json")
+    timings = []
+    for phone, report in synthetic_reports(saves, seed=2):
+        start = time.perf_counter()
+        data.setdefault(phone, []).append(report)
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=4)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency of saving one lab report as the history grows.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--saves", type=int, default=200, help="reports saved at each size")
+    parser.add_argument("--legacy-saves", type=int, default=3,
+                        help="full JSON rewrites timed at each size (they are slow at large sizes)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            timings = store_saves(tmp, size, args.saves)
+            line = (f"{size:>9,} stored: save p50 {percentile(timings, 50) * 1000:6.2f} ms "
+                    f"p99 {percentile(timings, 99) * 1000:6.2f} ms")
+            if args.legacy_saves:
+                legacy = legacy_saves(tmp, size, args.legacy_saves)
+                line += f"  | full JSON rewrite p50 {percentile(legacy, 50) * 1000:9.1f} ms"
+            print(line)
@@ -0,0 +1,104 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from reference_ranges import REFERENCE_RANGES, RuleTable, rescore
+from report_store import ReportStore
+
+
+def legacy_calculate_result(test_name, values):
+    # The if/elif chain that calculate_result used to be
+    try:
+        if test_name == "HIV Test":
+            score = sum(float(values[k]) for k in values)
+            return "Positive" if score > 100000 else "Negative"
+        elif test_name == "Diabetes Test":
+            fbg = float(values.get("Fasting Glucose", 0))
+            hb = float(values.get("HbA1c", 0))
+            if fbg > 126 or hb > 6.5:
+                return "Positive"
+            elif fbg > 100 or hb > 5.7:
+                return "Midrange"
+            else:
+                return "Negative"
+        elif test_name == "Blood Pressure Test":
+            sys = float(values.get("Systolic", 0))
+            dia = float(values.get("Diastolic", 0))
+            if sys >= 140 or dia >= 90:
+                return "Positive"
+            elif sys >= 120 or dia >= 80:
+                return "Midrange"
+            else:
+                return "Negative"
+        elif test_name in ["Dengue Test", "Thalassemia Test", "Chikungunya Test", "Gonorrhea Test"]:
+            return "Positive"
+        else:
+            return "-"
+    except:
+        return "Error"
+
+
+def synthetic_values(test, rng):
+    # Values scattered around each reference range, some left blank
+    spec = REFERENCE_RANGES[test]
+    values = {}
+    for param, (low, high, _) in spec.get("ranges", {}).items():
+        low = 0.0 if low is None else low
+        high = low * 2 + 1 if high is None else high
+        values[param] = "" if rng.random() < 0.05 else f"{rng.uniform(low * 0.7, high * 1.3):.2f}"
+    for param, answers in spec.get("text", {}).items():
+        values[param] = rng.choice(answers + ["Black", "Seen"])
+    return values
+
+
+def synthetic_batches(count, seed=1):
+    rng = random.Random(seed)
+    tests = list(REFERENCE_RANGES)
+    batches = {test: [] for test in tests}
+    for _ in range(count):
+        test = rng.choice(tests)
+        batches[test].append(synthetic_values(test, rng))
+    return batches
+
+
+def timed(label, count, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>40}: {elapsed:7.2f} s ({count / elapsed:12,.0f} reports/s)")
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scoring lab reports one at a time vs in NumPy batches.")
+    parser.add_argument("--reports", type=int, default=1000000)
+    parser.add_argument("--store-reports", type=int, default=1000000,
+                        help="reports in the database re-scored end to end (0 to skip)")
+    args = parser.parse_args()
+
+    table = RuleTable()
+    batches = synthetic_batches(args.reports)
+    timed("old calculate_result, one at a time", args.reports,
+          lambda: [legacy_calculate_result(test, values) for test, rows in batches.items() for values in rows])
+    timed("rule table, one at a time", args.reports,
+          lambda: [table.evaluate(test, values) for test, rows in batches.items() for values in rows])
+    timed("rule table, batch codes", args.reports,
+          lambda: [table.evaluate_codes(test, rows) for test, rows in batches.items()])
+
+    # Both paths must agree
+    for test, rows in batches.items():
+        _, batch_results = table.evaluate_batch(test, rows[:2000])
+        assert batch_results == [table.evaluate(test, values)[0] for values in rows[:2000]], test
+
+    if args.store_reports:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ReportStore(os.path.join(tmp, "reports.db"))
+            store_batches = synthetic_batches(args.store_reports, seed=2)
+            store.add_many((f"07{i % 300000:08d}", {'name': "Patient", 'test': test, 'values': values,
+                                                    'result': "-", 'timestamp': "2025-01-01 10:00:00"})
+                           for test, rows in store_batches.items() for i, values in enumerate(rows))
+            timed("re-score the database (all changed)", args.store_reports, lambda: rescore(store))
+            timed("re-score the database (none changed)", args.store_reports, lambda: rescore(store))
+            store.close()
@@ -0,0 +1,75 @@
+import argparse
+import datetime
+import os
+import random
+import tempfile
+
+from bench_queries import synthetic_reports, timed
+from bench_rules import synthetic_values
+from reference_ranges import REFERENCE_RANGES
+from report_store import ReportStore
+from trends import TrendCache, sparkline
+
+TESTS = ["Diabetes Test", "Kidney Function Test", "Lipid Profile", "CBC"]
+
+
+def patient_reports(phone, count, seed=1):
+    # A chronic patient: a few tests repeated every couple of weeks
+    rng = random.Random(seed)
+    start = datetime.datetime(2015, 1, 1, 9)
+    for i in range(count):
+        test = TESTS[i % len(TESTS)]
+        yield phone, {'name': "Chronic Patient", 'test': test, 'values': synthetic_values(test, rng), 'result': "-",
+                      'timestamp': (start + datetime.timedelta(days=i * 3)).strftime("%Y-%m-%d %H:%M:%S")}
+
+
+def per_report_series(store, phone):
+    # Without the cache: read every report and pull the numbers out one value at a time
+    series = {}
+    for report in store.reports_for(phone):
+        ranges = REFERENCE_RANGES.get(report['test'], {}).get("ranges", {})
+        for param in ranges:
+            try:
+                value = float(report['values'].get(param, ""))
+            except ValueError:
+                continue
+            series.setdefault((report['test'], param), []).append((report['timestamp'], value))
+    return series
+
+
+def chart_coordinates(trends):
+    return [sparkline(*series.arrays(), (170, 12, 400, 52)) for _, series in trends.items()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Opening a patient's trends: cold, warm and after saving a report.")
+    parser.add_argument("--reports", type=int, default=300000, help="other patients' reports in the database")
+    parser.add_argument("--history", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ReportStore(os.path.join(tmp, "reports.db"))
+        store.add_many(synthetic_reports(args.reports))
+        for count in args.history:
+            store.add_many(patient_reports(f"0799{count:06d}", count))
+        print(f"{len(store):,} reports stored")
+
+        for count in args.history:
+            phone = f"0799{count:06d}"
+            legacy = timed(lambda: per_report_series(store, phone), args.repeat)
+            cold = timed(lambda: TrendCache(store).get(phone), args.repeat)
+            cache = TrendCache(store)
+            cache.get(phone)
+            warm = timed(lambda: cache.get(phone), args.repeat)
+            chart = timed(lambda: chart_coordinates(cache.get(phone)), args.repeat)
+
+            def save_and_open():
+                _, report = next(patient_reports(phone, 1, seed=random.random()))
+                cache.add(phone, store.add(phone, report), report)
+                chart_coordinates(cache.get(phone))
+            saved = timed(save_and_open, args.repeat)
+            print(f"{count:>5} reports: per report {legacy * 1000:7.2f} ms | cold {cold * 1000:7.2f} ms, "
+                  f"warm {warm * 1000:6.3f} ms, warm + charts {chart * 1000:6.2f} ms, "
+                  f"save + reopen {saved * 1000:6.2f} ms")
+        store.close()
@@ -0,0 +1,38 @@
+# Tests the lab offers and the parameters entered for each
+LAB_TESTS = {
+    "Dengue Test": ["NS1", "IgM", "IgG"],
+    "Diabetes Test": ["Fasting Glucose", "HbA1c"],
+    "Blood Pressure Test": ["Systolic", "Diastolic"],
+    "HIV Test": ["RMD", "MDD", "SSI"],
+    "Thalassemia Test": ["Hemoglobin", "MCV", "MCH"],
+    "Chikungunya Test": ["IgM", "IgG"],
+    "Gonorrhea Test": ["NAAT", "Culture"],
+    "CBC": ["WBC", "RBC", "Hemoglobin", "Hematocrit", "MCV", "MCH", "MCHC", "Platelets"],
+    "Liver Function Test": ["ALT", "AST", "ALP", "Bilirubin", "Albumin"],
+    "Kidney Function Test": ["Creatinine", "BUN", "Uric Acid"],
+    "Lipid Profile": ["Total Cholesterol", "HDL", "LDL", "Triglycerides"],
+    "Thyroid Function Test": ["TSH", "T3", "T4"],
+    "Vitamin D Test": ["Vitamin D25"],
+    "Iron Panel": ["Iron", "TIBC", "Ferritin"],
+    "CRP": ["C-Reactive Protein"],
+    "ESR": ["Erythrocyte Sedimentation Rate"],
+    "Urinalysis": ["pH", "Protein", "Glucose", "Ketones", "RBC", "WBC"],
+    "Stool Test": ["Occult Blood", "Parasites", "Consistency", "Color"],
+    "Electrolyte Panel": ["Sodium", "Potassium", "Chloride", "Bicarbonate"],
+    "Prostate Specific Antigen": ["PSA"],
+    "Beta hCG": ["hCG Level"],
+    "Coagulation Profile": ["PT", "aPTT", "INR"],
+    "COVID-19 RT-PCR": ["Cycle Threshold"],
+    "HbA1c": ["HbA1c%"],
+    "Serum Calcium": ["Calcium Level"],
+    "Magnesium Test": ["Serum Magnesium"],
+    "Amylase": ["Amylase Level"],
+    "Lipase": ["Lipase Level"],
+    "Cortisol": ["Morning Cortisol"],
+    "Insulin": ["Fasting Insulin"],
+    "Troponin I": ["Troponin I Level"],
+    "D-Dimer": ["D-Dimer Level"],
+    "Hepatitis B": ["HBsAg", "Anti-HBs", "HBV DNA"],
+    "Hepatitis C": ["Anti-HCV", "HCV RNA"]
+    # Add more if needed...
+}
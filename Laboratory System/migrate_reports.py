@@ -0,0 +1,263 @@
+import argparse
+import collections
+import json
+import math
+import re
+import time
+
+from reference_ranges import default_table
+
+LEGACY_FILE = 'reports_data.json'
+
+# Tests renamed since older reports were saved
+TEST_ALIASES = {"Thyroid Profile": "Thyroid Function Test"}
+
+_WHITESPACE = re.compile(r'\s*')
+
+# What json accepts as literals; a buffer ending partway through one is cut off, not broken
+_LITERALS = ("true", "false", "null", "NaN", "Infinity", "-Infinity")
+# A number cut after "2." or "1e-" decodes as 2 or 1, leaving up to this many characters behind
+_NUMBER_TAIL = 2
+
+_encode = json.JSONEncoder(separators=(',', ':')).encode
+
+
+class _Stream:
+    # A window over a large JSON text file: values are decoded with raw_decode
+    # and only the unread tail plus one chunk is ever held in memory
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.offset = 0  # characters consumed before buf
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+        self.offset += self.pos
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self):
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                raise ValueError(f"unexpected end of file at character {self.offset + self.pos}")
+            self.fill()
+
+    def expect(self, chars):
+        char = self.peek()
+        if char not in chars:
+            raise ValueError(f"expected {' or '.join(chars)} at character {self.offset + self.pos}, found {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                # Only a value cut off by the end of the buffer is worth reading more for;
+                # refilling on real damage would pull the rest of the file into memory
+                if self.eof or not self.cut_off(e):
+                    raise ValueError(f"{e.msg} (character {self.offset + e.pos})") from None
+                self.fill()
+                continue
+            if len(self.buf) - end <= _NUMBER_TAIL and not self.eof:
+                # A number may continue in the next chunk ("2." or "1e-" then "5")
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+    def cut_off(self, error):
+        # Strings and literals are reported where they start, everything else where decoding stopped
+        rest = self.buf[error.pos:]
+        return (len(self.buf) - error.pos <= _NUMBER_TAIL or error.msg == "Unterminated string starting at"
+                or (error.msg == "Invalid \\uXXXX escape" and len(rest) <= len("uD83D\\uDE00"))
+                or any(literal.startswith(rest) for literal in _LITERALS))
+
+
+def iter_legacy(path, chunk_size=1 << 20):
+    """(phone, record) pairs from a {"phone": [record, ...], ...} file, read incrementally.
+
+    Memory stays at about one chunk however large the file is. A phone
+    whose value is not a list yields that value once, for the caller to
+    reject. Raises ValueError where the JSON itself is broken (such as a
+    file cut short by a crash), after yielding everything before it.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        stream = _Stream(f, chunk_size)
+        stream.expect('{')
+        if stream.peek() == '}':
+            return
+        while True:
+            phone = stream.value()
+            stream.expect(':')
+            if stream.peek() != '[':
+                yield phone, stream.value()
+            else:
+                stream.expect('[')
+                if stream.peek() == ']':
+                    stream.pos += 1
+                else:
+                    while True:
+                        yield phone, stream.value()
+                        if stream.expect(',]') == ']':
+                            break
+            if stream.expect(',}') == '}':
+                return
+
+
+def coerce_value(text):
+    """A numeric string as int or float ("1665" -> 1665, "0.005" -> 0.005); anything else unchanged."""
+    if not isinstance(text, str):
+        return text
+    try:
+        number = float(text)
+    except ValueError:
+        return text.strip()
+    if not math.isfinite(number):
+        return text.strip()
+    return int(number) if number.is_integer() and '.' not in text and 'e' not in text.lower() else number
+
+
+def normalize_report(phone, record, stats):
+    """One stored report in the current schema, or None if it cannot be used.
+
+    Accepts the old test_name/tests shape and the test/values/result shape.
+    Counts what it did in ``stats``.
+    """
+    if not isinstance(phone, str) or not phone.strip():
+        stats['invalid: no phone number'] += 1
+        return None
+    if not isinstance(record, dict):
+        stats['invalid: not a report'] += 1
+        return None
+    test = record.get('test', record.get('test_name'))
+    values = record.get('values', record.get('tests'))
+    if not isinstance(test, str) or not test.strip():
+        stats['invalid: no test'] += 1
+        return None
+    if not isinstance(values, dict):
+        stats['invalid: no parameter values'] += 1
+        return None
+    if 'test_name' in record:
+        stats['old test_name/tests shape'] += 1
+    test = TEST_ALIASES.get(test.strip(), test.strip())
+
+    normalized = {}
+    converted = text = dropped = 0
+    for param, value in values.items():
+        if isinstance(value, (dict, list)):
+            dropped += 1
+            continue
+        coerced = coerce_value(value)
+        if isinstance(coerced, (int, float)) and not isinstance(coerced, bool):
+            converted += isinstance(value, str)
+        elif coerced not in ("", None):
+            text += 1
+        normalized[str(param)] = "" if coerced is None else coerced
+    # Counted once per report rather than per value; the Counter is the slow part of this loop
+    if converted:
+        stats['values converted to numbers'] += converted
+    if text:
+        stats['values kept as text'] += text
+    if dropped:
+        stats['values dropped (not a scalar)'] += dropped
+    timestamp = record.get('timestamp')
+    if not isinstance(timestamp, str):
+        stats['no timestamp'] += 1
+        timestamp = ""
+    name = record.get('name')
+    if not isinstance(name, str):
+        stats['no patient name'] += 1
+        name = ""
+    return {'name': name.strip(), 'test': test, 'values': normalized, 'result': "-", 'timestamp': timestamp}
+
+
+def score(batch, table):
+    # Results from the rule table, one NumPy pass per test in the batch
+    by_test = collections.defaultdict(list)
+    for index, (_, report) in enumerate(batch):
+        if report['test'] in table:
+            by_test[report['test']].append(index)
+    for test, indexes in by_test.items():
+        _, results = table.evaluate_codes(test, [batch[i][1]['values'] for i in indexes])
+        labels = table.labels(test)
+        for i, result in zip(indexes, results.tolist()):
+            batch[i][1]['result'] = labels[result]
+
+
+def migrate(path, out=None, store=None, batch_size=20000, chunk_size=1 << 20):
+    """Stream a legacy reports file into compact JSON lines and/or a ReportStore.
+
+    Every report is normalized to name/test/values/result/timestamp with
+    numeric values as numbers, and its result is recomputed from the
+    reference ranges. Returns a Counter of what happened; if the file is
+    cut short, everything before the damage is migrated and the error is
+    under 'error'.
+    """
+    table = default_table()
+    stats = collections.Counter()
+    batch = []
+
+    def flush():
+        if not batch:
+            return
+        score(batch, table)
+        if out is not None:
+            out.writelines(_encode({'phone': phone, **report}) + "\n" for phone, report in batch)
+        if store is not None:
+            store.add_many(batch)
+        stats['migrated'] += len(batch)
+        batch.clear()
+
+    try:
+        for phone, record in iter_legacy(path, chunk_size):
+            stats['read'] += 1
+            report = normalize_report(phone, record, stats)
+            if report is not None:
+                batch.append((phone.strip(), report))
+                if len(batch) >= batch_size:
+                    flush()
+    except ValueError as e:
+        stats['error'] = str(e)
+    flush()
+    return stats
+
+
+if __name__ == "__main__":
+    from report_store import DB_FILE, ReportStore
+
+    parser = argparse.ArgumentParser(description="Migrate reports_data.json to the current report schema.")
+    parser.add_argument("file", nargs="?", default=LEGACY_FILE)
+    parser.add_argument("--out", help="write compact JSON lines (one report per line) to this file")
+    parser.add_argument("--db", nargs="?", const=DB_FILE, help="load the reports into a report database")
+    args = parser.parse_args()
+    if not args.out and not args.db:
+        parser.error("give --out and/or --db")
+
+    start = time.perf_counter()
+    out = open(args.out, 'w', encoding='utf-8') if args.out else None
+    store = ReportStore(args.db) if args.db else None
+    try:
+        stats = migrate(args.file, out, store)
+    finally:
+        if out:
+            out.close()
+        if store:
+            store.close()
+    error = stats.pop('error', None)
+    for key in ['read', 'migrated'] + sorted(key for key in stats if key not in ('read', 'migrated')):
+        print(f"{key}: {stats[key]:,}")
+    print(f"{time.perf_counter() - start:.1f} s")
+    if error:
+        print(f"Stopped early, the file is damaged: {error}")
@@ -0,0 +1,411 @@
+import argparse
+import math
+import operator
+
+import numpy as np
+
+# Adult reference ranges and how each test is interpreted.
+#
+# "ranges": parameter -> (low, high, unit); None leaves that side open. A value
+#           below low is flagged "low", above high "high", otherwise "normal".
+# "text":   parameter -> answers that are normal; any other answer is "abnormal".
+# "rules":  (result, "any" | "all", [(parameter, op, value), ...]) checked in
+#           order; the first rule whose conditions hold gives the result.
+# "otherwise": result when no rule holds. Tests without rules are "Normal"
+#           when every parameter is in range and "Abnormal" when one is not.
+# A report with no usable value at all gets "-".
+REFERENCE_RANGES = {
+    "Dengue Test": {
+        "ranges": {"NS1": (None, 0.9, "index"), "IgM": (None, 0.9, "index"), "IgG": (None, 0.9, "index")},
+        "rules": [("Positive", "any", [("NS1", ">", 1.1), ("IgM", ">", 1.1)]),
+                  ("Past infection", "any", [("IgG", ">", 1.1)])],
+        "otherwise": "Negative",
+    },
+    "Diabetes Test": {
+        "ranges": {"Fasting Glucose": (70, 99, "mg/dL"), "HbA1c": (4.0, 5.6, "%")},
+        "rules": [("Positive", "any", [("Fasting Glucose", ">=", 126), ("HbA1c", ">=", 6.5)]),
+                  ("Midrange", "any", [("Fasting Glucose", ">=", 100), ("HbA1c", ">=", 5.7)])],
+        "otherwise": "Negative",
+    },
+    "Blood Pressure Test": {
+        "ranges": {"Systolic": (90, 119, "mmHg"), "Diastolic": (60, 79, "mmHg")},
+        "rules": [("Positive", "any", [("Systolic", ">=", 140), ("Diastolic", ">=", 90)]),
+                  ("Midrange", "any", [("Systolic", ">=", 120), ("Diastolic", ">=", 80)])],
+        "otherwise": "Negative",
+    },
+    "HIV Test": {
+        "ranges": {"RMD": (None, 0.99, "S/CO"), "MDD": (None, 0.99, "S/CO"), "SSI": (None, 0.99, "S/CO")},
+        "rules": [("Positive", "any", [("RMD", ">=", 1.0), ("MDD", ">=", 1.0), ("SSI", ">=", 1.0)])],
+        "otherwise": "Negative",
+    },
+    "Thalassemia Test": {
+        "ranges": {"Hemoglobin": (12.0, 17.5, "g/dL"), "MCV": (80, 100, "fL"), "MCH": (27, 33, "pg")},
+        # Small, pale red cells point to thalassemia trait (or iron deficiency, see the Iron Panel)
+        "rules": [("Positive", "all", [("MCV", "<", 80), ("MCH", "<", 27)])],
+        "otherwise": "Negative",
+    },
+    "Chikungunya Test": {
+        "ranges": {"IgM": (None, 0.9, "index"), "IgG": (None, 0.9, "index")},
+        "rules": [("Positive", "any", [("IgM", ">", 1.1)]),
+                  ("Past infection", "any", [("IgG", ">", 1.1)])],
+        "otherwise": "Negative",
+    },
+    "Gonorrhea Test": {
+        "ranges": {"NAAT": (None, 0.99, "S/CO"), "Culture": (None, 0, "CFU/mL")},
+        "rules": [("Positive", "any", [("NAAT", ">=", 1.0), ("Culture", ">", 0)])],
+        "otherwise": "Negative",
+    },
+    "CBC": {
+        "ranges": {"WBC": (4.0, 11.0, "x10^3/uL"), "RBC": (4.2, 5.9, "x10^6/uL"), "Hemoglobin": (12.0, 17.5, "g/dL"),
+                   "Hematocrit": (36, 52, "%"), "MCV": (80, 100, "fL"), "MCH": (27, 33, "pg"),
+                   "MCHC": (32, 36, "g/dL"), "Platelets": (150, 450, "x10^3/uL")},
+    },
+    "Liver Function Test": {
+        "ranges": {"ALT": (7, 56, "U/L"), "AST": (10, 40, "U/L"), "ALP": (44, 147, "U/L"),
+                   "Bilirubin": (0.1, 1.2, "mg/dL"), "Albumin": (3.5, 5.0, "g/dL")},
+    },
+    "Kidney Function Test": {
+        "ranges": {"Creatinine": (0.6, 1.3, "mg/dL"), "BUN": (7, 20, "mg/dL"), "Uric Acid": (3.5, 7.2, "mg/dL")},
+    },
+    "Lipid Profile": {
+        "ranges": {"Total Cholesterol": (None, 199, "mg/dL"), "HDL": (40, None, "mg/dL"), "LDL": (None, 99, "mg/dL"),
+                   "Triglycerides": (None, 149, "mg/dL")},
+        "rules": [("High risk", "any", [("Total Cholesterol", ">=", 240), ("LDL", ">=", 160),
+                                        ("Triglycerides", ">=", 200)]),
+                  ("Borderline", "any", [("Total Cholesterol", ">=", 200), ("LDL", ">=", 130),
+                                         ("Triglycerides", ">=", 150), ("HDL", "<", 40)])],
+        "otherwise": "Normal",
+    },
+    "Thyroid Function Test": {
+        "ranges": {"TSH": (0.4, 4.0, "mIU/L"), "T3": (80, 200, "ng/dL"), "T4": (5.0, 12.0, "ug/dL")},
+        "rules": [("Hyperthyroid", "any", [("TSH", "<", 0.4)]),
+                  ("Hypothyroid", "any", [("TSH", ">", 4.0)])],
+        "otherwise": "Normal",
+    },
+    "Vitamin D Test": {
+        "ranges": {"Vitamin D25": (30, 100, "ng/mL")},
+        "rules": [("Deficient", "any", [("Vitamin D25", "<", 20)]),
+                  ("Insufficient", "any", [("Vitamin D25", "<", 30)])],
+        "otherwise": "Normal",
+    },
+    "Iron Panel": {
+        "ranges": {"Iron": (60, 170, "ug/dL"), "TIBC": (240, 450, "ug/dL"), "Ferritin": (20, 250, "ng/mL")},
+        "rules": [("Iron deficiency", "any", [("Ferritin", "<", 20)])],
+    },
+    "CRP": {
+        "ranges": {"C-Reactive Protein": (None, 10, "mg/L")},
+    },
+    "ESR": {
+        "ranges": {"Erythrocyte Sedimentation Rate": (None, 20, "mm/hr")},
+    },
+    "Urinalysis": {
+        "ranges": {"pH": (4.5, 8.0, ""), "Protein": (None, 14, "mg/dL"), "Glucose": (None, 15, "mg/dL"),
+                   "Ketones": (None, 5, "mg/dL"), "RBC": (None, 2, "/hpf"), "WBC": (None, 5, "/hpf")},
+    },
+    "Stool Test": {
+        "text": {"Occult Blood": ["Negative"], "Parasites": ["Not seen", "None", "Negative"],
+                 "Consistency": ["Formed", "Soft", "Semi-formed"], "Color": ["Brown", "Light brown", "Dark brown"]},
+    },
+    "Electrolyte Panel": {
+        "ranges": {"Sodium": (135, 145, "mmol/L"), "Potassium": (3.5, 5.0, "mmol/L"), "Chloride": (96, 106, "mmol/L"),
+                   "Bicarbonate": (22, 29, "mmol/L")},
+    },
+    "Prostate Specific Antigen": {
+        "ranges": {"PSA": (None, 4.0, "ng/mL")},
+    },
+    "Beta hCG": {
+        "ranges": {"hCG Level": (None, 5, "mIU/mL")},
+        "rules": [("Positive", "any", [("hCG Level", ">=", 25)]),
+                  ("Midrange", "any", [("hCG Level", ">", 5)])],
+        "otherwise": "Negative",
+    },
+    "Coagulation Profile": {
+        "ranges": {"PT": (11.0, 13.5, "s"), "aPTT": (25, 35, "s"), "INR": (0.8, 1.1, "")},
+    },
+    "COVID-19 RT-PCR": {
+        # Lower cycle threshold means more virus; no Ct at all means not detected
+        "ranges": {"Cycle Threshold": (35, None, "Ct")},
+        "rules": [("Positive", "any", [("Cycle Threshold", "<", 35)])],
+        "otherwise": "Negative",
+    },
+    "HbA1c": {
+        "ranges": {"HbA1c%": (4.0, 5.6, "%")},
+        "rules": [("Positive", "any", [("HbA1c%", ">=", 6.5)]),
+                  ("Midrange", "any", [("HbA1c%", ">=", 5.7)])],
+        "otherwise": "Negative",
+    },
+    "Serum Calcium": {
+        "ranges": {"Calcium Level": (8.5, 10.5, "mg/dL")},
+    },
+    "Magnesium Test": {
+        "ranges": {"Serum Magnesium": (1.7, 2.2, "mg/dL")},
+    },
+    "Amylase": {
+        "ranges": {"Amylase Level": (30, 110, "U/L")},
+    },
+    "Lipase": {
+        "ranges": {"Lipase Level": (None, 160, "U/L")},
+    },
+    "Cortisol": {
+        "ranges": {"Morning Cortisol": (6, 23, "ug/dL")},
+    },
+    "Insulin": {
+        "ranges": {"Fasting Insulin": (2, 25, "uIU/mL")},
+    },
+    "Troponin I": {
+        "ranges": {"Troponin I Level": (None, 0.04, "ng/mL")},
+        "rules": [("Positive", "any", [("Troponin I Level", ">", 0.04)])],
+        "otherwise": "Negative",
+    },
+    "D-Dimer": {
+        "ranges": {"D-Dimer Level": (None, 0.49, "ug/mL FEU")},
+        "rules": [("Positive", "any", [("D-Dimer Level", ">=", 0.5)])],
+        "otherwise": "Negative",
+    },
+    "Hepatitis B": {
+        "ranges": {"HBsAg": (None, 0.99, "S/CO"), "Anti-HBs": (10, None, "mIU/mL"), "HBV DNA": (None, 20, "IU/mL")},
+        "rules": [("Positive", "any", [("HBsAg", ">=", 1.0), ("HBV DNA", ">", 20)]),
+                  ("Immune", "any", [("Anti-HBs", ">=", 10)])],
+        "otherwise": "Negative",
+    },
+    "Hepatitis C": {
+        "ranges": {"Anti-HCV": (None, 0.99, "S/CO"), "HCV RNA": (None, 15, "IU/mL")},
+        "rules": [("Positive", "any", [("HCV RNA", ">", 15)]),
+                  ("Antibody reactive", "any", [("Anti-HCV", ">=", 1.0)])],
+        "otherwise": "Negative",
+    },
+}
+
+OPS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+
+# Flag codes used by the batch evaluator
+LOW, NORMAL, HIGH, MISSING = -1, 0, 1, 2
+FLAG_NAMES = {LOW: "low", NORMAL: "normal", HIGH: "high", MISSING: None}
+
+
+def parse_number(text):
+    # "" means not measured; anything else must be a finite number
+    if text is None or str(text).strip() == "":
+        return None
+    value = float(str(text).strip())
+    if not math.isfinite(value):
+        raise ValueError(f"not a finite number: {text!r}")
+    return value
+
+
+def describe_range(low, high, unit):
+    if low is None:
+        text = f"<= {high:g}" if high is not None else ""
+    elif high is None:
+        text = f">= {low:g}"
+    else:
+        text = f"{low:g} - {high:g}"
+    return f"{text} {unit}".strip()
+
+
+class _CompiledTest:
+    # One test's table entry as arrays: parameter order, bounds and rule masks
+    def __init__(self, spec):
+        ranges = spec.get("ranges", {})
+        self.params = list(ranges)
+        self.units = {param: unit for param, (_, _, unit) in ranges.items()}
+        self.bounds = {param: (low, high) for param, (low, high, _) in ranges.items()}
+        self.lows = np.array([-np.inf if low is None else low for low, _, _ in ranges.values()])
+        self.highs = np.array([np.inf if high is None else high for _, high, _ in ranges.values()])
+        self.text = {param: {answer.lower() for answer in answers} for param, answers in spec.get("text", {}).items()}
+        position = {param: i for i, param in enumerate(self.params)}
+        self.rules = [(result, mode == "all", [(position[param], OPS[op], value) for param, op, value in conditions])
+                      for result, mode, conditions in spec.get("rules", [])]
+        self.otherwise = spec.get("otherwise")
+        self.labels = ["-", "Normal", "Abnormal"] + [result for result, _, _ in self.rules]
+        if self.otherwise and self.otherwise not in self.labels:
+            self.labels.append(self.otherwise)
+
+    def matrix(self, values_list):
+        """Float matrix (reports x parameters) with NaN where a value is missing or not a number."""
+        cells = [values.get(param) for values in values_list for param in self.params]
+        try:
+            # NumPy parses the numeric strings itself; only a batch with bad values takes the slow path
+            matrix = np.array([cell if cell not in ("", None) else "nan" for cell in cells],
+                              dtype=float).reshape(len(values_list), len(self.params))
+            matrix[~np.isfinite(matrix)] = np.nan
+            return matrix
+        except (ValueError, TypeError):
+            pass
+        matrix = np.full((len(values_list), len(self.params)), np.nan)
+        for row, values in enumerate(values_list):
+            for col, param in enumerate(self.params):
+                try:
+                    value = parse_number(values.get(param))
+                except ValueError:
+                    continue
+                if value is not None:
+                    matrix[row, col] = value
+        return matrix
+
+    def text_flags(self, values_list):
+        """Per report: (any text answer given, any text answer abnormal)."""
+        given = np.zeros(len(values_list), dtype=bool)
+        abnormal = np.zeros(len(values_list), dtype=bool)
+        for row, values in enumerate(values_list):
+            for param, normal in self.text.items():
+                answer = str(values.get(param, "")).strip().lower()
+                if answer:
+                    given[row] = True
+                    abnormal[row] |= answer not in normal
+        return given, abnormal
+
+    def evaluate_matrix(self, matrix, text_given=None, text_abnormal=None):
+        """Flag codes (same shape as matrix) and result label indexes for a batch of reports."""
+        missing = np.isnan(matrix)
+        flags = np.where(matrix < self.lows, LOW, np.where(matrix > self.highs, HIGH, NORMAL)).astype(np.int8)
+        flags[missing] = MISSING
+        out_of_range = ((flags == LOW) | (flags == HIGH)).any(axis=1)
+        if text_abnormal is not None:
+            out_of_range |= text_abnormal
+
+        if self.otherwise is None:
+            results = np.where(out_of_range, self.labels.index("Abnormal"), self.labels.index("Normal"))
+        else:
+            results = np.full(len(matrix), self.labels.index(self.otherwise))
+        # Apply rules last to first so the first matching rule wins; NaN never satisfies a condition
+        with np.errstate(invalid="ignore"):
+            for index in range(len(self.rules) - 1, -1, -1):
+                _, require_all, conditions = self.rules[index]
+                masks = [op(matrix[:, col], value) for col, op, value in conditions]
+                hit = np.logical_and.reduce(masks) if require_all else np.logical_or.reduce(masks)
+                results = np.where(hit, self.labels.index(self.rules[index][0]), results)
+
+        nothing = missing.all(axis=1)
+        if text_given is not None:
+            nothing &= ~text_given
+        results = np.where(nothing, self.labels.index("-"), results)
+        return flags, results
+
+
+class RuleTable:
+    """REFERENCE_RANGES compiled for evaluating one report or a whole batch.
+
+    ``evaluate`` scores a report as it is saved; ``evaluate_batch`` scores
+    many reports of one test with NumPy, comparing every value against its
+    range in one pass and each rule as one array mask, so re-scoring the
+    history after a range change does not go through a Python loop per
+    report and rule. Both give the same answers.
+    """
+
+    def __init__(self, table=REFERENCE_RANGES):
+        self.tests = {test: _CompiledTest(spec) for test, spec in table.items()}
+
+    def __contains__(self, test):
+        return test in self.tests
+
+    def reference(self, test, param):
+        """Printable reference range of a parameter, or "" if it has none."""
+        compiled = self.tests.get(test)
+        if compiled is None:
+            return ""
+        if param in compiled.bounds:
+            low, high = compiled.bounds[param]
+            return describe_range(low, high, compiled.units[param])
+        if param in compiled.text:
+            return "/".join(answer.capitalize() for answer in sorted(compiled.text[param]))
+        return ""
+
+    def validate(self, test, values):
+        """Raise ValueError naming the first measured parameter that is not a number."""
+        compiled = self.tests.get(test)
+        for param in compiled.params if compiled else ():
+            try:
+                parse_number(values.get(param))
+            except ValueError:
+                raise ValueError(f"{param} must be a number, not {values.get(param)!r}") from None
+
+    def evaluate(self, test, values):
+        """(result, flags) for one report; flags maps each parameter to low/normal/high/abnormal or None.
+
+        Tests missing from the table get result "-" and no flags. Raises
+        ValueError when a numeric parameter holds something else.
+        """
+        compiled = self.tests.get(test)
+        if compiled is None:
+            return "-", {}
+        self.validate(test, values)
+        flags, results = self.evaluate_batch(test, [values])
+        return results[0], flags[0]
+
+    def evaluate_batch(self, test, values_list):
+        """Results and flag dicts for many reports of one test; unusable values count as not measured."""
+        compiled = self.tests.get(test)
+        if compiled is None:
+            return [{} for _ in values_list], ["-"] * len(values_list)
+        codes, results = self.evaluate_codes(test, values_list)
+        flags = []
+        for row, values in zip(codes.tolist(), values_list):
+            report_flags = {param: FLAG_NAMES[code] for param, code in zip(compiled.params, row)}
+            for param, normal in compiled.text.items():
+                answer = str(values.get(param, "")).strip().lower()
+                if answer:
+                    report_flags[param] = "normal" if answer in normal else "abnormal"
+                else:
+                    report_flags[param] = None
+            flags.append(report_flags)
+        return flags, [compiled.labels[index] for index in results.tolist()]
+
+    def flags(self, test, values):
+        """Flags for a stored report; values that are not numbers are treated as not measured."""
+        return self.evaluate_batch(test, [values])[0][0]
+
+    def evaluate_codes(self, test, values_list):
+        # The array form of evaluate_batch: flag codes and label indexes into labels(test)
+        compiled = self.tests[test]
+        text_given, text_abnormal = compiled.text_flags(values_list) if compiled.text else (None, None)
+        return compiled.evaluate_matrix(compiled.matrix(values_list), text_given, text_abnormal)
+
+    def labels(self, test):
+        return self.tests[test].labels
+
+
+_table = None
+
+
+def default_table():
+    global _table
+    if _table is None:
+        _table = RuleTable()
+    return _table
+
+
+def rescore(store, table=None, batch_size=100000):
+    """Recompute the stored result of every report, e.g. after a range changed.
+
+    Returns {test: reports changed}. Reports of tests not in the table
+    are left as they are.
+    """
+    table = table or default_table()
+    changed = {}
+    for test in store.tests():
+        if test not in table:
+            continue
+        changed[test] = 0
+        for batch in store.iter_test_values(test, batch_size):
+            ids = [report_id for report_id, _, _ in batch]
+            _, results = table.evaluate_codes(test, [values for _, values, _ in batch])
+            labels = table.labels(test)
+            updates = [(labels[index], report_id) for report_id, index, (_, _, old) in
+                       zip(ids, results.tolist(), batch) if labels[index] != old]
+            store.set_results(updates)
+            changed[test] += len(updates)
+    return changed
+
+
+if __name__ == "__main__":
+    from report_store import DB_FILE, ReportStore
+
+    parser = argparse.ArgumentParser(description="Re-score stored lab reports against the reference ranges.")
+    parser.add_argument("--db", default=DB_FILE)
+    args = parser.parse_args()
+
+    store = ReportStore(args.db)
+    for test, count in sorted(rescore(store).items()):
+        print(f"{test}: {count:,} result(s) changed")
+    store.close()
@@ -0,0 +1,188 @@
+import argparse
+import io
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfutils import readJPEGInfo
+from reportlab.platypus import Image, PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from reference_ranges import default_table
+
+LOGO_FILE = "asiri.jpg"
+
+# Streams are written as binary rather than ASCII85 text: without reportlab's
+# C accelerator, base-85 encoding the logo in Python cost most of a report's time
+rl_config.useA85 = 0
+
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.steelblue),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+
+    ('BACKGROUND', (0, 1), (-1, -1), colors.whitesmoke),
+    ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 11),
+])
+
+
+def build_styles():
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(name='CenterTitle', fontSize=24, alignment=1, spaceAfter=20,
+                              textColor=colors.darkblue, fontName='Helvetica-Bold'))
+    styles.add(ParagraphStyle(name='Heading', fontSize=14, textColor=colors.darkred,
+                              spaceAfter=10, fontName='Helvetica-Bold'))
+    styles.add(ParagraphStyle(name='NormalBold', fontSize=12, fontName='Helvetica-Bold'))
+    return styles
+
+
+class ReportRenderer:
+    """Lab-report PDFs with the style sheet and logo prepared once.
+
+    The logo file is read once and its JPEG header parsed once; every
+    report embeds the same bytes. One renderer serves any number of
+    reports, either one PDF each (``render``) or one multi-page document
+    (``render_combined``).
+    """
+
+    def __init__(self, logo_path=LOGO_FILE):
+        self.styles = build_styles()
+        self.logo = None
+        if os.path.exists(logo_path):
+            with open(logo_path, 'rb') as f:
+                self.logo = f.read()
+            try:
+                readJPEGInfo(io.BytesIO(self.logo))
+            except Exception:
+                # Not a JPEG: let reportlab decode it from the file as before
+                self.logo = logo_path
+
+    def story(self, phone, report, report_number):
+        styles = self.styles
+        story = []
+
+        # Optional logo
+        if self.logo is not None:
+            source = io.BytesIO(self.logo) if isinstance(self.logo, bytes) else self.logo
+            img = Image(source, width=3.0 * inch, height=2.0 * inch)
+            img.hAlign = 'CENTER'
+            story.append(img)
+            story.append(Spacer(1, 12))
+
+        # Title
+        story.append(Paragraph("Asiri Laboratories Sri Lanka", styles['CenterTitle']))
+
+        # Receipt and Phone
+        receipt_num = random.randint(100000, 999999)
+        story.append(Paragraph(f"<b>Receipt Number:</b> {receipt_num}", styles['NormalBold']))
+        story.append(Paragraph(f"<b>Time:</b> {report['timestamp']}", styles['NormalBold']))
+        story.append(Spacer(1, 12))
+
+        # Report Info
+        story.append(Paragraph(f"Report #{report_number}: {report['test']}", styles['Heading']))
+        story.append(Paragraph(f"Patient Name: {report['name']}", styles['NormalBold']))
+        story.append(Paragraph(f"Phone Number: {phone}", styles['NormalBold']))
+        story.append(Spacer(1, 10))
+
+        # Table Data
+        table = default_table()
+        flags = table.flags(report['test'], report['values'])
+        data = [["Test", "Result", "Reference Range"]]
+        for param, val in report['values'].items():
+            flag = flags.get(param)
+            data.append([param, f"{val} ({flag})" if flag and flag != "normal" else val,
+                         table.reference(report['test'], param)])
+        if report['result'] != "-":
+            data.append(["Observation", report['result'], ""])
+
+        table = Table(data, colWidths=[2.4 * inch, 1.8 * inch, 2.4 * inch])
+        table.setStyle(TABLE_STYLE)
+        story.append(table)
+        story.append(Spacer(1, 20))
+        return story
+
+    def _document(self, path):
+        return SimpleDocTemplate(path, pagesize=letter, rightMargin=40, leftMargin=40, topMargin=80,
+                                 bottomMargin=40)
+
+    def render(self, path, phone, report, report_number):
+        self._document(path).build(self.story(phone, report, report_number))
+        return path
+
+    def render_combined(self, path, reports):
+        """One document with each (report number, phone, report) starting a new page."""
+        story = []
+        for report_number, phone, report in reports:
+            if story:
+                story.append(PageBreak())
+            story += self.story(phone, report, report_number)
+        self._document(path).build(story)
+        return path
+
+
+_renderer = None
+
+
+def default_renderer():
+    # Shared by the GUI and by each pool worker, so styles and logo are built once per process
+    global _renderer
+    if _renderer is None:
+        _renderer = ReportRenderer()
+    return _renderer
+
+
+def _render_chunk(out_dir, chunk):
+    renderer = default_renderer()
+    return [renderer.render(os.path.join(out_dir, f"report-{number}.pdf"), phone, report, number)
+            for number, phone, report in chunk]
+
+
+def render_batch(reports, out_dir, workers=None, chunk_size=25):
+    """One PDF per (report number, phone, report), named report-<number>.pdf.
+
+    Rendering is spread over ``workers`` processes (default: one per CPU);
+    each process builds its renderer once and takes reports in chunks.
+    Returns the paths written.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    reports = list(reports)
+    workers = workers or os.cpu_count() or 1
+    chunks = [reports[i:i + chunk_size] for i in range(0, len(reports), chunk_size)]
+    if workers == 1 or len(chunks) <= 1:
+        return [path for chunk in chunks for path in _render_chunk(out_dir, chunk)]
+    with ProcessPoolExecutor(workers) as pool:
+        return [path for paths in pool.map(_render_chunk, [out_dir] * len(chunks), chunks) for path in paths]
+
+
+if __name__ == "__main__":
+    from report_store import DB_FILE, ReportStore
+
+    parser = argparse.ArgumentParser(description="Print every lab report saved on a day (or date range).")
+    parser.add_argument("since", help="first day, YYYY-MM-DD")
+    parser.add_argument("until", nargs="?", help="last day (default: same as since)")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--out", default="pdf", help="output directory")
+    parser.add_argument("--combined", action="store_true", help="write one multi-page PDF instead of one per report")
+    parser.add_argument("--workers", type=int, help="rendering processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    store = ReportStore(args.db)
+    reports = list(store.iter_search(since=args.since, until=args.until or args.since))
+    store.close()
+    if args.combined:
+        os.makedirs(args.out, exist_ok=True)
+        path = os.path.join(args.out, f"reports-{args.since}.pdf")
+        default_renderer().render_combined(path, reports)
+        print(f"Wrote {len(reports):,} report(s) to {path}")
+    else:
+        paths = render_batch(reports, args.out, args.workers)
+        print(f"Wrote {len(paths):,} PDF(s) to {args.out}")
@@ -0,0 +1,222 @@
+import argparse
+import datetime
+import json
+import os
+import sqlite3
+
+from migrate_reports import LEGACY_FILE, migrate
+
+DB_FILE = 'reports.db'
+
+# Reports shown per page in the View Reports window
+PAGE_SIZE = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    phone TEXT NOT NULL,
+    name TEXT NOT NULL,
+    test TEXT NOT NULL,
+    parameters TEXT NOT NULL,
+    result TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reports_phone ON reports (phone, id);
+CREATE INDEX IF NOT EXISTS reports_name ON reports (name COLLATE NOCASE, id);
+CREATE INDEX IF NOT EXISTS reports_test ON reports (test, timestamp, id);
+CREATE INDEX IF NOT EXISTS reports_timestamp ON reports (timestamp, id);
+"""
+# id is the insertion order, so a patient's reports come back in the order
+# they were saved, as they did from the per-phone lists in reports_data.json.
+# Timestamps are "YYYY-MM-DD HH:MM:SS" text, so they sort and range-compare
+# as dates; reports saved before timestamps existed have "".
+
+
+_encode = json.JSONEncoder(separators=(',', ':')).encode
+
+
+def _row(phone, report):
+    return (phone, report['name'], report['test'], _encode(report['values']),
+            report['result'], report['timestamp'])
+
+
+def _report(row):
+    name, test, parameters, result, timestamp = row
+    return {'name': name, 'test': test, 'values': json.loads(parameters), 'result': result, 'timestamp': timestamp}
+
+
+class ReportStore:
+    """Lab reports in SQLite (WAL), one row per report.
+
+    Saving a report appends one row in its own transaction, so the cost
+    does not grow with the lab's history, and with ``synchronous=FULL`` a
+    report is on disk once ``add`` returns. A crash mid-save loses at most
+    that report, never the others, which a full rewrite of
+    reports_data.json could not promise.
+
+    The write-ahead log is checkpointed into the database as it grows;
+    ``compact`` also truncates it and reclaims free pages, and is run when
+    the application closes.
+    """
+
+    def __init__(self, path=DB_FILE, busy_timeout=5000):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=busy_timeout / 1000, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def add(self, phone, report):
+        """Append one report for a phone number and return its id."""
+        cursor = self.conn.execute("INSERT INTO reports (phone, name, test, parameters, result, timestamp) "
+                                   "VALUES (?, ?, ?, ?, ?, ?)", _row(phone, report))
+        return cursor.lastrowid
+
+    def add_many(self, reports):
+        """Append (phone, report) pairs in one transaction; returns how many."""
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            cursor = self.conn.executemany("INSERT INTO reports (phone, name, test, parameters, result, timestamp) "
+                                           "VALUES (?, ?, ?, ?, ?, ?)",
+                                           (_row(phone, report) for phone, report in reports))
+        return cursor.rowcount
+
+    def reports_for(self, phone):
+        """Every report for a phone number, oldest first."""
+        rows = self.conn.execute("SELECT name, test, parameters, result, timestamp FROM reports "
+                                 "WHERE phone = ? ORDER BY id", (phone,))
+        return [_report(row) for row in rows]
+
+    def history(self, phone, after=0):
+        """(id, test, values, timestamp) for a phone number's reports with id > after, oldest first."""
+        rows = self.conn.execute("SELECT id, test, parameters, timestamp FROM reports "
+                                 "WHERE phone = ? AND id > ? ORDER BY id", (phone, after))
+        return [(report_id, test, json.loads(parameters), timestamp) for report_id, test, parameters, timestamp in rows]
+
+    def search(self, phone=None, name=None, test=None, since=None, until=None, after=None, limit=PAGE_SIZE):
+        """One page of reports matching every filter given.
+
+        ``name`` is a case-insensitive prefix of the patient name, ``since``
+        and ``until`` are inclusive "YYYY-MM-DD" dates. Reports come back
+        by id for a phone search, by name for a name search and by
+        timestamp otherwise, so each page is read straight off an index.
+
+        Returns (rows, cursor): rows are (id, phone, report) tuples, and
+        passing cursor as ``after`` gives the next page; it is None on the
+        last page. Raises ValueError for a malformed date.
+        """
+        conditions, params = [], []
+        if phone:
+            conditions.append("phone = ?")
+            params.append(phone)
+        if name and name.strip():
+            # Every name starting with the prefix sorts between it and prefix + the largest code point
+            conditions.append("name >= ? COLLATE NOCASE AND name < ? COLLATE NOCASE")
+            params += [name.strip(), name.strip() + chr(0x10FFFF)]
+        if test:
+            conditions.append("test = ?")
+            params.append(test)
+        if since:
+            conditions.append("timestamp >= ?")
+            params.append(datetime.date.fromisoformat(since).isoformat())
+        if until:
+            conditions.append("timestamp < ?")
+            params.append((datetime.date.fromisoformat(until) + datetime.timedelta(days=1)).isoformat())
+
+        if phone:
+            order, collate = "id", ""
+        elif name and name.strip():
+            order, collate = "name", " COLLATE NOCASE"
+        else:
+            order, collate = "timestamp", ""
+        if after is not None:
+            # Resume after the last row of the previous page: a range start the index can seek to
+            value, last_id = after
+            if order == "id":
+                conditions.append("id > ?")
+                params.append(last_id)
+            else:
+                conditions.append(f"{order} >= ?{collate} AND ({order} > ?{collate} OR id > ?)")
+                params += [value, value, last_id]
+
+        where = " AND ".join(conditions) or "1"
+        rows = self.conn.execute(f"SELECT id, phone, {order}, name, test, parameters, result, timestamp "
+                                 f"FROM reports WHERE {where} ORDER BY {order}{collate}, id LIMIT ?",
+                                 params + [limit + 1]).fetchall()
+        page = [(row[0], row[1], _report(row[3:])) for row in rows[:limit]]
+        cursor = (rows[limit - 1][2], rows[limit - 1][0]) if len(rows) > limit else None
+        return page, cursor
+
+    def iter_search(self, page_size=1000, **filters):
+        """Every report matching the ``search`` filters, as (id, phone, report)."""
+        cursor = None
+        while True:
+            rows, cursor = self.search(after=cursor, limit=page_size, **filters)
+            yield from rows
+            if cursor is None:
+                return
+
+    def tests(self):
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT test FROM reports ORDER BY test")]
+
+    def iter_test_values(self, test, batch_size=100000):
+        """Lists of (id, values, result) for every report of a test, batch_size at a time."""
+        cursor = self.conn.execute("SELECT id, parameters, result FROM reports WHERE test = ? ORDER BY id", (test,))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield [(report_id, json.loads(parameters), result) for report_id, parameters, result in rows]
+
+    def set_results(self, updates):
+        """Store (result, id) pairs in one transaction."""
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.executemany("UPDATE reports SET result = ? WHERE id = ?", updates)
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+
+    def is_empty(self):
+        return self.conn.execute("SELECT 1 FROM reports LIMIT 1").fetchone() is None
+
+    def import_json(self, path=LEGACY_FILE):
+        """Load a reports_data.json file, normalizing old records; returns migrate()'s counts."""
+        return migrate(path, store=self)
+
+    def compact(self):
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        if self.conn.execute("PRAGMA freelist_count").fetchone()[0]:
+            self.conn.execute("VACUUM")
+
+
+def open_store(path=DB_FILE, legacy_path=LEGACY_FILE):
+    # The first run picks up the reports saved by earlier versions
+    store = ReportStore(path)
+    if store.is_empty() and os.path.exists(legacy_path):
+        store.import_json(legacy_path)
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the lab report database.")
+    parser.add_argument("--db", default=DB_FILE)
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_cmd = commands.add_parser("import", help="load a reports_data.json file")
+    import_cmd.add_argument("file", nargs="?", default=LEGACY_FILE)
+    commands.add_parser("compact", help="checkpoint the write-ahead log and reclaim free space")
+    args = parser.parse_args()
+
+    store = ReportStore(args.db)
+    if args.command == "import":
+        stats = store.import_json(args.file)
+        print(f"Imported {stats['migrated']:,} of {stats['read']:,} report(s)")
+        if 'error' in stats:
+            print(f"Stopped early, the file is damaged: {stats['error']}")
+    else:
+        store.compact()
+        print(f"{len(store):,} report(s), {os.path.getsize(args.db):,} bytes")
+    store.close()
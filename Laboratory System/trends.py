@@ -0,0 +1,199 @@
+import argparse
+import collections
+
+import numpy as np
+
+from reference_ranges import default_table
+from report_store import DB_FILE, ReportStore
+
+# Slopes are quoted as change per this many days
+SLOPE_DAYS = 30
+
+_EPOCH = np.datetime64('1970-01-01T00:00:00', 's')
+_DAY = np.timedelta64(1, 'D')
+
+
+def _days(timestamps):
+    # "YYYY-MM-DD HH:MM:SS" text as days since 1970; NaN for "" (reports saved before timestamps existed)
+    try:
+        return (np.array([text.replace(' ', 'T') for text in timestamps], dtype='datetime64[s]') - _EPOCH) / _DAY
+    except (ValueError, TypeError, AttributeError):
+        pass
+    days = np.full(len(timestamps), np.nan)
+    for i, text in enumerate(timestamps):
+        try:
+            days[i] = (np.datetime64(text.replace(' ', 'T'), 's') - _EPOCH) / _DAY
+        except (ValueError, TypeError, AttributeError):
+            continue
+    return days
+
+
+class Series:
+    """One parameter's measurements over time, in arrays that grow as reports are added.
+
+    ``days`` are days since 1970. Capacity doubles when full, so adding a
+    report copies nothing in the common case. The summary is computed on
+    first use and kept until the next ``extend``.
+    """
+
+    __slots__ = ('days', 'values', 'size', '_summary')
+
+    def __init__(self):
+        self.days = np.empty(8)
+        self.values = np.empty(8)
+        self.size = 0
+        self._summary = None
+
+    def extend(self, days, values):
+        end = self.size + len(days)
+        if end > len(self.days):
+            capacity = max(end, 2 * len(self.days))
+            for name in ('days', 'values'):
+                grown = np.empty(capacity)
+                grown[:self.size] = getattr(self, name)[:self.size]
+                setattr(self, name, grown)
+        self.days[self.size:end] = days
+        self.values[self.size:end] = values
+        self.size = end
+        self._summary = None
+
+    def arrays(self):
+        """(days, values) in time order."""
+        days, values = self.days[:self.size], self.values[:self.size]
+        if self.size > 1 and (days[1:] < days[:-1]).any():
+            # Imported results can arrive out of date order
+            order = np.argsort(days, kind='stable')
+            return days[order], values[order]
+        return days, values
+
+    def summary(self):
+        """count, min, max, first, last, last_day and slope (change per SLOPE_DAYS, None with one date)."""
+        if self._summary is None:
+            days, values = self.arrays()
+            slope = None
+            if days[-1] > days[0]:
+                # Least-squares line through every measurement
+                centered = days - days.mean()
+                slope = float((centered * (values - values.mean())).sum() / (centered * centered).sum() * SLOPE_DAYS)
+            self._summary = {'count': self.size, 'min': float(values.min()), 'max': float(values.max()),
+                             'first': float(values[0]), 'last': float(values[-1]), 'last_day': float(days[-1]),
+                             'slope': slope}
+        return self._summary
+
+
+class PatientTrends:
+    """A patient's numeric results as a Series per (test, parameter).
+
+    WBC and RBC mean different things in a blood count and a urine test,
+    so series are kept per test. Text answers and reports without a
+    timestamp are left out; ``undated`` counts the latter.
+    """
+
+    def __init__(self, phone, table=None):
+        self.phone = phone
+        self.table = table or default_table()
+        self.series = {}
+        self.undated = 0
+        self.last_id = 0  # newest report read from the store
+        self.added = set()  # ids added directly, newer than last_id
+
+    def extend(self, rows):
+        """Add (id, test, values, timestamp) rows, one NumPy pass per test."""
+        table = self.table
+        by_test = collections.defaultdict(list)
+        for row in rows:
+            if row[1] in table:
+                by_test[row[1]].append(row)
+        for test, group in by_test.items():
+            compiled = table.tests[test]
+            matrix = compiled.matrix([values for _, _, values, _ in group])
+            days = _days([timestamp for _, _, _, timestamp in group])
+            dated = ~np.isnan(days)
+            self.undated += len(group) - int(dated.sum())
+            for col, param in enumerate(compiled.params):
+                keep = dated & ~np.isnan(matrix[:, col])
+                if keep.any():
+                    self.series.setdefault((test, param), Series()).extend(days[keep], matrix[keep, col])
+
+    def items(self):
+        """((test, parameter), Series) pairs, tests alphabetically and each test's parameters in table order."""
+        position = {(test, param): i for test, compiled in self.table.tests.items()
+                    for i, param in enumerate(compiled.params)}
+        return sorted(self.series.items(), key=lambda item: (item[0][0], position[item[0]]))
+
+
+class TrendCache:
+    """PatientTrends for recently opened patients, kept current as reports are saved.
+
+    The first ``get`` for a patient reads their reports off the phone
+    index; later ones only read reports newer than the last it saw, so
+    results imported on another connection appear as well. ``add`` puts
+    a report the application has just saved straight into the arrays.
+    Beyond ``max_patients`` the least recently opened patient is dropped.
+    """
+
+    def __init__(self, store, table=None, max_patients=100):
+        self.store = store
+        self.table = table or default_table()
+        self.max_patients = max_patients
+        self.patients = collections.OrderedDict()
+
+    def get(self, phone):
+        trends = self.patients.pop(phone, None) or PatientTrends(phone, self.table)
+        self.patients[phone] = trends
+        while len(self.patients) > self.max_patients:
+            self.patients.popitem(last=False)
+        rows = self.store.history(phone, after=trends.last_id)
+        if rows:
+            trends.extend([row for row in rows if row[0] not in trends.added])
+            trends.last_id = rows[-1][0]
+            trends.added = {report_id for report_id in trends.added if report_id > trends.last_id}
+        return trends
+
+    def add(self, phone, report_id, report):
+        """Append a report just saved with ReportStore.add; patients not cached are built on their next get."""
+        trends = self.patients.get(phone)
+        if trends is not None:
+            trends.extend([(report_id, report['test'], report['values'], report['timestamp'])])
+            trends.added.add(report_id)
+
+
+def sparkline(days, values, box, low=None, high=None):
+    """Canvas coordinates for a series drawn inside box = (x0, y0, x1, y1).
+
+    Returns ([x, y, x, y, ...], y_of) where y_of(value) is the y of any
+    value on the same scale. The scale spans the values and any ``low``
+    or ``high`` bound near them, so the reference band shows where it helps.
+    """
+    x0, y0, x1, y1 = box
+    bottom, top = float(values.min()), float(values.max())
+    spread = max(top - bottom, abs(top) * 0.1, 1e-9)
+    for bound in (low, high):
+        if bound is not None and bottom - spread <= bound <= top + spread:
+            bottom, top = min(bottom, bound), max(top, bound)
+    if top == bottom:
+        bottom, top = bottom - spread, top + spread
+
+    def y_of(value):
+        return y1 - (value - bottom) / (top - bottom) * (y1 - y0)
+
+    span = days[-1] - days[0]
+    xs = x0 + (days - days[0]) / span * (x1 - x0) if span > 0 else np.full(len(days), (x0 + x1) / 2)
+    return np.column_stack((xs, y_of(values))).ravel().tolist(), y_of
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print a patient's trend for every measured parameter.")
+    parser.add_argument("phone")
+    parser.add_argument("--db", default=DB_FILE)
+    args = parser.parse_args()
+
+    store = ReportStore(args.db)
+    trends = TrendCache(store).get(args.phone)
+    store.close()
+    for (test, param), series in trends.items():
+        s = series.summary()
+        slope = "-" if s['slope'] is None else f"{s['slope']:+.3g}/{SLOPE_DAYS}d"
+        print(f"{test} / {param}: n={s['count']} min={s['min']:g} max={s['max']:g} last={s['last']:g} slope={slope}")
+    if trends.undated:
+        print(f"{trends.undated} report(s) without a timestamp left out")